@@ -14,20 +14,13 @@ from dataclasses import asdict
 from typing import Iterable, Optional
 
 import pandas as pd
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
-try:  # Streamlit may be optional in some environments
-    import streamlit as st
-except ImportError as exc:  # pragma: no cover - exercised in runtime, not tests
-    st = None  # type: ignore[assignment]
-    STREAMLIT_IMPORT_ERROR = exc
-else:
-    STREAMLIT_IMPORT_ERROR = None
-
 from at_home_quant.data.tickers import Universe
-from at_home_quant.db.models import PortfolioSnapshot, PriceDaily
-from at_home_quant.db.session import get_session
+from at_home_quant.db import crud
+from at_home_quant.db.models import PortfolioSnapshot
+from at_home_quant.db.session import get_read_session
 from at_home_quant.performance.models import MonthlyPerformance, PerformanceSummary
 from at_home_quant.performance.service import get_monthly_performance, get_performance_summary
 from at_home_quant.portfolio.models import RebalanceInstruction, TargetPortfolio
@@ -35,44 +28,32 @@ from at_home_quant.portfolio.service import build_monthly_portfolio, compute_reb
 from at_home_quant.regime.models import RegimeDecision, UniverseScore
 from at_home_quant.regime.service import get_current_regime
 from at_home_quant.selection.service import rank_universe
-from at_home_quant.etl.historical_load import run_full_history
-from at_home_quant.etl.daily_update import run_daily_update
+
+# Streamlit is imported by require_streamlit, so importing the helpers below stays cheap and works
+# without it installed.
+st = None
 
 
 # ---------- Helpers ----------
 
 def get_latest_price_date() -> Optional[datetime.date]:
     """Return the most recent price date in the database."""
-    session = get_session()
-    if session is None:
-        return None
     try:
-        return session.execute(select(func.max(PriceDaily.date))).scalar_one_or_none()
-    except (OperationalError, SQLAlchemyError, AttributeError) as exc:
+        with get_read_session() as session:
+            return crud.latest_price_date(session)
+    except (OperationalError, SQLAlchemyError) as exc:
         logging.getLogger(__name__).warning("get_latest_price_date failed: %s", exc)
         return None
-    finally:
-        try:
-            session.close()
-        except AttributeError:
-            pass
 
 
 def get_snapshot_dates() -> list[datetime.date]:
     """Return all available portfolio snapshot dates (descending)."""
-    session = get_session()
-    if session is None:
-        return []
     try:
-        dates = session.execute(select(PortfolioSnapshot.as_of_date)).scalars().all()
-    except (OperationalError, SQLAlchemyError, AttributeError) as exc:
+        with get_read_session() as session:
+            dates = session.execute(select(PortfolioSnapshot.as_of_date)).scalars().all()
+    except (OperationalError, SQLAlchemyError) as exc:
         logging.getLogger(__name__).warning("get_snapshot_dates failed: %s", exc)
         return []
-    finally:
-        try:
-            session.close()
-        except AttributeError:
-            pass
     return sorted(dates, reverse=True)
 
 
@@ -101,10 +82,16 @@ def summary_to_dataframe(summary: PerformanceSummary) -> pd.DataFrame:
 
 
 def require_streamlit() -> None:
-    if st is None:
+    global st
+    if st is not None:
+        return
+    try:
+        import streamlit
+    except ImportError as exc:  # pragma: no cover - exercised in runtime, not tests
         raise ImportError(
             "Streamlit is required for the dashboard. Install it with `pip install streamlit`."
-        ) from STREAMLIT_IMPORT_ERROR
+        ) from exc
+    st = streamlit
 
 
 # ---------- UI Sections ----------
@@ -281,6 +268,9 @@ def show_admin_section() -> None:
         if st.button("Run Historical ETL"):
             with st.spinner("Running historical data load..."):
                 try:
+                    # The ETL stack (fetcher, providers, scheduler) loads only when a run is requested.
+                    from at_home_quant.etl.historical_load import run_full_history
+
                     run_full_history()
                     st.success("Historical ETL completed successfully.")
                 except Exception as exc:  # noqa: BLE001
@@ -290,6 +280,8 @@ def show_admin_section() -> None:
         if st.button("Run Daily Update"):
             with st.spinner("Running daily update..."):
                 try:
+                    from at_home_quant.etl.daily_update import run_daily_update
+
                     run_daily_update()
                     st.success("Daily update completed successfully.")
                 except Exception as exc:  # noqa: BLE001
@@ -1,4 +1,6 @@
 import datetime
+import os
+import threading
 from pathlib import Path
 from typing import List
 
@@ -10,6 +12,25 @@ class Settings(BaseSettings):
         "sqlite:///./data/quant.db",
         description="SQLAlchemy database URL; defaults to local SQLite file.",
     )
+    sqlite_journal_mode: str = Field(
+        "wal", description="SQLite journal mode; WAL lets readers run while the ETL writes"
+    )
+    sqlite_synchronous: str = Field(
+        "normal", description="SQLite synchronous level; 'normal' is durable enough under WAL"
+    )
+    sqlite_mmap_size_mb: int = Field(256, description="Part of the database file SQLite may memory-map, in MB")
+    sqlite_cache_size_mb: int = Field(64, description="SQLite page cache per connection in MB")
+    sqlite_temp_store: str = Field("memory", description="Where SQLite keeps temp tables and sort spills")
+    sqlite_busy_timeout_ms: int = Field(
+        5000, description="How long a connection waits on a locked database before failing"
+    )
+    read_pool_size: int = Field(5, description="Connections kept by the read-only analytics engine")
+    snapshot_dir: Path = Field(
+        Path("./data/snapshots"), description="Directory holding read-only database snapshots and their index"
+    )
+    read_dataset: str = Field(
+        "", description="Snapshot the read-only engine and analytics read instead of the live database"
+    )
     default_start_date: datetime.date = Field(
         datetime.date(2000, 1, 1), description="Default start date for history fetches"
     )
@@ -17,13 +38,115 @@ class Settings(BaseSettings):
         default_factory=lambda: ["QQQ", "SPY", "VUKE", "GLD", "IAU", "BIL"],
         description="Default benchmark/asset tickers to fetch",
     )
+    fetch_max_workers: int = Field(
+        8, description="Maximum concurrent symbol downloads; 1 fetches serially"
+    )
+    fetch_timeout_seconds: float = Field(
+        60.0, description="Per-symbol download timeout in seconds"
+    )
+    fetch_batch_size: int = Field(
+        200, description="Maximum symbols per multi-ticker download request"
+    )
+    fetch_rate_per_second: float = Field(
+        2.0, description="Sustained provider requests per second across all workers; 0 disables the limit"
+    )
+    fetch_burst: int = Field(5, description="Provider requests allowed back to back before rate limiting")
+    fetch_max_attempts: int = Field(
+        4, description="Download attempts per symbol before it is reported as failed"
+    )
+    fetch_backoff_base_seconds: float = Field(
+        1.0, description="First retry delay; doubles per attempt with random jitter"
+    )
+    fetch_backoff_max_seconds: float = Field(60.0, description="Upper bound on a single retry delay")
+    etl_fetch_workers: int = Field(
+        1,
+        description="Fetch threads feeding the ETL pipeline; multi-ticker yfinance downloads are serialised anyway",
+    )
+    etl_queue_size: int = Field(4, description="Chunks buffered between ETL pipeline stages")
+    history_chunk_size: int = Field(
+        100, description="Symbols per committed chunk in the historical load"
+    )
+    history_bulk_load: bool = Field(
+        True, description="Write historical chunks through a staging table and one set-based merge"
+    )
+    adjustment_overlap_days: int = Field(
+        7,
+        description="Calendar days of stored bars refetched daily to detect re-adjusted history; 0 disables",
+    )
+    adjustment_tolerance: float = Field(
+        1e-5, description="Relative change in a refetched close or adj_close treated as a new adjustment"
+    )
+    price_store: str = Field(
+        "sql", description="Where analytics read prices: 'sql' (prices_daily) or 'parquet' (PARQUET_STORE_DIR)"
+    )
+    parquet_store_dir: Path = Field(
+        Path("./data/parquet/prices"), description="Root of the partitioned Parquet price store"
+    )
+    parquet_partition_by: str = Field(
+        "symbol", description="Parquet store partitioning: 'symbol' (file per symbol) or 'year'"
+    )
+    parquet_dual_write: bool = Field(
+        False, description="Also write ETL prices to the Parquet store (implied by PRICE_STORE=parquet)"
+    )
+    analytics_engine: str = Field(
+        "pandas",
+        description="Ranking factor engine: 'pandas' per symbol, or 'duckdb' in one query (needs duckdb)",
+    )
+    price_provider: str = Field(
+        "yfinance", description="Price source: 'yfinance', 'replay' (recorded files) or 'generated'"
+    )
+    replay_dir: Path = Field(
+        Path("./data/replay"), description="Directory of recorded raw frames served by the replay provider"
+    )
+    generated_seed: int = Field(0, description="Seed for the generated (synthetic) price provider")
+    synthetic_fallback: bool = Field(
+        True, description="Substitute generated prices when a single-symbol fetch returns no data"
+    )
+    price_cache_enabled: bool = Field(
+        True, description="Cache raw provider downloads on disk and only fetch uncovered ranges"
+    )
+    price_cache_dir: Path = Field(
+        Path("./data/cache/prices"), description="Directory holding the raw download cache"
+    )
+    price_cache_max_mb: int = Field(
+        1024, description="Raw download cache budget in MB; least recently used segments are evicted"
+    )
 
     class Config:
         env_file = ".env"
+        # One instance is shared by every caller of get_settings.
+        allow_mutation = False
+
+
+_ENV_NAMES = frozenset(name.lower() for name in Settings.__fields__)
+_settings_lock = threading.Lock()
+_cached_settings: tuple[tuple, Settings] | None = None
+
+
+def _environment_key() -> tuple:
+    try:
+        env_file_mtime = os.stat(Settings.Config.env_file).st_mtime_ns
+    except OSError:
+        env_file_mtime = None
+    variables = sorted((key.lower(), value) for key, value in os.environ.items() if key.lower() in _ENV_NAMES)
+    return os.getcwd(), env_file_mtime, tuple(variables)
 
 
 def get_settings() -> Settings:
-    return Settings()
+    """Settings from the environment and ``.env``, built once per distinct configuration.
+
+    Building them parses ``.env`` and validates every field, and hot paths ask for settings per call,
+    so the instance is reused until a setting's environment variable or the ``.env`` file changes.
+    """
+    global _cached_settings
+    key = _environment_key()
+    cached = _cached_settings
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _settings_lock:
+        settings = Settings()
+        _cached_settings = (key, settings)
+    return settings
 
 
 def ensure_data_dir_exists(database_url: str) -> None:
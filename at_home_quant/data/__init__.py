@@ -1,3 +1,5 @@
+import importlib
+
 from at_home_quant.data.tickers import (
     ALL_TICKERS,
     BENCHMARKS,
@@ -11,7 +13,6 @@ from at_home_quant.data.tickers import (
     iter_universe,
     list_all_symbols,
 )
-from at_home_quant.data import fetcher
 
 __all__ = [
     "ALL_TICKERS",
@@ -27,3 +28,12 @@ __all__ = [
     "iter_universe",
     "list_all_symbols",
 ]
+
+
+def __getattr__(name: str):
+    # The fetcher pulls in the provider, cache and scheduler stack; only load it when asked for.
+    if name == "fetcher":
+        module = importlib.import_module(f"{__name__}.fetcher")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import datetime
+import importlib.util
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+
+from at_home_quant.config.settings import Settings, get_settings
+from at_home_quant.data.store import PRICE_COLUMNS
+from at_home_quant.db import snapshots
+
+pa = None
+
+logger = logging.getLogger(__name__)
+
+# DuckDB and pyarrow are optional and only imported once an engine is built; everything else reads
+# through the PriceStore.
+DUCKDB_AVAILABLE = all(importlib.util.find_spec(module) is not None for module in ("duckdb", "pyarrow"))
+
+# Same lookbacks as selection.factors: months of 21 sessions, volatility over the last 252 returns.
+MONTH_DAYS = 21
+ANNUALIZATION_DAYS = 252
+
+_FACTORS_SQL = f"""
+WITH px AS (
+    SELECT symbol, date, adj_close FROM {{source}}
+    WHERE symbol IN (SELECT symbol FROM wanted) AND date <= $as_of AND adj_close IS NOT NULL
+),
+aged AS (
+    SELECT
+        symbol,
+        adj_close,
+        row_number() OVER w - 1 AS age,
+        adj_close / lead(adj_close) OVER w - 1 AS ret
+    FROM px
+    WINDOW w AS (PARTITION BY symbol ORDER BY date DESC)
+)
+SELECT
+    symbol,
+    max(adj_close) FILTER (WHERE age = 0)
+        / nullif(max(adj_close) FILTER (WHERE age = {6 * MONTH_DAYS}), 0) - 1 AS momentum_6m,
+    max(adj_close) FILTER (WHERE age = 0)
+        / nullif(max(adj_close) FILTER (WHERE age = {12 * MONTH_DAYS}), 0) - 1 AS momentum_12m,
+    CASE WHEN count(ret) FILTER (WHERE age < {ANNUALIZATION_DAYS}) >= 2
+        THEN stddev_pop(ret) FILTER (WHERE age < {ANNUALIZATION_DAYS}) * sqrt({ANNUALIZATION_DAYS})
+    END AS volatility,
+    count(*) AS observations
+FROM aged
+GROUP BY symbol
+ORDER BY symbol
+"""
+
+_AS_OF_SQL = """
+SELECT g.date, g.symbol, p.value
+FROM (SELECT d.date, w.symbol FROM grid_dates AS d CROSS JOIN wanted AS w) AS g
+ASOF LEFT JOIN (
+    SELECT symbol, date, {column} AS value FROM {source}
+    WHERE symbol IN (SELECT symbol FROM wanted) AND {column} IS NOT NULL
+) AS p
+ON g.symbol = p.symbol AND g.date >= p.date
+"""
+
+
+def _arrow(result) -> "pa.Table":
+    # to_arrow_table replaced fetch_arrow_table in DuckDB 1.4.
+    fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+    return fetch()
+
+
+def _sqlite_path(database_url: str) -> Path:
+    prefix = "sqlite:///"
+    path = database_url[len(prefix) :].split("?", 1)[0] if database_url.startswith(prefix) else ""
+    if not path or path == ":memory:":
+        raise ValueError(f"The analytics engine needs a SQLite file or the Parquet store: {database_url!r}")
+    return Path(path)
+
+
+class AnalyticsEngine:
+    """Vectorised read-only queries over the price history with an embedded DuckDB.
+
+    The source is either the Parquet store (``read_parquet`` with hive partitions, so DuckDB prunes
+    files and row groups itself) or the SQLite file. SQLite is attached read-only through DuckDB's
+    ``sqlite`` extension; where the extension cannot be loaded (it downloads on first use) each query
+    instead reads just the rows it needs over a read-only ``sqlite3`` connection into Arrow.
+    Ad hoc ``query`` calls see a view ``prices(symbol, date, open, ..., return_)``.
+    """
+
+    def __init__(
+        self,
+        sqlite_path: Path | str | None = None,
+        parquet_root: Path | str | None = None,
+        partition_by: str = "symbol",
+        threads: int | None = None,
+    ) -> None:
+        if not DUCKDB_AVAILABLE:
+            raise RuntimeError("AnalyticsEngine requires duckdb and pyarrow")
+        global pa
+        import duckdb
+        import pyarrow as pa
+
+        if (sqlite_path is None) == (parquet_root is None):
+            raise ValueError("Pass exactly one of sqlite_path or parquet_root")
+        self._con = duckdb.connect()
+        try:
+            # The loop-join shortcut for "small" ASOF probes is quadratic on as-of grids of a few
+            # thousand cells; the sort-merge ASOF join is orders of magnitude faster there.
+            self._con.execute("SET GLOBAL asof_loop_join_threshold = 0")
+        except duckdb.Error:  # setting added in DuckDB 1.1
+            pass
+        if threads:
+            self._con.execute(f"SET GLOBAL threads = {int(threads)}")
+        self._lock = threading.Lock()
+        self.sqlite_path = Path(sqlite_path) if sqlite_path is not None else None
+        self.scan_fallback = False
+        columns = ", ".join(PRICE_COLUMNS)
+        if parquet_root is not None:
+            hive_type = "VARCHAR" if partition_by == "symbol" else "INTEGER"
+            pattern = str(Path(parquet_root) / "*" / "*.parquet").replace("'", "''")
+            self._con.execute(
+                f"CREATE VIEW prices AS SELECT symbol, date, {columns} FROM read_parquet('{pattern}', "
+                f"hive_partitioning = true, hive_types = {{'{partition_by}': {hive_type}}})"
+            )
+            return
+        path = str(self.sqlite_path).replace("'", "''")
+        try:
+            self._con.execute("LOAD sqlite")
+            self._con.execute(f"ATTACH '{path}' AS src (TYPE sqlite, READ_ONLY)")
+        except duckdb.Error as exc:
+            logger.info("DuckDB sqlite extension unavailable (%s); scanning SQLite through sqlite3", exc)
+            self.scan_fallback = True
+            return
+        self._con.execute(
+            f"CREATE VIEW prices AS SELECT t.symbol, p.date, "
+            + ", ".join(f"p.{c}" for c in PRICE_COLUMNS)
+            + " FROM src.prices_daily AS p JOIN src.tickers AS t ON t.id = p.ticker_id"
+        )
+
+    @classmethod
+    def from_settings(cls, settings: Settings | None = None) -> "AnalyticsEngine":
+        settings = settings or get_settings()
+        # A selected snapshot is a frozen copy of the SQLite file and wins over the live Parquet store.
+        if settings.price_store == "parquet" and snapshots.active_dataset(settings) is None:
+            return cls(parquet_root=settings.parquet_store_dir, partition_by=settings.parquet_partition_by)
+        return cls(sqlite_path=_sqlite_path(snapshots.dataset_url(settings)))
+
+    def close(self) -> None:
+        self._con.close()
+
+    def _scan(
+        self,
+        cursor,
+        symbols: Sequence[str],
+        start: datetime.date | None,
+        end: datetime.date | None,
+        columns: Sequence[str],
+    ) -> str:
+        """Name of the relation to query, loading the requested rows first when SQLite is not attached."""
+        if not self.scan_fallback:
+            return "prices"
+        clauses = ["t.symbol IN (SELECT value FROM json_each(?))"]
+        params: list[object] = [pd.Series(list(symbols)).to_json(orient="values")]
+        if start is not None:
+            clauses.append("p.date >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("p.date <= ?")
+            params.append(end.isoformat())
+        sql = (
+            "SELECT t.symbol, p.date, " + ", ".join(f"p.{c}" for c in columns)
+            + " FROM prices_daily AS p JOIN tickers AS t ON t.id = p.ticker_id WHERE " + " AND ".join(clauses)
+        )
+        uri = f"{self.sqlite_path.resolve().as_uri()}?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as connection:
+            rows = connection.execute(sql, params).fetchall()
+        names = ["symbol", "date", *columns]
+        data = list(zip(*rows)) if rows else [[] for _ in names]
+        arrays = [pa.array(data[0], pa.string()), pa.array(data[1], pa.string()).cast(pa.date32())]
+        arrays += [pa.array(values, pa.float64()) for values in data[2:]]
+        cursor.register("prices_scan", pa.Table.from_arrays(arrays, names=names))
+        return "prices_scan"
+
+    def _cursor(self, symbols: Sequence[str]):
+        with self._lock:
+            cursor = self._con.cursor()
+        cursor.register("wanted", pa.table({"symbol": pa.array(list(symbols), pa.string())}))
+        return cursor
+
+    def query(self, sql: str, params: dict | None = None) -> "pa.Table":
+        """Run arbitrary SQL against the ``prices`` view (attached SQLite or Parquet sources only)."""
+        if self.scan_fallback:
+            raise RuntimeError("Ad hoc queries need the DuckDB sqlite extension or the Parquet store")
+        with self._lock:
+            cursor = self._con.cursor()
+        return _arrow(cursor.execute(sql, params or {}))
+
+    def long_prices(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        columns: Sequence[str] = ("adj_close",),
+    ) -> "pa.Table":
+        """Rows ``symbol, date, *columns`` sorted by symbol and date, as an Arrow table."""
+        unknown = set(columns) - set(PRICE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown price columns: {sorted(unknown)}")
+        cursor = self._cursor(symbols)
+        source = self._scan(cursor, symbols, start, end, columns)
+        sql = f"SELECT symbol, date, {', '.join(columns)} FROM {source}"
+        sql += " WHERE symbol IN (SELECT symbol FROM wanted)"
+        params: dict[str, object] = {}
+        if start is not None:
+            sql += " AND date >= $start"
+            params["start"] = start
+        if end is not None:
+            sql += " AND date <= $end"
+            params["end"] = end
+        return _arrow(cursor.execute(sql + " ORDER BY symbol, date", params))
+
+    def wide_prices(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        column: str = "adj_close",
+    ) -> pd.DataFrame:
+        """A dates x symbols matrix of ``column``; symbols without data are all-NaN columns."""
+        frame = self.long_prices(symbols, start=start, end=end, columns=[column]).to_pandas()
+        wide = frame.pivot(index="date", columns="symbol", values=column)
+        return wide.reindex(columns=list(symbols)).rename_axis(index="date", columns="symbol")
+
+    def prices_as_of(
+        self, symbols: Sequence[str], dates: Sequence[datetime.date], column: str = "adj_close"
+    ) -> pd.DataFrame:
+        """Last non-null ``column`` on or before each date: a dates x symbols matrix, NaN where none."""
+        if column not in PRICE_COLUMNS:
+            raise ValueError(f"Unknown price column: {column}")
+        dates = list(dict.fromkeys(dates))
+        cursor = self._cursor(symbols)
+        cursor.register("grid_dates", pa.table({"date": pa.array(dates, pa.date32())}))
+        source = self._scan(cursor, symbols, None, max(dates) if dates else None, [column])
+        frame = _arrow(cursor.execute(_AS_OF_SQL.format(column=column, source=source))).to_pandas()
+        wide = frame.pivot(index="date", columns="symbol", values="value")
+        return wide.reindex(index=dates, columns=list(symbols)).astype(float).rename_axis(
+            index="date", columns="symbol"
+        )
+
+    def momentum_factors(self, symbols: Sequence[str], as_of: datetime.date) -> pd.DataFrame:
+        """Per-symbol 6m/12m momentum and annualised volatility as of a date, in one query.
+
+        Matches ``selection.factors.momentum_6m``, ``momentum_12m`` and ``realized_vol``; symbols with
+        no prices are omitted.
+        """
+        cursor = self._cursor(symbols)
+        source = self._scan(cursor, symbols, None, as_of, ["adj_close"])
+        frame = _arrow(cursor.execute(_FACTORS_SQL.format(source=source), {"as_of": as_of})).to_pandas()
+        return frame.astype({"momentum_6m": float, "momentum_12m": float, "volatility": float})
+
+
+_default_engine: AnalyticsEngine | None = None
+_default_key: tuple | None = None
+_default_lock = threading.Lock()
+
+
+def get_analytics_engine(settings: Settings | None = None) -> AnalyticsEngine:
+    """Process-wide engine for the configured price source, rebuilt if the source settings change."""
+    global _default_engine, _default_key
+    settings = settings or get_settings()
+    key = (
+        settings.price_store,
+        snapshots.dataset_url(settings),
+        str(settings.parquet_store_dir),
+        settings.parquet_partition_by,
+    )
+    with _default_lock:
+        if _default_engine is None or _default_key != key:
+            if _default_engine is not None:
+                _default_engine.close()
+            _default_engine = AnalyticsEngine.from_settings(settings)
+            _default_key = key
+        return _default_engine
+
+
+__all__ = [
+    "ANNUALIZATION_DAYS",
+    "AnalyticsEngine",
+    "DUCKDB_AVAILABLE",
+    "MONTH_DAYS",
+    "get_analytics_engine",
+]
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import atexit
+import datetime
+import hashlib
+import importlib.util
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from at_home_quant.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+DateRange = tuple[datetime.date, datetime.date]
+
+# Parquet needs pyarrow; fall back to gzip-compressed pickles so the cache still works without it.
+CACHE_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") is not None else "pickle"
+FRAME_SUFFIX = ".parquet" if CACHE_FORMAT == "parquet" else ".pkl.gz"
+
+_INDEX_FILE = "index.json"
+
+
+def write_frame(path: Path, frame: pd.DataFrame) -> None:
+    if CACHE_FORMAT == "parquet":
+        frame.to_parquet(path, compression="zstd")
+    else:
+        frame.to_pickle(path, compression="gzip")
+
+
+def read_frame(path: Path) -> pd.DataFrame:
+    if CACHE_FORMAT == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_pickle(path, compression="gzip")
+
+
+@dataclass
+class CacheSegment:
+    key: str
+    symbol: str
+    start: datetime.date
+    end: datetime.date
+    path: str
+    size_bytes: int
+    last_access: float
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data["start"] = self.start.isoformat()
+        data["end"] = self.end.isoformat()
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "CacheSegment":
+        return cls(
+            key=data["key"],
+            symbol=data["symbol"],
+            start=datetime.date.fromisoformat(data["start"]),
+            end=datetime.date.fromisoformat(data["end"]),
+            path=data["path"],
+            size_bytes=int(data["size_bytes"]),
+            last_access=float(data["last_access"]),
+        )
+
+
+def segment_key(symbol: str, start: datetime.date, end: datetime.date) -> str:
+    return hashlib.sha1(f"{symbol}|{start.isoformat()}|{end.isoformat()}".encode()).hexdigest()
+
+
+def merge_ranges(ranges: list[DateRange]) -> list[DateRange]:
+    merged: list[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PriceCache:
+    """On-disk cache of raw per-symbol provider downloads.
+
+    Each stored segment holds one symbol's raw frame for an inclusive date range and is addressed by
+    a hash of ``(symbol, start, end)``. A symbol's coverage is the union of its segments, so later
+    calls only need to download the ranges reported by :meth:`missing_ranges` and append them as new
+    segments. A range the provider had no bars for is stored as a segment without a file, so it counts
+    as covered. When ``max_bytes`` is set the least recently read or written segments are evicted.
+
+    Reads and writes only update the in-memory index; :meth:`flush` writes ``index.json``, as do
+    evictions and invalidations. Segment files missing from a stale index are simply fetched again.
+    """
+
+    def __init__(self, root: Path | str, max_bytes: int | None = None) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._segments: dict[str, CacheSegment] = {}
+        self._by_symbol: dict[str, dict[str, CacheSegment]] = {}
+        self._dirty = False
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    # ----- index -----
+
+    def _index_path(self) -> Path:
+        return self.root / _INDEX_FILE
+
+    def _load_index(self) -> None:
+        path = self._index_path()
+        if not path.exists():
+            return
+        try:
+            entries = json.loads(path.read_text())
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable price cache index %s: %s", path, exc)
+            return
+        for entry in entries:
+            segment = CacheSegment.from_json(entry)
+            if not segment.path or (self.root / segment.path).exists():
+                self._add(segment)
+
+    def _save_index(self) -> None:
+        path = self._index_path()
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps([s.to_json() for s in self._segments.values()]))
+        tmp_path.replace(path)
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Write the index if reads or writes changed it since the last save."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _add(self, segment: CacheSegment) -> None:
+        self._segments[segment.key] = segment
+        self._by_symbol.setdefault(segment.symbol, {})[segment.key] = segment
+
+    def _drop(self, segment: CacheSegment) -> None:
+        self._segments.pop(segment.key, None)
+        symbol_segments = self._by_symbol.get(segment.symbol, {})
+        symbol_segments.pop(segment.key, None)
+        if not symbol_segments:
+            self._by_symbol.pop(segment.symbol, None)
+        if segment.path:
+            (self.root / segment.path).unlink(missing_ok=True)
+
+    def _symbol_segments(self, symbol: str) -> list[CacheSegment]:
+        return sorted(self._by_symbol.get(symbol, {}).values(), key=lambda s: s.start)
+
+    # ----- coverage -----
+
+    def coverage(self, symbol: str) -> list[DateRange]:
+        with self._lock:
+            return merge_ranges([(s.start, s.end) for s in self._symbol_segments(symbol)])
+
+    def missing_ranges(self, symbol: str, start: datetime.date, end: datetime.date) -> list[DateRange]:
+        if end < start:
+            return []
+        missing: list[DateRange] = []
+        cursor = start
+        for covered_start, covered_end in self.coverage(symbol):
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start - datetime.timedelta(days=1)))
+            cursor = max(cursor, covered_end + datetime.timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            missing.append((cursor, end))
+        return missing
+
+    # ----- read / write -----
+
+    def read(self, symbol: str, start: datetime.date, end: datetime.date) -> pd.DataFrame:
+        with self._lock:
+            segments = [s for s in self._symbol_segments(symbol) if s.end >= start and s.start <= end]
+            now = time.time()
+            for segment in segments:
+                segment.last_access = now
+            self._dirty = self._dirty or bool(segments)
+        frames = [self._read_segment(self.root / s.path) for s in segments if s.path]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        combined = pd.concat(frames)
+        combined = combined[~combined.index.duplicated(keep="last")].sort_index()
+        window = (combined.index >= pd.Timestamp(start)) & (combined.index <= pd.Timestamp(end))
+        return combined.loc[window]
+
+    def write(self, symbol: str, start: datetime.date, end: datetime.date, frame: pd.DataFrame) -> None:
+        """Store ``frame`` for ``start..end``; an empty frame marks the range as having no bars."""
+        key = segment_key(symbol, start, end)
+        relative, size_bytes = "", 0
+        if not frame.empty:
+            relative = f"{key}{FRAME_SUFFIX}"
+            path = self.root / relative
+            write_frame(path, frame)
+            size_bytes = path.stat().st_size
+        with self._lock:
+            self._add(
+                CacheSegment(
+                    key=key,
+                    symbol=symbol,
+                    start=start,
+                    end=end,
+                    path=relative,
+                    size_bytes=size_bytes,
+                    last_access=time.time(),
+                )
+            )
+            self._dirty = True
+            if self._evict():
+                self._save_index()
+
+    def invalidate(self, symbol: str) -> None:
+        """Drop every cached segment of ``symbol``, e.g. after the provider re-adjusted its history."""
+        with self._lock:
+            for segment in self._symbol_segments(symbol):
+                self._drop(segment)
+            self._save_index()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(s.size_bytes for s in self._segments.values())
+
+    def _evict(self) -> bool:
+        """Drop least recently used segments until the cache fits ``max_bytes``; True if any went."""
+        if self.max_bytes is None:
+            return False
+        total = sum(s.size_bytes for s in self._segments.values())
+        if total <= self.max_bytes:
+            return False
+        for segment in sorted(self._segments.values(), key=lambda s: s.last_access):
+            if total <= self.max_bytes:
+                break
+            self._drop(segment)
+            total -= segment.size_bytes
+        return True
+
+    @staticmethod
+    def _read_segment(path: Path) -> pd.DataFrame:
+        try:
+            return read_frame(path)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable price cache segment %s: %s", path, exc)
+            return pd.DataFrame()
+
+
+_default_cache: PriceCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> PriceCache | None:
+    global _default_cache
+    settings = get_settings()
+    if not settings.price_cache_enabled:
+        return None
+    with _default_cache_lock:
+        root = Path(settings.price_cache_dir)
+        if _default_cache is None or _default_cache.root != root:
+            max_bytes = settings.price_cache_max_mb * 1024 * 1024 if settings.price_cache_max_mb else None
+            if _default_cache is not None:
+                _default_cache.flush()
+            _default_cache = PriceCache(root, max_bytes=max_bytes)
+            atexit.register(_default_cache.flush)
+        return _default_cache
+
+
+__all__ = [
+    "CACHE_FORMAT",
+    "FRAME_SUFFIX",
+    "CacheSegment",
+    "PriceCache",
+    "get_default_cache",
+    "merge_ranges",
+    "read_frame",
+    "segment_key",
+    "write_frame",
+]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import datetime
+from functools import lru_cache
+
+import pandas as pd
+from dateutil.relativedelta import MO
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    EasterMonday,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    next_monday,
+    next_monday_or_tuesday,
+    sunday_to_monday,
+)
+from pandas.tseries.offsets import DateOffset
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    # Regular full-day closures only; one-off closures become price gaps after one repair fetch.
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+class LSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=next_monday),
+        GoodFriday,
+        EasterMonday,
+        Holiday("Early May Bank Holiday", month=5, day=1, offset=DateOffset(weekday=MO(1))),
+        Holiday("Spring Bank Holiday", month=5, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Summer Bank Holiday", month=8, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Christmas Day", month=12, day=25, observance=next_monday),
+        Holiday("Boxing Day", month=12, day=26, observance=next_monday_or_tuesday),
+    ]
+
+
+CALENDARS: dict[str, AbstractHolidayCalendar] = {
+    "NYSE": NYSEHolidayCalendar(),
+    "LSE": LSEHolidayCalendar(),
+}
+
+
+def calendar_for_symbol(symbol: str) -> str:
+    return "LSE" if symbol.upper().endswith(".L") else "NYSE"
+
+
+@lru_cache(maxsize=64)
+def _sessions(calendar_name: str, start: datetime.date, end: datetime.date) -> pd.DatetimeIndex:
+    holidays = CALENDARS[calendar_name].holidays(start=start, end=end)
+    return pd.bdate_range(start=start, end=end, freq="C", holidays=holidays)
+
+
+def trading_days(calendar_name: str, start: datetime.date, end: datetime.date) -> pd.DatetimeIndex:
+    if end < start:
+        return pd.DatetimeIndex([])
+    return _sessions(calendar_name, start, end)
+
+
+__all__ = [
+    "CALENDARS",
+    "LSEHolidayCalendar",
+    "NYSEHolidayCalendar",
+    "calendar_for_symbol",
+    "trading_days",
+]
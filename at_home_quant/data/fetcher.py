@@ -1,12 +1,30 @@
 import datetime
-from typing import Sequence
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Mapping, Sequence
 
-import numpy as np
 import pandas as pd
-import yfinance as yf
 
+from at_home_quant.config.settings import get_settings
+from at_home_quant.data.cache import PriceCache, get_default_cache
+from at_home_quant.data.normalize import normalize_yfinance_prices
+from at_home_quant.data.providers import (
+    GeneratedProvider,
+    PriceProvider,
+    RateLimitError,
+    get_provider,
+)
+from at_home_quant.data.scheduler import FetchReport, FetchScheduler, get_default_scheduler
 from at_home_quant.data.tickers import TickerInfo
 
+logger = logging.getLogger(__name__)
+
+SymbolFetcher = Callable[..., pd.DataFrame]
+
+_POLL_INTERVAL_SECONDS = 0.05
+
 REQUIRED_COLUMNS = ["symbol", "date", "open", "high", "low", "close", "adj_close", "volume"]
 
 
@@ -32,36 +50,186 @@ def _normalize_df(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
 
 
 def _synthetic_prices(symbol: str, start: datetime.date | None, end: datetime.date | None) -> pd.DataFrame:
-    end_date = end or datetime.date.today()
-    start_date = start or end_date - datetime.timedelta(days=90)
-    dates = pd.bdate_range(start=start_date, end=end_date)
-    base = np.linspace(100, 110, num=len(dates))
-    data = pd.DataFrame(
-        {
-            "date": dates,
-            "open": base,
-            "high": base * 1.01,
-            "low": base * 0.99,
-            "close": base,
-            "adj_close": base,
-            "volume": np.random.randint(1_000, 10_000, size=len(dates)),
-            "symbol": symbol,
-        }
+    # Inclusive end to match the historical fallback behaviour; the provider's end is exclusive.
+    end_date = (end or datetime.date.today()) + datetime.timedelta(days=1)
+    frames = GeneratedProvider().download([symbol], start, end_date)
+    if symbol not in frames:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return _normalize_df(frames[symbol], symbol)
+
+
+def download_raw_history(
+    symbols: Sequence[str],
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    provider: PriceProvider | None = None,
+    cache: PriceCache | None = None,
+    use_cache: bool = True,
+    scheduler: FetchScheduler | None = None,
+    report: FetchReport | None = None,
+) -> dict[str, pd.DataFrame]:
+    """Download raw provider frames per symbol, serving already-cached date ranges from disk.
+
+    Only the ranges a symbol's cache does not cover are downloaded, batched across symbols that
+    miss the same range. Today's bar is never cached because it may still change intraday.
+    Providers that are not ``cacheable`` (local replay, generated data) bypass the cache.
+    Every provider request goes through ``scheduler`` (rate limit and retries), recording into ``report``.
+    """
+    provider = provider or get_provider()
+    scheduler = scheduler or get_default_scheduler()
+    if not symbols:
+        return {}
+
+    def _download(batch: Sequence[str], batch_start: datetime.date | None, batch_end: datetime.date | None):
+        call = partial(provider.download, batch, batch_start, batch_end)
+        return scheduler.run(batch, call, report, throttle=getattr(provider, "rate_limited", True))
+
+    use_cache = use_cache and provider.cacheable
+    if use_cache and cache is None:
+        cache = get_default_cache()
+    if not use_cache or cache is None or start is None:
+        return {symbol: frame for symbol, frame in _download(symbols, start, end).items() if not frame.empty}
+
+    # end is exclusive, as in yfinance; cached ranges are inclusive.
+    last_cacheable = datetime.date.today() - datetime.timedelta(days=1)
+    if end is not None:
+        last_cacheable = min(last_cacheable, end - datetime.timedelta(days=1))
+
+    symbols_by_range: dict[tuple, list[str]] = {}
+    for symbol in symbols:
+        for missing in cache.missing_ranges(symbol, start, last_cacheable):
+            symbols_by_range.setdefault(missing, []).append(symbol)
+    for (range_start, range_end), range_symbols in sorted(symbols_by_range.items()):
+        downloaded = _download(range_symbols, range_start, range_end + datetime.timedelta(days=1))
+        # An empty frame is a range the provider confirmed has no bars (holidays, before listing) and is
+        # cached like any other; symbols it left out failed and stay uncovered for the next request.
+        for symbol, frame in downloaded.items():
+            cache.write(symbol, range_start, range_end, frame)
+
+    tail: dict[str, pd.DataFrame] = {}
+    tail_start = max(start, last_cacheable + datetime.timedelta(days=1))
+    if end is None or tail_start < end:
+        tail = _download(symbols, tail_start, end)
+
+    frames: dict[str, pd.DataFrame] = {}
+    for symbol in symbols:
+        parts = [cache.read(symbol, start, last_cacheable)] if last_cacheable >= start else []
+        if symbol in tail:
+            parts.append(tail[symbol])
+        parts = [p for p in parts if not p.empty]
+        if not parts:
+            continue
+        combined = pd.concat(parts)
+        frames[symbol] = combined[~combined.index.duplicated(keep="last")].sort_index()
+    # Once per call rather than per segment touched, which made a run over N symbols quadratic.
+    cache.flush()
+    return frames
+
+
+def download_raw_frame(
+    symbols: Sequence[str],
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    provider: PriceProvider | None = None,
+    cache: PriceCache | None = None,
+    use_cache: bool = True,
+    scheduler: FetchScheduler | None = None,
+    report: FetchReport | None = None,
+) -> pd.DataFrame:
+    frames = download_raw_history(
+        symbols,
+        start=start,
+        end=end,
+        provider=provider,
+        cache=cache,
+        use_cache=use_cache,
+        scheduler=scheduler,
+        report=report,
     )
-    return data
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
 
 
-def fetch_price_history(symbol: str | TickerInfo, start: datetime.date | None = None, end: datetime.date | None = None) -> pd.DataFrame:
+def fetch_price_batch(
+    symbols: Sequence[str],
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    provider: PriceProvider | None = None,
+    batch_size: int | None = None,
+    scheduler: FetchScheduler | None = None,
+    report: FetchReport | None = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """Fetch symbols sharing one date window as multi-ticker downloads of up to ``batch_size`` symbols."""
+    settings = get_settings()
+    provider = provider or get_provider(settings=settings)
+    batch_size = batch_size or settings.fetch_batch_size
+    frames = []
+    for offset in range(0, len(symbols), batch_size):
+        batch = list(symbols[offset : offset + batch_size])
+        raw = download_raw_frame(
+            batch,
+            start=start,
+            end=end,
+            provider=provider,
+            use_cache=use_cache,
+            scheduler=scheduler,
+            report=report,
+        )
+        if not raw.empty:
+            frames.append(normalize_yfinance_prices(raw))
+    if not frames:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def fetch_price_history(
+    symbol: str | TickerInfo,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    provider: PriceProvider | None = None,
+    cache: PriceCache | None = None,
+    use_cache: bool = True,
+    synthetic_fallback: bool | None = None,
+    scheduler: FetchScheduler | None = None,
+    report: FetchReport | None = None,
+) -> pd.DataFrame:
     symbol_str = symbol.symbol if isinstance(symbol, TickerInfo) else symbol
-    data = yf.download(symbol_str, start=start, end=end, progress=False)
-    if data.empty:
-        data = _synthetic_prices(symbol_str, start, end)
-        return data
+    if synthetic_fallback is None:
+        synthetic_fallback = get_settings().synthetic_fallback
+    try:
+        data = download_raw_history(
+            [symbol_str],
+            start=start,
+            end=end,
+            provider=provider,
+            cache=cache,
+            use_cache=use_cache,
+            scheduler=scheduler,
+            report=report,
+        ).get(symbol_str)
+    except Exception as exc:  # noqa: BLE001 - provider errors vary by backend
+        # Throttling says nothing about whether the symbol has data, so never mask it with generated prices.
+        if not synthetic_fallback or isinstance(exc, RateLimitError):
+            raise
+        logger.warning("Price download for %s failed: %s", symbol_str, exc)
+        data = None
+    if data is None or data.empty:
+        if not synthetic_fallback:
+            return pd.DataFrame(columns=REQUIRED_COLUMNS)
+        logger.warning("No price data returned for %s; substituting generated prices", symbol_str)
+        return _synthetic_prices(symbol_str, start, end)
     normalized = _normalize_df(data, symbol_str)
     return normalized
 
 
-def compute_returns(df: pd.DataFrame) -> pd.DataFrame:
+def compute_returns(df: pd.DataFrame, previous_close: Mapping[str, float] | None = None) -> pd.DataFrame:
+    """Add daily close-to-close returns per symbol.
+
+    ``previous_close`` seeds each symbol's first row with the last close stored before the batch, so
+    incremental loads do not write a 0.0 return on their first new day. Unseeded first rows get 0.0.
+    """
     if df.empty:
         # ensure we return a DataFrame with the same columns plus an empty return_ column
         result = df.copy()
@@ -71,16 +239,103 @@ def compute_returns(df: pd.DataFrame) -> pd.DataFrame:
     result = df.copy()
     result["date"] = pd.to_datetime(result["date"])
     result = result.sort_values(["symbol", "date"])
-    result["return_"] = (
-        result.groupby("symbol")["close"].pct_change().fillna(0.0)
-    )
+    prior = result.groupby("symbol")["close"].shift(1)
+    if previous_close:
+        first_rows = ~result["symbol"].duplicated()
+        prior = prior.where(~first_rows, result["symbol"].map(previous_close))
+    result["return_"] = (result["close"] / prior - 1.0).fillna(0.0)
     return result
 
 
-def fetch_prices_for_universe(symbols: Sequence[str], start: datetime.date | None = None, end: datetime.date | None = None) -> pd.DataFrame:
-    frames = []
+def _fetch_serially(
+    fetch: SymbolFetcher,
+    symbols: Sequence[str],
+    start: datetime.date | None,
+    end: datetime.date | None,
+) -> dict[str, pd.DataFrame]:
+    frames: dict[str, pd.DataFrame] = {}
     for symbol in symbols:
-        frames.append(fetch_price_history(symbol, start=start, end=end))
+        try:
+            frames[symbol] = fetch(symbol, start=start, end=end)
+        except Exception as exc:  # noqa: BLE001 - one bad symbol must not abort the batch
+            logger.warning("Failed to fetch prices for %s: %s", symbol, exc)
+    return frames
+
+
+def _fetch_concurrently(
+    fetch: SymbolFetcher,
+    symbols: Sequence[str],
+    start: datetime.date | None,
+    end: datetime.date | None,
+    max_workers: int,
+    timeout: float | None,
+) -> dict[str, pd.DataFrame]:
+    frames: dict[str, pd.DataFrame] = {}
+    started_at: dict[str, float] = {}
+
+    def _run(symbol: str) -> pd.DataFrame:
+        started_at[symbol] = time.monotonic()
+        return fetch(symbol, start=start, end=end)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-fetch")
+    pending: dict[Future, str] = {executor.submit(_run, symbol): symbol for symbol in symbols}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=_POLL_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    frames[symbol] = future.result()
+                except Exception as exc:  # noqa: BLE001 - isolate per-symbol failures
+                    logger.warning("Failed to fetch prices for %s: %s", symbol, exc)
+            if timeout is None:
+                continue
+            # Timeouts are measured from when a worker picked the symbol up, not from submission,
+            # so queued symbols are not penalised for a slow pool. A timed-out download keeps its
+            # worker thread until the underlying call returns; its result is discarded.
+            now = time.monotonic()
+            for future, symbol in list(pending.items()):
+                began = started_at.get(symbol)
+                if began is not None and now - began > timeout:
+                    pending.pop(future)
+                    logger.warning("Timed out fetching prices for %s after %.1fs", symbol, timeout)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return frames
+
+
+def fetch_prices_for_universe(
+    symbols: Sequence[str],
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    max_workers: int | None = None,
+    timeout: float | None = None,
+    fetch_fn: SymbolFetcher | None = None,
+    provider: PriceProvider | None = None,
+    report: FetchReport | None = None,
+) -> pd.DataFrame:
+    """Fetch each symbol separately on a worker pool; failures are logged and their symbols dropped.
+
+    Pass ``report`` to collect request, retry and per-symbol failure counts for the run.
+    """
+    settings = get_settings()
+    workers = settings.fetch_max_workers if max_workers is None else max_workers
+    timeout = settings.fetch_timeout_seconds if timeout is None else timeout
+    # Universe loads feed the database, so a symbol without data is dropped rather than replaced
+    # with generated prices.
+    fetch = fetch_fn or partial(
+        fetch_price_history,
+        provider=provider or get_provider(settings=settings),
+        synthetic_fallback=False,
+        report=report,
+    )
+
+    if workers <= 1 or len(symbols) <= 1:
+        by_symbol = _fetch_serially(fetch, symbols, start, end)
+    else:
+        by_symbol = _fetch_concurrently(fetch, symbols, start, end, min(workers, len(symbols)), timeout)
+
+    frames = [by_symbol[symbol] for symbol in symbols if symbol in by_symbol and not by_symbol[symbol].empty]
     if not frames:
         return pd.DataFrame(columns=REQUIRED_COLUMNS)
     combined = pd.concat(frames, ignore_index=True)
@@ -90,6 +345,10 @@ def fetch_prices_for_universe(symbols: Sequence[str], start: datetime.date | Non
 
 __all__ = [
     "REQUIRED_COLUMNS",
+    "SymbolFetcher",
+    "download_raw_frame",
+    "download_raw_history",
+    "fetch_price_batch",
     "fetch_price_history",
     "fetch_prices_for_universe",
     "compute_returns",
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import datetime
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from at_home_quant.data.tickers import Universe
+from at_home_quant.db import crud
+from at_home_quant.db.models import Ticker, UniverseMembership
+
+
+@dataclass(frozen=True)
+class _Timeline:
+    starts: list[datetime.date]  # sorted dates at which membership changes
+    members: list[tuple[str, ...]]  # members[i] holds from starts[i] until starts[i + 1]
+
+
+def _timeline(intervals: pd.DataFrame) -> _Timeline:
+    joins: dict[datetime.date, list[str]] = {}
+    leaves: dict[datetime.date, list[str]] = {}
+    for symbol, valid_from, valid_to in zip(intervals["symbol"], intervals["valid_from"], intervals["valid_to"]):
+        joins.setdefault(valid_from, []).append(symbol)
+        if valid_to is not None and not pd.isna(valid_to):
+            leaves.setdefault(valid_to, []).append(symbol)
+    # Count rather than a set: overlapping intervals for one symbol must all end before it leaves.
+    active: dict[str, int] = {}
+    starts: list[datetime.date] = []
+    members: list[tuple[str, ...]] = []
+    for date in sorted(joins.keys() | leaves.keys()):
+        for symbol in leaves.get(date, []):
+            active[symbol] -= 1
+            if not active[symbol]:
+                del active[symbol]
+        for symbol in joins.get(date, []):
+            active[symbol] = active.get(symbol, 0) + 1
+        starts.append(date)
+        members.append(tuple(sorted(active)))
+    return _Timeline(starts, members)
+
+
+class UniverseIndex:
+    """In-memory interval index over ``universe_membership``.
+
+    Each universe's history is flattened into the dates its membership changes and the member tuple
+    that holds from each, so ``members(universe, date)`` is one binary search with no allocation.
+    """
+
+    def __init__(self, intervals: pd.DataFrame) -> None:
+        """``intervals`` has ``symbol, universe, valid_from, valid_to`` rows, ``valid_to`` exclusive."""
+        self._timelines: dict[Universe, _Timeline] = {
+            universe: _timeline(rows) for universe, rows in intervals.groupby("universe", sort=False)
+        }
+
+    @classmethod
+    def from_session(cls, session: Session) -> "UniverseIndex":
+        rows = session.execute(
+            select(
+                Ticker.symbol,
+                UniverseMembership.universe,
+                UniverseMembership.valid_from,
+                UniverseMembership.valid_to,
+            ).join(Ticker, Ticker.id == UniverseMembership.ticker_id)
+        ).all()
+        return cls(pd.DataFrame(rows, columns=["symbol", "universe", "valid_from", "valid_to"]))
+
+    def covers(self, universe: Universe) -> bool:
+        """Whether any membership history is recorded for ``universe``."""
+        return universe in self._timelines
+
+    def members(self, universe: Universe, as_of: datetime.date) -> tuple[str, ...]:
+        timeline = self._timelines.get(universe)
+        if timeline is None:
+            return ()
+        position = bisect_right(timeline.starts, as_of) - 1
+        return timeline.members[position] if position >= 0 else ()
+
+
+_cached_index: UniverseIndex | None = None
+_cached_key: tuple | None = None
+_cache_lock = threading.Lock()
+
+
+def get_universe_index(session: Session) -> UniverseIndex:
+    """Process-wide index, rebuilt when the membership table is reloaded or the database changes."""
+    global _cached_index, _cached_key
+    key = (str(session.get_bind().url), crud.membership_version(session))
+    with _cache_lock:
+        if _cached_index is None or _cached_key != key:
+            _cached_index = UniverseIndex.from_session(session)
+            _cached_key = key
+        return _cached_index
+
+
+__all__ = ["UniverseIndex", "get_universe_index"]
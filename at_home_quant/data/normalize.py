@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from at_home_quant.data.providers import RAW_FIELDS
+
+FIELD_MAP = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
+OUTPUT_COLUMNS = ["date", "symbol", "open", "high", "low", "close", "adj_close", "volume"]
+
+
+def _normalize_wide(df: pd.DataFrame) -> pd.DataFrame:
+    """Reshape a (symbol, field) column block into the long schema one field at a time.
+
+    A first pass over the fields finds the (symbol, date) cells that have any data; the second pass
+    writes each field straight into an output column of the final length. Only one field's block is
+    materialised at a time, so peak memory stays near input + output instead of the several full
+    copies ``stack`` makes.
+    """
+    ticker_level = 0 if set(df.columns.get_level_values(0)).isdisjoint(RAW_FIELDS) else df.columns.nlevels - 1
+    field_level = df.columns.nlevels - 1 if ticker_level == 0 else 0
+    tickers = df.columns.get_level_values(ticker_level)
+    field_names = df.columns.get_level_values(field_level)
+
+    symbols = np.array(sorted(set(tickers)), dtype=object)
+    fields = [f for f in FIELD_MAP if f in set(field_names)]
+    dates = pd.DatetimeIndex(df.index)
+    date_order = None if dates.is_monotonic_increasing else np.argsort(dates.asi8, kind="stable")
+    if date_order is not None:
+        dates = dates[date_order]
+
+    # Column position of every (symbol, field) pair, -1 where yfinance left the pair out.
+    slot = {symbol: i for i, symbol in enumerate(symbols)}
+    positions = {field: np.full(len(symbols), -1, dtype=np.intp) for field in fields}
+    for pos, (ticker, field) in enumerate(zip(tickers, field_names)):
+        if field in positions:
+            positions[field][slot[ticker]] = pos
+
+    def field_grid(field: str) -> np.ndarray:
+        """``field`` as a symbols x dates array in output order."""
+        grid = np.full((len(symbols), len(dates)), np.nan)
+        present = np.flatnonzero(positions[field] >= 0)
+        if present.size:
+            block = df.iloc[:, positions[field][present]].to_numpy(dtype=np.float64)
+            grid[present] = (block if date_order is None else block[date_order]).T
+        return grid
+
+    valid = np.zeros((len(symbols), len(dates)), dtype=bool)
+    for field in fields:
+        valid |= ~np.isnan(field_grid(field))
+
+    symbol_idx, date_idx = np.nonzero(valid)
+    data = {"date": dates.take(date_idx), "symbol": symbols.take(symbol_idx)}
+    del symbol_idx, date_idx
+    for field in fields:
+        data[FIELD_MAP[field]] = field_grid(field)[valid]
+    if "adj_close" in data:
+        data["close"] = data["adj_close"]
+    return pd.DataFrame({col: data[col] for col in OUTPUT_COLUMNS if col in data}, copy=False)
+
+
+def normalize_yfinance_prices(df: pd.DataFrame, symbol: str | None = None) -> pd.DataFrame:
+    """
+    Normalize yfinance download output to a flat DataFrame with columns:
+    date, open, high, low, close, adj_close, volume, symbol.
+
+    Handles both single-ticker and multi-ticker MultiIndex formats, with either the ticker or the
+    field as the outer column level.
+    """
+
+    if df.empty:
+        return df
+
+    if isinstance(df.columns, pd.MultiIndex):
+        return _normalize_wide(df)
+
+    stacked = df.reset_index().rename(columns={"Date": "date"}).copy()
+    stacked["symbol"] = stacked.get("symbol", symbol or "")
+
+    available = {key: value for key, value in FIELD_MAP.items() if key in stacked.columns}
+    normalized = stacked.rename(columns=available)
+
+    if "adj_close" in normalized.columns:
+        normalized["close"] = normalized["adj_close"]
+
+    if "date" in normalized.columns:
+        normalized["date"] = pd.to_datetime(normalized["date"])
+
+    columns = [col for col in OUTPUT_COLUMNS if col in normalized.columns]
+    normalized = normalized[columns]
+
+    normalized = normalized.sort_values(["symbol", "date"]).reset_index(drop=True)
+    return normalized
+
+
+__all__ = ["FIELD_MAP", "OUTPUT_COLUMNS", "normalize_yfinance_prices"]
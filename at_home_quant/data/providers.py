@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+import threading
+from pathlib import Path
+from typing import Protocol, Sequence, runtime_checkable
+
+import numpy as np
+import pandas as pd
+
+from at_home_quant.config.settings import Settings, get_settings
+from at_home_quant.data.cache import FRAME_SUFFIX, read_frame, write_frame
+
+RAW_FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+class PriceProviderError(RuntimeError):
+    """A transient provider failure worth retrying."""
+
+
+class RateLimitError(PriceProviderError):
+    """The provider throttled the request; ``retry_after`` is its suggested wait in seconds, if known."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@runtime_checkable
+class PriceProvider(Protocol):
+    """Source of raw daily bars.
+
+    ``download`` returns one frame per symbol, indexed by a ``Date`` DatetimeIndex with yfinance-style
+    ``RAW_FIELDS`` columns. ``end`` is exclusive, as in ``yfinance.download``. An empty frame means the
+    provider confirmed the symbol has no bars in the range; symbols it could not fetch are left out.
+    ``cacheable`` tells the fetch layer whether responses are worth keeping in the raw download cache;
+    ``rate_limited`` whether requests count against the shared fetch rate limit.
+    """
+
+    name: str
+    cacheable: bool
+    rate_limited: bool
+
+    def download(
+        self, symbols: Sequence[str], start: datetime.date | None, end: datetime.date | None
+    ) -> dict[str, pd.DataFrame]:
+        ...
+
+
+def split_raw_by_symbol(raw: pd.DataFrame, symbols: Sequence[str]) -> dict[str, pd.DataFrame]:
+    if raw is None or raw.empty:
+        return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {symbols[0]: raw.dropna(how="all")} if len(symbols) == 1 else {}
+
+    # yfinance puts tickers first with group_by="ticker" and fields first otherwise.
+    ticker_level = 0 if set(raw.columns.get_level_values(0)).isdisjoint(RAW_FIELDS) else 1
+    available = set(raw.columns.get_level_values(ticker_level))
+    frames: dict[str, pd.DataFrame] = {}
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+        frame = raw.xs(symbol, axis=1, level=ticker_level).dropna(how="all")
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
+
+def _empty_raw_frame() -> pd.DataFrame:
+    return pd.DataFrame(columns=RAW_FIELDS, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+
+def _confirms_no_data(message: str) -> bool:
+    """Whether a yfinance error says the range has no bars, as opposed to the request failing."""
+    message = message.lower()
+    if "status_code" in message:
+        return False
+    return any(text in message for text in ("no price data found", "no data found", "data doesn't exist"))
+
+
+def _slice_dates(frame: pd.DataFrame, start: datetime.date | None, end: datetime.date | None) -> pd.DataFrame:
+    mask = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        mask &= frame.index >= pd.Timestamp(start)
+    if end is not None:
+        mask &= frame.index < pd.Timestamp(end)
+    return frame.loc[mask]
+
+
+def _naive_daily_index(frame: pd.DataFrame) -> pd.DataFrame:
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame = frame.copy()
+    frame.index = index.normalize().rename("Date")
+    return frame
+
+
+class YFinanceProvider:
+    name = "yfinance"
+    cacheable = True
+    rate_limited = True
+
+    # yf.download keeps per-call state in module globals, so concurrent calls must not overlap.
+    # Single symbols go through Ticker.history instead, which is safe to run from worker threads.
+    _download_lock = threading.Lock()
+
+    def download(
+        self, symbols: Sequence[str], start: datetime.date | None, end: datetime.date | None
+    ) -> dict[str, pd.DataFrame]:
+        import yfinance as yf
+        from yfinance.exceptions import YFPricesMissingError, YFRateLimitError
+
+        errors: dict[str, object] = {}
+        if len(symbols) == 1:
+            try:
+                history = yf.Ticker(symbols[0]).history(start=start, end=end, auto_adjust=False)
+            except YFRateLimitError as exc:
+                raise RateLimitError(str(exc)) from exc
+            except YFPricesMissingError as exc:
+                errors[symbols[0]] = exc
+                history = _empty_raw_frame()
+            raw = history[[c for c in RAW_FIELDS if c in history.columns]]
+        else:
+            with self._download_lock:
+                raw = yf.download(
+                    tickers=" ".join(symbols),
+                    start=start,
+                    end=end,
+                    group_by="ticker",
+                    auto_adjust=False,
+                    progress=False,
+                )
+                # yf.download logs per-ticker failures instead of raising; a throttled batch would
+                # otherwise look like symbols without data.
+                errors = dict(yf.shared._ERRORS)
+            throttled = [s for s, message in errors.items() if "rate limit" in str(message).lower()]
+            if throttled:
+                raise RateLimitError(f"Rate limited downloading {len(throttled)} of {len(symbols)} symbols")
+        frames = {s: _naive_daily_index(frame) for s, frame in split_raw_by_symbol(raw, symbols).items()}
+        # Timeouts and HTTP errors are logged and dropped like "no data", so a symbol without bars only
+        # gets an empty frame when yfinance said so; the rest count as failed and are fetched again.
+        for symbol, message in errors.items():
+            if symbol not in frames and _confirms_no_data(str(message)):
+                frames[symbol] = _empty_raw_frame()
+        return frames
+
+
+class GeneratedProvider:
+    """Deterministic synthetic bars: a seeded random walk per symbol on business days."""
+
+    name = "generated"
+    cacheable = False
+    rate_limited = False
+
+    def __init__(
+        self,
+        seed: int = 0,
+        drift: float = 0.0003,
+        volatility: float = 0.015,
+        default_lookback_days: int = 90,
+    ) -> None:
+        self.seed = seed
+        self.drift = drift
+        self.volatility = volatility
+        self.default_lookback_days = default_lookback_days
+
+    def _rng(self, symbol: str) -> np.random.Generator:
+        digest = hashlib.sha1(f"{self.seed}|{symbol}".encode()).digest()
+        return np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+    def generate(self, symbol: str, start: datetime.date | None, end: datetime.date | None) -> pd.DataFrame:
+        end_date = end or datetime.date.today() + datetime.timedelta(days=1)
+        start_date = start or end_date - datetime.timedelta(days=self.default_lookback_days)
+        dates = pd.bdate_range(start=start_date, end=end_date - datetime.timedelta(days=1), name="Date")
+        rng = self._rng(symbol)
+        log_returns = rng.normal(self.drift, self.volatility, size=len(dates))
+        close = 100.0 * np.exp(np.cumsum(log_returns))
+        spread = np.abs(rng.normal(0.0, self.volatility / 2, size=len(dates)))
+        return pd.DataFrame(
+            {
+                "Open": close * (1 - spread / 2),
+                "High": close * (1 + spread),
+                "Low": close * (1 - spread),
+                "Close": close,
+                "Adj Close": close,
+                "Volume": rng.integers(1_000, 10_000, size=len(dates)).astype(float),
+            },
+            index=dates,
+        )
+
+    def download(
+        self, symbols: Sequence[str], start: datetime.date | None, end: datetime.date | None
+    ) -> dict[str, pd.DataFrame]:
+        frames = {symbol: self.generate(symbol, start, end) for symbol in symbols}
+        return {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+
+
+class ReplayProvider:
+    """Serves previously recorded raw frames from one file per symbol under ``root``."""
+
+    name = "replay"
+    cacheable = False
+    rate_limited = False
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+
+    def _path(self, symbol: str) -> Path:
+        return self.root / f"{symbol}{FRAME_SUFFIX}"
+
+    def symbols(self) -> list[str]:
+        return sorted(p.name[: -len(FRAME_SUFFIX)] for p in self.root.glob(f"*{FRAME_SUFFIX}"))
+
+    def record(self, symbol: str, frame: pd.DataFrame) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        write_frame(self._path(symbol), frame)
+
+    def record_from(
+        self,
+        source: PriceProvider,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> list[str]:
+        downloaded = source.download(symbols, start, end)
+        frames = {symbol: frame for symbol, frame in downloaded.items() if not frame.empty}
+        for symbol, frame in frames.items():
+            self.record(symbol, frame)
+        return sorted(frames)
+
+    def download(
+        self, symbols: Sequence[str], start: datetime.date | None, end: datetime.date | None
+    ) -> dict[str, pd.DataFrame]:
+        frames: dict[str, pd.DataFrame] = {}
+        for symbol in symbols:
+            path = self._path(symbol)
+            if not path.exists():
+                continue
+            frame = _slice_dates(read_frame(path), start, end)
+            if not frame.empty:
+                frames[symbol] = frame
+        return frames
+
+
+def get_provider(name: str | None = None, settings: Settings | None = None) -> PriceProvider:
+    settings = settings or get_settings()
+    name = name or settings.price_provider
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "replay":
+        return ReplayProvider(settings.replay_dir)
+    if name == "generated":
+        return GeneratedProvider(seed=settings.generated_seed)
+    raise ValueError(f"Unknown price provider: {name}")
+
+
+__all__ = [
+    "GeneratedProvider",
+    "PriceProvider",
+    "PriceProviderError",
+    "RAW_FIELDS",
+    "RateLimitError",
+    "ReplayProvider",
+    "YFinanceProvider",
+    "get_provider",
+    "split_raw_by_symbol",
+]
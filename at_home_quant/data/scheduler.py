@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Sequence, TypeVar
+
+from at_home_quant.config.settings import Settings, get_settings
+from at_home_quant.data.providers import PriceProviderError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors a later attempt can plausibly get past. Anything else (bad symbol, parsing bug) fails at once.
+RETRYABLE_ERRORS: tuple[type[BaseException], ...] = (PriceProviderError, ConnectionError, TimeoutError)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests per second on average, bursts up to ``capacity``."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - max(self._updated, self._paused_until))
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = max(now, self._updated)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available and take them; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                # Tolerance keeps float rounding in the refill from spinning on a vanishing shortfall.
+                if now >= self._paused_until and self._tokens >= tokens - 1e-9:
+                    self._tokens = max(0.0, self._tokens - tokens)
+                    return waited
+                delay = max(self._paused_until - now, (tokens - self._tokens) / self.rate)
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for ``seconds``, e.g. after the provider signalled throttling."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, now + seconds)
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    jitter: float = 0.5  # fraction of each delay that is randomised
+
+    def backoff(self, attempt: int, rng: random.Random) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1.0 - self.jitter * rng.random())
+
+
+@dataclass
+class SymbolFailure:
+    symbol: str
+    attempts: int
+    error: str
+    throttled: bool = False
+
+
+@dataclass
+class FetchReport:
+    """Per-run account of provider traffic; safe to share between fetch threads."""
+
+    requests: int = 0
+    retries: int = 0
+    throttled: int = 0
+    wait_seconds: float = 0.0
+    attempts: dict[str, int] = field(default_factory=dict)
+    failures: dict[str, SymbolFailure] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def _record_attempt(self, symbols: Sequence[str], waited: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.wait_seconds += waited
+            for symbol in symbols:
+                self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+
+    def _record_error(self, retrying: bool, throttled: bool) -> None:
+        with self._lock:
+            self.retries += int(retrying)
+            self.throttled += int(throttled)
+
+    def _record_failure(self, symbols: Sequence[str], exc: BaseException) -> None:
+        throttled = isinstance(exc, RateLimitError)
+        with self._lock:
+            for symbol in symbols:
+                self.failures[symbol] = SymbolFailure(symbol, self.attempts.get(symbol, 0), str(exc), throttled)
+
+    @property
+    def failed_symbols(self) -> list[str]:
+        return sorted(self.failures)
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests} requests, {self.retries} retries, {self.throttled} throttled, "
+            f"{self.wait_seconds:.1f}s rate-limit wait, {len(self.failures)} symbols failed"
+        )
+
+
+class FetchScheduler:
+    """Runs provider calls under a shared rate limit, retrying transient failures with backoff.
+
+    Every attempt is charged to each symbol in the call; a call is retried only while all of its
+    symbols are within ``policy.max_attempts`` for the run's report. Throttling pauses the shared
+    bucket so concurrent workers back off together instead of hammering the provider.
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket | None = None,
+        policy: RetryPolicy | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        seed: int | None = None,
+    ) -> None:
+        self.bucket = bucket
+        self.policy = policy or RetryPolicy()
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _delay(self, attempt: int, exc: BaseException) -> float:
+        with self._rng_lock:
+            delay = self.policy.backoff(attempt, self._rng)
+        if isinstance(exc, RateLimitError) and exc.retry_after:
+            delay = max(delay, exc.retry_after)
+        return delay
+
+    def run(
+        self,
+        symbols: Sequence[str],
+        call: Callable[[], T],
+        report: FetchReport | None = None,
+        throttle: bool = True,
+    ) -> T:
+        report = report if report is not None else FetchReport()
+        bucket = self.bucket if throttle else None
+        attempt = 0
+        while True:
+            attempt += 1
+            waited = bucket.acquire() if bucket is not None else 0.0
+            report._record_attempt(symbols, waited)
+            try:
+                result = call()
+            except RETRYABLE_ERRORS as exc:
+                throttled = isinstance(exc, RateLimitError)
+                budget_left = all(report.attempts[s] < self.policy.max_attempts for s in symbols)
+                report._record_error(retrying=budget_left, throttled=throttled)
+                if not budget_left:
+                    report._record_failure(symbols, exc)
+                    raise
+                delay = self._delay(attempt, exc)
+                logger.info("Retrying %d symbols in %.1fs after %s", len(symbols), delay, exc)
+                if throttled and bucket is not None:
+                    bucket.pause(delay)
+                self._sleep(delay)
+                continue
+            except Exception as exc:
+                report._record_failure(symbols, exc)
+                raise
+            return result
+
+
+def build_scheduler(settings: Settings | None = None) -> FetchScheduler:
+    settings = settings or get_settings()
+    bucket = None
+    if settings.fetch_rate_per_second > 0:
+        bucket = TokenBucket(settings.fetch_rate_per_second, max(1, settings.fetch_burst))
+    policy = RetryPolicy(
+        max_attempts=max(1, settings.fetch_max_attempts),
+        base_delay=settings.fetch_backoff_base_seconds,
+        max_delay=settings.fetch_backoff_max_seconds,
+    )
+    return FetchScheduler(bucket, policy)
+
+
+_default_scheduler: FetchScheduler | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_scheduler() -> FetchScheduler:
+    """Process-wide scheduler, so every fetch path shares one rate limit."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = build_scheduler()
+        return _default_scheduler
+
+
+__all__ = [
+    "FetchReport",
+    "FetchScheduler",
+    "RETRYABLE_ERRORS",
+    "RetryPolicy",
+    "SymbolFailure",
+    "TokenBucket",
+    "build_scheduler",
+    "get_default_scheduler",
+]
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import datetime
+import importlib.util
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Protocol, Sequence
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from at_home_quant.config.settings import Settings, get_settings
+from at_home_quant.db import crud
+from at_home_quant.db.models import PriceDaily, Ticker
+
+logger = logging.getLogger(__name__)
+
+# The Parquet store is optional and pyarrow is slow to import, so it is only loaded by ParquetPriceStore.
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+pa = ds = pq = None
+
+
+def _import_pyarrow() -> None:
+    global pa, ds, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+
+        pa, ds, pq = pyarrow, pyarrow.dataset, pyarrow.parquet
+
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "adj_close", "volume", "return_"]
+PARTITION_KEYS = ("symbol", "year")
+
+_QUERY_CHUNK_SIZE = 500
+_ROW_GROUP_ROWS = 65_536
+_DATA_FILE = "data.parquet"
+
+
+class PriceStore(Protocol):
+    """Read/write access to stored daily prices.
+
+    ``load_frame`` returns long rows ``symbol, date, *columns`` sorted by symbol then date, with
+    ``datetime.date`` values in ``date``; bounds are inclusive. ``prices_as_of`` resolves a whole
+    grid at once: a dates x symbols matrix of the last non-null value on or before each date, NaN
+    where a symbol has none. ``load_month_end`` returns ``symbol, month, date, adj_close`` rows for
+    each month's last trading day, ``month`` formatted ``YYYY-MM``.
+    """
+
+    name: str
+
+    def load_frame(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        columns: Sequence[str] = ("adj_close",),
+    ) -> pd.DataFrame: ...
+
+    def load_series(
+        self,
+        symbol: str,
+        end: datetime.date | None = None,
+        start: datetime.date | None = None,
+        column: str = "adj_close",
+    ) -> pd.Series: ...
+
+    def price_on_or_before(
+        self, symbol: str, as_of: datetime.date, column: str = "adj_close"
+    ) -> float | None: ...
+
+    def prices_as_of(
+        self, symbols: Sequence[str], dates: Sequence[datetime.date], column: str = "adj_close"
+    ) -> pd.DataFrame: ...
+
+    def load_month_end(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> pd.DataFrame: ...
+
+    def write(self, prices: pd.DataFrame) -> int: ...
+
+
+def _check_columns(columns: Sequence[str]) -> list[str]:
+    unknown = set(columns) - set(PRICE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown price columns: {sorted(unknown)}")
+    return list(columns)
+
+
+def _empty_frame(columns: Sequence[str]) -> pd.DataFrame:
+    return pd.DataFrame(columns=["symbol", "date", *columns])
+
+
+def _series(frame: pd.DataFrame, column: str) -> pd.Series:
+    if frame.empty:
+        return pd.Series(dtype=float)
+    return frame.set_index("date")[column]
+
+
+def _empty_matrix(symbols: Sequence[str], dates: Sequence[datetime.date]) -> pd.DataFrame:
+    return pd.DataFrame(
+        np.nan,
+        index=pd.Index(list(dates), name="date", dtype=object),
+        columns=pd.Index(list(symbols), name="symbol", dtype=object),
+    )
+
+
+def as_of_matrix(
+    frame: pd.DataFrame, symbols: Sequence[str], dates: Sequence[datetime.date], column: str = "adj_close"
+) -> pd.DataFrame:
+    """Dates x symbols matrix of the last non-null ``column`` on or before each date in a long panel."""
+    dates = list(dict.fromkeys(dates))
+    matrix = _empty_matrix(dict.fromkeys(symbols), dates)
+    if frame.empty or not dates:
+        return matrix
+    targets = np.array(dates, dtype="datetime64[D]")
+    panel = frame.loc[frame[column].notna(), ["symbol", "date", column]]
+    for symbol, rows in panel.groupby("symbol", sort=False):
+        if symbol not in matrix.columns:
+            continue
+        rows = rows.sort_values("date", kind="stable")
+        positions = np.searchsorted(np.array(rows["date"], dtype="datetime64[D]"), targets, side="right") - 1
+        values = rows[column].to_numpy(dtype=float)[np.maximum(positions, 0)]
+        matrix[symbol] = np.where(positions >= 0, values, np.nan)
+    return matrix
+
+
+class SqlPriceStore:
+    """Prices in ``prices_daily``, read and written through ``session``."""
+
+    name = "sql"
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def load_frame(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        columns: Sequence[str] = ("adj_close",),
+    ) -> pd.DataFrame:
+        columns = _check_columns(columns)
+        rows = []
+        symbols = list(symbols)
+        for offset in range(0, len(symbols), _QUERY_CHUNK_SIZE):
+            stmt = (
+                select(Ticker.symbol, PriceDaily.date, *(getattr(PriceDaily, c) for c in columns))
+                .join(Ticker, Ticker.id == PriceDaily.ticker_id)
+                .where(Ticker.symbol.in_(symbols[offset : offset + _QUERY_CHUNK_SIZE]))
+            )
+            if start is not None:
+                stmt = stmt.where(PriceDaily.date >= start)
+            if end is not None:
+                stmt = stmt.where(PriceDaily.date <= end)
+            rows.extend(self.session.execute(stmt.order_by(Ticker.symbol, PriceDaily.date)).all())
+        if not rows:
+            return _empty_frame(columns)
+        return pd.DataFrame(rows, columns=["symbol", "date", *columns])
+
+    def load_series(
+        self,
+        symbol: str,
+        end: datetime.date | None = None,
+        start: datetime.date | None = None,
+        column: str = "adj_close",
+    ) -> pd.Series:
+        return _series(self.load_frame([symbol], start=start, end=end, columns=[column]), column)
+
+    def price_on_or_before(self, symbol: str, as_of: datetime.date, column: str = "adj_close") -> float | None:
+        value = self.session.execute(
+            select(getattr(PriceDaily, _check_columns([column])[0]))
+            .join(Ticker, Ticker.id == PriceDaily.ticker_id)
+            .where(Ticker.symbol == symbol, PriceDaily.date <= as_of)
+            .order_by(PriceDaily.date.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        return None if value is None else float(value)
+
+    def prices_as_of(
+        self, symbols: Sequence[str], dates: Sequence[datetime.date], column: str = "adj_close"
+    ) -> pd.DataFrame:
+        column = _check_columns([column])[0]
+        dates = list(dict.fromkeys(dates))
+        matrix = _empty_matrix(dict.fromkeys(symbols), dates)
+        if matrix.empty:
+            return matrix
+        # One statement for the whole grid: each cell is a single descending seek on the clustered
+        # (ticker_id, date) key rather than a round trip per symbol and date.
+        daily = f"""(
+            SELECT p.{column} FROM prices_daily AS p
+            WHERE p.ticker_id = t.id AND p.date <= g.date AND p.{column} IS NOT NULL
+            ORDER BY p.date DESC LIMIT 1
+        )"""
+        if column == "adj_close":
+            # A date on or after its month's last trading day is answered by the month-end row.
+            daily = f"""COALESCE((
+                SELECT m.adj_close FROM prices_month_end AS m
+                WHERE m.ticker_id = t.id AND m.month = strftime('%Y-%m', g.date) AND m.date <= g.date
+            ), {daily})"""
+        rows = self.session.execute(
+            text(
+                f"""
+                WITH grid_dates(date) AS (SELECT value FROM json_each(:dates))
+                SELECT g.date, t.symbol, {daily} AS value
+                FROM grid_dates AS g CROSS JOIN tickers AS t
+                WHERE t.symbol IN (SELECT value FROM json_each(:symbols))
+                """
+            ),
+            {
+                "dates": json.dumps([d.isoformat() for d in dates]),
+                "symbols": json.dumps(list(matrix.columns)),
+            },
+        ).all()
+        by_iso = {d.isoformat(): d for d in dates}
+        for iso_date, symbol, value in rows:
+            if value is not None:
+                matrix.at[by_iso[iso_date], symbol] = float(value)
+        return matrix
+
+    def load_month_end(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> pd.DataFrame:
+        return crud.month_end_prices(self.session, symbols, start=start, end=end)
+
+    def write(self, prices: pd.DataFrame) -> int:
+        stats = crud.upsert_prices(self.session, prices)
+        return stats.inserted + stats.updated
+
+
+class ParquetPriceStore:
+    """Prices in a hive-partitioned Parquet dataset under ``root``.
+
+    ``partition_by="symbol"`` keeps one file per symbol, which suits per-symbol history reads;
+    ``"year"`` keeps one file per calendar year sorted by symbol, which suits cross-sectional reads.
+    Reads select only the requested columns and push the symbol and date bounds down to partition and
+    row-group pruning. Writes merge into the touched partitions, newest rows winning.
+    """
+
+    name = "parquet"
+
+    def __init__(self, root: Path | str, partition_by: str = "symbol") -> None:
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("ParquetPriceStore requires pyarrow")
+        _import_pyarrow()
+        if partition_by not in PARTITION_KEYS:
+            raise ValueError(f"partition_by must be one of {PARTITION_KEYS}, got {partition_by!r}")
+        self.root = Path(root)
+        self.partition_by = partition_by
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _file_schema(self) -> "pa.Schema":
+        fields = [("date", pa.date32())] + [(column, pa.float64()) for column in PRICE_COLUMNS]
+        if self.partition_by == "year":
+            fields.insert(0, ("symbol", pa.string()))
+        return pa.schema(fields)
+
+    def _partitioning(self) -> "ds.Partitioning":
+        key_type = pa.string() if self.partition_by == "symbol" else pa.int32()
+        return ds.partitioning(pa.schema([(self.partition_by, key_type)]), flavor="hive")
+
+    def _partition_path(self, value: object) -> Path:
+        return self.root / f"{self.partition_by}={quote(str(value), safe='')}" / _DATA_FILE
+
+    def load_frame(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        columns: Sequence[str] = ("adj_close",),
+    ) -> pd.DataFrame:
+        columns = _check_columns(columns)
+        if not any(self.root.glob(f"*/{_DATA_FILE}")):
+            return _empty_frame(columns)
+        dataset = ds.dataset(self.root, format="parquet", partitioning=self._partitioning())
+        condition = ds.field("symbol").isin(list(symbols))
+        if start is not None:
+            condition &= ds.field("date") >= pa.scalar(start, pa.date32())
+        if end is not None:
+            condition &= ds.field("date") <= pa.scalar(end, pa.date32())
+        if self.partition_by == "year":
+            if start is not None:
+                condition &= ds.field("year") >= start.year
+            if end is not None:
+                condition &= ds.field("year") <= end.year
+        table = dataset.to_table(columns=["symbol", "date", *columns], filter=condition)
+        if table.num_rows == 0:
+            return _empty_frame(columns)
+        frame = table.to_pandas(date_as_object=True)
+        return frame.sort_values(["symbol", "date"], kind="stable").reset_index(drop=True)
+
+    def load_series(
+        self,
+        symbol: str,
+        end: datetime.date | None = None,
+        start: datetime.date | None = None,
+        column: str = "adj_close",
+    ) -> pd.Series:
+        return _series(self.load_frame([symbol], start=start, end=end, columns=[column]), column)
+
+    def price_on_or_before(self, symbol: str, as_of: datetime.date, column: str = "adj_close") -> float | None:
+        series = self.load_series(symbol, end=as_of, column=column).dropna()
+        return None if series.empty else float(series.iloc[-1])
+
+    def prices_as_of(
+        self, symbols: Sequence[str], dates: Sequence[datetime.date], column: str = "adj_close"
+    ) -> pd.DataFrame:
+        dates = list(dates)
+        if not dates:
+            return _empty_matrix(dict.fromkeys(symbols), dates)
+        frame = self.load_frame(symbols, end=max(dates), columns=[column])
+        return as_of_matrix(frame, symbols, dates, column)
+
+    def load_month_end(
+        self,
+        symbols: Sequence[str],
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> pd.DataFrame:
+        # Derived on read rather than materialised. The read runs to the end of ``end``'s month so a
+        # month whose last trading day falls after ``end`` is left out, as in the SQL table.
+        month_end = None if end is None else (pd.Timestamp(end) + pd.offsets.MonthEnd(0)).date()
+        frame = self.load_frame(symbols, start=start, end=month_end).dropna(subset=["adj_close"])
+        if frame.empty:
+            return pd.DataFrame(columns=["symbol", "month", "date", "adj_close"])
+        frame["month"] = pd.to_datetime(frame["date"]).dt.strftime("%Y-%m")
+        last = frame.groupby(["symbol", "month"], sort=False).tail(1)
+        if end is not None:
+            last = last[last["date"] <= end]
+        return last[["symbol", "month", "date", "adj_close"]].reset_index(drop=True)
+
+    def write(self, prices: pd.DataFrame) -> int:
+        if prices.empty:
+            return 0
+        frame = prices.reindex(columns=["symbol", "date", *PRICE_COLUMNS]).copy()
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        frame[PRICE_COLUMNS] = frame[PRICE_COLUMNS].astype(float)
+        keys = frame["symbol"] if self.partition_by == "symbol" else pd.to_datetime(frame["date"]).dt.year
+        schema = self._file_schema()
+        for value, part in frame.groupby(keys, sort=True):
+            path = self._partition_path(value)
+            if path.exists():
+                existing = pq.read_table(path).to_pandas(date_as_object=True)
+                if self.partition_by == "symbol":
+                    existing.insert(0, "symbol", value)
+                part = pd.concat([existing, part], ignore_index=True)
+            part = part.drop_duplicates(["symbol", "date"], keep="last").sort_values(["symbol", "date"])
+            table = pa.Table.from_pandas(part[schema.names], schema=schema, preserve_index=False)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write beside the partition and swap it in, so readers never see a half-written file.
+            tmp_path = path.with_suffix(".tmp")
+            pq.write_table(table, tmp_path, compression="zstd", row_group_size=_ROW_GROUP_ROWS)
+            os.replace(tmp_path, path)
+        return len(frame)
+
+
+def parquet_store_from_settings(settings: Settings | None = None) -> ParquetPriceStore:
+    settings = settings or get_settings()
+    return ParquetPriceStore(settings.parquet_store_dir, partition_by=settings.parquet_partition_by)
+
+
+def get_price_store(session: Session, settings: Settings | None = None) -> PriceStore:
+    """The store analytics read from, per ``PRICE_STORE``; SQL reads go through ``session``."""
+    settings = settings or get_settings()
+    if settings.price_store == "parquet":
+        return parquet_store_from_settings(settings)
+    if settings.price_store != "sql":
+        raise ValueError(f"Unknown price store {settings.price_store!r}; expected 'sql' or 'parquet'")
+    return SqlPriceStore(session)
+
+
+def get_mirror_store(settings: Settings | None = None) -> ParquetPriceStore | None:
+    """The Parquet store the ETL writes alongside ``prices_daily``, if dual-writing is enabled."""
+    settings = settings or get_settings()
+    if settings.parquet_dual_write or settings.price_store == "parquet":
+        return parquet_store_from_settings(settings)
+    return None
+
+
+__all__ = [
+    "PARTITION_KEYS",
+    "PYARROW_AVAILABLE",
+    "PRICE_COLUMNS",
+    "ParquetPriceStore",
+    "PriceStore",
+    "SqlPriceStore",
+    "as_of_matrix",
+    "get_mirror_store",
+    "get_price_store",
+    "parquet_store_from_settings",
+]
@@ -1,13 +1,30 @@
 import datetime
+import logging
+import time
+from dataclasses import dataclass, field
 from typing import Iterable, Mapping, Sequence
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import bindparam, delete, func, select, text
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from at_home_quant.data.tickers import ALL_TICKERS, TickerInfo
-from at_home_quant.db.models import PriceDaily, Ticker
+from at_home_quant.data.tickers import ALL_TICKERS, TickerInfo, TickerType, Universe
+from at_home_quant.db.models import (
+    LoadCheckpoint,
+    PortfolioPosition,
+    PortfolioSnapshot,
+    PriceAdjustment,
+    PriceDaily,
+    PriceGap,
+    PriceMonthEnd,
+    Ticker,
+    TickerWatermark,
+    UniverseMembership,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def upsert_tickers(session: Session, tickers: Mapping[str, TickerInfo] | Iterable[TickerInfo]) -> None:
@@ -40,15 +57,73 @@ def _ticker_symbol_to_id(session: Session, symbols: Sequence[str]) -> dict[str,
     return {row.symbol: row.id for row in rows}
 
 
-def upsert_prices(session: Session, price_df: pd.DataFrame) -> None:
-    if price_df.empty:
-        return
+# SQLite's compile-time default before 3.32; newer builds allow more, so this is always safe.
+SQLITE_MAX_VARIABLES = 999
+UPSERT_CHUNK_ROWS = 50_000
+# Keeps bound parameters per statement well under SQLite's variable limit.
+_LOOKUP_CHUNK_SIZE = 500
+
+_PRICE_VALUE_COLUMNS = ["open", "high", "low", "close", "adj_close", "volume", "return_"]
+_PRICE_INSERT_COLUMNS = ["ticker_id", "date", *_PRICE_VALUE_COLUMNS]
+
+
+@dataclass
+class UpsertStats:
+    rows: int = 0  # rows sent to the database
+    chunks: int = 0
+    seconds: float = 0.0
+    chunk_seconds: list[float] = field(default_factory=list)
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0  # incoming rows identical to what is already stored
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
 
-    required_cols = {"date", "symbol", "close"}
-    missing_cols = required_cols - set(price_df.columns)
-    if missing_cols:
-        raise ValueError(f"Missing required price columns: {missing_cols}")
 
+_PRICE_CONFLICT_CLAUSE = (
+    "ON CONFLICT (ticker_id, date) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _PRICE_VALUE_COLUMNS)
+    # Identical rows are left alone, so re-syncing an unchanged window dirties no pages.
+    + " WHERE "
+    + " OR ".join(f"prices_daily.{col} IS NOT excluded.{col}" for col in _PRICE_VALUE_COLUMNS)
+)
+
+
+def _price_insert_sql(table: str, rows_per_statement: int, upsert: bool = True) -> str:
+    placeholders = "(" + ", ".join("?" for _ in _PRICE_INSERT_COLUMNS) + ")"
+    values = ", ".join([placeholders] * rows_per_statement)
+    sql = f"INSERT INTO {table} ({', '.join(_PRICE_INSERT_COLUMNS)}) VALUES {values}"
+    return f"{sql} {_PRICE_CONFLICT_CLAUSE}" if upsert else sql
+
+
+def _insert_price_rows(
+    session: Session, params: np.ndarray, table: str, upsert: bool, chunk_rows: int, stats: UpsertStats
+) -> None:
+    """``executemany`` ``params`` into ``table`` in chunks, packing rows up to SQLite's parameter limit."""
+    rows_per_statement = SQLITE_MAX_VARIABLES // len(_PRICE_INSERT_COLUMNS)
+    multi_row_sql = _price_insert_sql(table, rows_per_statement, upsert)
+    single_row_sql = _price_insert_sql(table, 1, upsert)
+    connection = session.connection()
+    for offset in range(0, len(params), chunk_rows):
+        chunk = params[offset : offset + chunk_rows]
+        chunk_began = time.perf_counter()
+        full = len(chunk) - len(chunk) % rows_per_statement
+        if full:
+            grouped = chunk[:full].reshape(-1, rows_per_statement * len(_PRICE_INSERT_COLUMNS))
+            connection.exec_driver_sql(multi_row_sql, [tuple(row) for row in grouped.tolist()])
+        if full < len(chunk):
+            connection.exec_driver_sql(single_row_sql, [tuple(row) for row in chunk[full:].tolist()])
+        elapsed = time.perf_counter() - chunk_began
+        stats.chunks += 1
+        stats.rows += len(chunk)
+        stats.chunk_seconds.append(elapsed)
+        logger.debug("Wrote %d price rows to %s in %.3fs", len(chunk), table, elapsed)
+
+
+def _price_param_matrix(session: Session, price_df: pd.DataFrame) -> np.ndarray:
+    """Rows of ``_PRICE_INSERT_COLUMNS`` values as an object matrix, built column-wise."""
     symbols = sorted(price_df["symbol"].unique())
     symbol_to_id = _ticker_symbol_to_id(session, symbols)
 
@@ -59,48 +134,812 @@ def upsert_prices(session: Session, price_df: pd.DataFrame) -> None:
         upsert_tickers(session, subset)
         symbol_to_id.update(_ticker_symbol_to_id(session, missing))
 
-    records = []
-    for _, row in price_df.iterrows():
-        ticker_id = symbol_to_id.get(row["symbol"])
-        if ticker_id is None:
-            continue
-        records.append(
-            {
-                "ticker_id": ticker_id,
-                "date": row["date"].date() if hasattr(row["date"], "date") else row["date"],
-                "open": row.get("open"),
-                "high": row.get("high"),
-                "low": row.get("low"),
-                "close": row.get("close"),
-                "adj_close": row.get("adj_close"),
-                "volume": row.get("volume"),
-                "return_": row.get("return_"),
-            }
+    ticker_ids = price_df["symbol"].map(symbol_to_id).to_numpy(dtype=np.float64, na_value=np.nan)
+    known = ~np.isnan(ticker_ids)
+    params = np.empty((int(known.sum()), len(_PRICE_INSERT_COLUMNS)), dtype=object)
+    params[:, 0] = ticker_ids[known].astype(np.int64).tolist()
+    dates = pd.to_datetime(price_df["date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    dates = dates.to_numpy(dtype="datetime64[D]")[known]
+    params[:, 1] = np.datetime_as_string(dates, unit="D")
+    for i, col in enumerate(_PRICE_VALUE_COLUMNS, start=2):
+        if col in price_df.columns:
+            # NaN binds as NULL in SQLite.
+            params[:, i] = price_df[col].to_numpy(dtype=np.float64, na_value=np.nan)[known].tolist()
+        else:
+            params[:, i] = None
+    return params
+
+
+def _classify_price_rows(session: Session, params: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Masks of rows in ``params`` that are new and that differ from the stored row.
+
+    Stored rows are read for the incoming tickers over the incoming date window only, then joined to
+    the incoming rows on ``(ticker_id, date)`` and compared column-wise.
+    """
+    incoming = pd.DataFrame({"ticker_id": params[:, 0].astype(np.int64), "date": params[:, 1].astype(str)})
+    ticker_ids = incoming["ticker_id"].unique().tolist()
+    first, last = incoming["date"].min(), incoming["date"].max()
+    columns = ", ".join(_PRICE_INSERT_COLUMNS)
+    # Raw DBAPI cursor: this can be every stored row of a reloaded window, and Row wrapping dominates.
+    cursor = session.connection().connection.cursor()
+    stored_rows = []
+    try:
+        for offset in range(0, len(ticker_ids), _LOOKUP_CHUNK_SIZE):
+            chunk = ticker_ids[offset : offset + _LOOKUP_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT {columns} FROM prices_daily WHERE date BETWEEN ? AND ? "
+                f"AND ticker_id IN ({', '.join('?' for _ in chunk)})",
+                (first, last, *chunk),
+            )
+            stored_rows.extend(cursor.fetchall())
+    finally:
+        cursor.close()
+    if not stored_rows:
+        return np.ones(len(params), dtype=bool), np.zeros(len(params), dtype=bool)
+
+    stored = pd.DataFrame(stored_rows, columns=_PRICE_INSERT_COLUMNS)
+    stored["date"] = stored["date"].astype(str)
+    position = incoming.reset_index().merge(stored, on=["ticker_id", "date"], how="inner")
+    is_new = np.ones(len(params), dtype=bool)
+    is_new[position["index"].to_numpy()] = False
+
+    changed = np.zeros(len(params), dtype=bool)
+    rows = position["index"].to_numpy()
+    new_values = params[rows, 2:].astype(np.float64)
+    old_values = position[_PRICE_VALUE_COLUMNS].to_numpy(dtype=np.float64, na_value=np.nan)
+    same = np.isclose(new_values, old_values, rtol=1e-12, atol=0.0, equal_nan=True).all(axis=1)
+    changed[rows[~same]] = True
+    return is_new, changed
+
+
+_REFRESH_WATERMARKS_SQL = """
+INSERT INTO ticker_watermarks (ticker_id, min_date, max_date, row_count, updated_at)
+SELECT ticker_id, MIN(date), MAX(date), COUNT(*), :now
+FROM prices_daily
+WHERE true {ticker_filter}
+GROUP BY ticker_id
+ON CONFLICT (ticker_id) DO UPDATE SET
+    min_date = excluded.min_date,
+    max_date = excluded.max_date,
+    row_count = excluded.row_count,
+    updated_at = excluded.updated_at
+"""
+
+_ADVANCE_WATERMARK_SQL = (
+    "INSERT INTO ticker_watermarks (ticker_id, min_date, max_date, row_count, updated_at) "
+    "VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (ticker_id) DO UPDATE SET "
+    "min_date = min(ticker_watermarks.min_date, excluded.min_date), "
+    "max_date = max(ticker_watermarks.max_date, excluded.max_date), "
+    "row_count = ticker_watermarks.row_count + excluded.row_count, "
+    "updated_at = excluded.updated_at"
+)
+
+
+def refresh_watermarks(session: Session, ticker_ids: Sequence[int] | None = None) -> None:
+    """Rebuild watermarks from ``prices_daily``, for ``ticker_ids`` or for every ticker.
+
+    Writers keep watermarks current; call this after changing prices outside ``crud``.
+    """
+    now = datetime.datetime.now()
+    if ticker_ids is None:
+        session.execute(delete(TickerWatermark))
+        session.execute(text(_REFRESH_WATERMARKS_SQL.format(ticker_filter="")), {"now": now})
+        return
+    ticker_ids = list(ticker_ids)
+    for offset in range(0, len(ticker_ids), _LOOKUP_CHUNK_SIZE):
+        chunk = ticker_ids[offset : offset + _LOOKUP_CHUNK_SIZE]
+        session.execute(delete(TickerWatermark).where(TickerWatermark.ticker_id.in_(chunk)))
+        stmt = text(_REFRESH_WATERMARKS_SQL.format(ticker_filter="AND ticker_id IN :ticker_ids"))
+        stmt = stmt.bindparams(bindparam("ticker_ids", expanding=True))
+        session.execute(stmt, {"now": now, "ticker_ids": chunk})
+
+
+def _advance_watermarks(session: Session, written: pd.DataFrame) -> None:
+    """Fold a write into the watermarks; ``written`` has ticker_id, min_date, max_date and inserted."""
+    if written.empty:
+        return
+    ticker_ids = written["ticker_id"].astype(int).tolist()
+    tracked: set[int] = set()
+    for offset in range(0, len(ticker_ids), _LOOKUP_CHUNK_SIZE):
+        chunk = ticker_ids[offset : offset + _LOOKUP_CHUNK_SIZE]
+        tracked.update(
+            session.execute(
+                select(TickerWatermark.ticker_id).where(TickerWatermark.ticker_id.in_(chunk))
+            ).scalars()
         )
+    # Untracked tickers may already have rows (data older than the table), so count them in full.
+    untracked = [t for t in ticker_ids if t not in tracked]
+    if untracked:
+        refresh_watermarks(session, untracked)
+    increments = written[written["ticker_id"].isin(tracked)]
+    if increments.empty:
+        return
+    now = datetime.datetime.now()
+    session.connection().exec_driver_sql(
+        _ADVANCE_WATERMARK_SQL,
+        [
+            (int(ticker_id), str(first), str(last), int(inserted), now)
+            for ticker_id, first, last, inserted in increments[
+                ["ticker_id", "min_date", "max_date", "inserted"]
+            ].itertuples(index=False)
+        ],
+    )
+
+
+# SQLite returns the bare adj_close from the row holding MAX(date), i.e. the month's last trading day.
+_REFRESH_MONTH_END_SQL = """
+INSERT OR REPLACE INTO prices_month_end (ticker_id, month, date, adj_close)
+SELECT ticker_id, strftime('%Y-%m', date) AS month, MAX(date), adj_close
+FROM prices_daily
+WHERE true {ticker_filter}
+GROUP BY ticker_id, month
+"""
+
+_ADVANCE_MONTH_END_SQL = (
+    "INSERT OR REPLACE INTO prices_month_end (ticker_id, month, date, adj_close) "
+    "SELECT ticker_id, strftime('%Y-%m', date) AS month, MAX(date), adj_close "
+    "FROM prices_daily "
+    "WHERE ticker_id = ? "
+    "AND date >= date(?, 'start of month') AND date < date(?, 'start of month', '+1 month') "
+    "GROUP BY month"
+)
+
+
+def refresh_month_end_prices(session: Session, ticker_ids: Sequence[int] | None = None) -> None:
+    """Rebuild ``prices_month_end`` from ``prices_daily``, for ``ticker_ids`` or for every ticker.
 
-    if not records:
+    Writers keep month-end rows current; call this after changing prices outside ``crud``.
+    """
+    if ticker_ids is None:
+        session.execute(delete(PriceMonthEnd))
+        session.execute(text(_REFRESH_MONTH_END_SQL.format(ticker_filter="")))
         return
+    ticker_ids = list(ticker_ids)
+    for offset in range(0, len(ticker_ids), _LOOKUP_CHUNK_SIZE):
+        chunk = ticker_ids[offset : offset + _LOOKUP_CHUNK_SIZE]
+        session.execute(delete(PriceMonthEnd).where(PriceMonthEnd.ticker_id.in_(chunk)))
+        stmt = text(_REFRESH_MONTH_END_SQL.format(ticker_filter="AND ticker_id IN :ticker_ids"))
+        session.execute(stmt.bindparams(bindparam("ticker_ids", expanding=True)), {"ticker_ids": chunk})
+
+
+def _advance_month_end_prices(session: Session, written: pd.DataFrame) -> None:
+    """Recompute only the months a write touched; ``written`` has ticker_id, min_date and max_date."""
+    if written.empty:
+        return
+    session.connection().exec_driver_sql(
+        _ADVANCE_MONTH_END_SQL,
+        [
+            (int(ticker_id), str(first), str(last))
+            for ticker_id, first, last in zip(written["ticker_id"], written["min_date"], written["max_date"])
+        ],
+    )
+
+
+def month_end_prices(
+    session: Session,
+    symbols: Sequence[str],
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+) -> pd.DataFrame:
+    """Long ``symbol, month, date, adj_close`` rows from ``prices_month_end``; bounds apply to ``date``."""
+    rows = []
+    symbols = list(symbols)
+    for offset in range(0, len(symbols), _LOOKUP_CHUNK_SIZE):
+        stmt = (
+            select(Ticker.symbol, PriceMonthEnd.month, PriceMonthEnd.date, PriceMonthEnd.adj_close)
+            .join(Ticker, Ticker.id == PriceMonthEnd.ticker_id)
+            .where(Ticker.symbol.in_(symbols[offset : offset + _LOOKUP_CHUNK_SIZE]))
+        )
+        if start is not None:
+            stmt = stmt.where(PriceMonthEnd.date >= start)
+        if end is not None:
+            stmt = stmt.where(PriceMonthEnd.date <= end)
+        rows.extend(session.execute(stmt.order_by(Ticker.symbol, PriceMonthEnd.month)).all())
+    return pd.DataFrame(rows, columns=["symbol", "month", "date", "adj_close"])
+
+
+def upsert_prices(
+    session: Session,
+    price_df: pd.DataFrame,
+    chunk_rows: int = UPSERT_CHUNK_ROWS,
+    skip_unchanged: bool = True,
+) -> UpsertStats:
+    """Insert or update daily prices keyed on ``(ticker_id, date)``.
+
+    Parameters are built column-wise with NumPy and sent with ``executemany`` in chunks of
+    ``chunk_rows``; each statement carries as many rows as SQLite's bound-parameter limit allows.
+    With ``skip_unchanged`` rows identical to the stored ones are not sent at all; the returned stats
+    count inserted, updated and skipped rows. Rows for symbols unknown to the ``tickers`` table (and to
+    the configured universe) are dropped.
+    """
+    stats = UpsertStats()
+    if price_df.empty:
+        return stats
+
+    required_cols = {"date", "symbol", "close"}
+    missing_cols = required_cols - set(price_df.columns)
+    if missing_cols:
+        raise ValueError(f"Missing required price columns: {missing_cols}")
+
+    began = time.perf_counter()
+    params = _price_param_matrix(session, price_df)
+    if not len(params):
+        return stats
+    if skip_unchanged:
+        is_new, changed = _classify_price_rows(session, params)
+        stats.inserted, stats.updated = int(is_new.sum()), int(changed.sum())
+        stats.skipped = len(params) - stats.inserted - stats.updated
+        _insert_price_rows(session, params[is_new | changed], PriceDaily.__tablename__, True, chunk_rows, stats)
+        written = pd.DataFrame({"ticker_id": params[:, 0], "date": params[:, 1], "inserted": is_new})
+        _advance_watermarks(
+            session,
+            written.groupby("ticker_id", as_index=False).agg(
+                min_date=("date", "min"), max_date=("date", "max"), inserted=("inserted", "sum")
+            ),
+        )
+        written = written[is_new | changed]
+    else:
+        stats.inserted = len(params)  # not distinguished from updates without the comparison
+        _insert_price_rows(session, params, PriceDaily.__tablename__, True, chunk_rows, stats)
+        refresh_watermarks(session, sorted(set(params[:, 0].tolist())))
+        written = pd.DataFrame({"ticker_id": params[:, 0], "date": params[:, 1]})
+    _advance_month_end_prices(
+        session,
+        written.groupby("ticker_id", as_index=False).agg(min_date=("date", "min"), max_date=("date", "max")),
+    )
+    stats.seconds = time.perf_counter() - began
+    return stats
+
+
+_STAGING_TABLE = "staging_prices_daily"
+
+
+def drop_price_indexes(session: Session) -> None:
+    """Drop the secondary ``prices_daily`` indexes; the ``(ticker_id, date)`` key is kept for merges."""
+    connection = session.connection()
+    for index in PriceDaily.__table__.indexes:
+        index.drop(bind=connection, checkfirst=True)
+
+
+def create_price_indexes(session: Session) -> None:
+    connection = session.connection()
+    for index in PriceDaily.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def bulk_upsert_prices(
+    session: Session,
+    price_df: pd.DataFrame,
+    chunk_rows: int = UPSERT_CHUNK_ROWS,
+    rebuild_indexes: bool = False,
+) -> UpsertStats:
+    """Load prices through an unindexed temporary staging table and merge them in one statement.
+
+    Streaming into the heap-only staging table and merging with a single ordered ``INSERT ... SELECT``
+    touches the ``prices_daily`` B-trees once per row in key order instead of at random. With
+    ``rebuild_indexes`` the secondary indexes are dropped for the merge and rebuilt afterwards, which
+    pays off when the load is a large share of the table. Rows identical to the stored ones are left
+    untouched and counted as skipped.
+    """
+    stats = UpsertStats()
+    if price_df.empty:
+        return stats
+
+    required_cols = {"date", "symbol", "close"}
+    missing_cols = required_cols - set(price_df.columns)
+    if missing_cols:
+        raise ValueError(f"Missing required price columns: {missing_cols}")
+
+    began = time.perf_counter()
+    params = _price_param_matrix(session, price_df)
+    columns = ", ".join(_PRICE_INSERT_COLUMNS)
+    connection = session.connection()
+    connection.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+        "(ticker_id INTEGER, date DATE, open FLOAT, high FLOAT, low FLOAT, close FLOAT, "
+        "adj_close FLOAT, volume FLOAT, return_ FLOAT)"
+    )
+    connection.exec_driver_sql(f"DELETE FROM {_STAGING_TABLE}")
+    _insert_price_rows(session, params, _STAGING_TABLE, False, chunk_rows, stats)
+
+    if rebuild_indexes:
+        drop_price_indexes(session)
+    merge_began = time.perf_counter()
+    written = pd.DataFrame(
+        connection.exec_driver_sql(
+            f"SELECT ticker_id, MIN(date), MAX(date), SUM(NOT EXISTS ("
+            "SELECT 1 FROM prices_daily AS p WHERE p.ticker_id = s.ticker_id AND p.date = s.date"
+            f")) FROM {_STAGING_TABLE} AS s GROUP BY ticker_id"
+        ).fetchall(),
+        columns=["ticker_id", "min_date", "max_date", "inserted"],
+    )
+    stats.inserted = int(written["inserted"].sum())
+    # "WHERE true" resolves SQLite's parsing ambiguity between a join's ON and the upsert's ON CONFLICT.
+    # The conflict clause skips identical rows, so the change count splits into inserts and real updates.
+    merged = connection.exec_driver_sql(
+        f"INSERT INTO {PriceDaily.__tablename__} ({columns}) "
+        f"SELECT {columns} FROM {_STAGING_TABLE} WHERE true ORDER BY ticker_id, date "
+        f"{_PRICE_CONFLICT_CLAUSE}"
+    )
+    stats.updated = merged.rowcount - stats.inserted
+    stats.skipped = len(params) - merged.rowcount
+    logger.debug("Merged %d staged price rows in %.3fs", len(params), time.perf_counter() - merge_began)
+    if rebuild_indexes:
+        create_price_indexes(session)
+    _advance_watermarks(session, written)
+    _advance_month_end_prices(session, written)
+    connection.exec_driver_sql(f"DELETE FROM {_STAGING_TABLE}")
+    stats.seconds = time.perf_counter() - began
+    return stats
+
 
-    stmt = sqlite_insert(PriceDaily).values(records)
+def latest_price_date(session: Session, ticker_id: int | None = None) -> datetime.date | None:
+    """Newest stored price date for ``ticker_id``, or across all tickers, read from the watermarks."""
+    stmt = select(func.max(TickerWatermark.max_date))
+    if ticker_id is not None:
+        stmt = stmt.where(TickerWatermark.ticker_id == ticker_id)
+    return session.execute(stmt).scalar_one_or_none()
+
+
+def prices_version(session: Session) -> datetime.datetime | None:
+    """Time of the last price write; a cheap cache key for anything derived from ``prices_daily``."""
+    return session.execute(select(func.max(TickerWatermark.updated_at))).scalar_one_or_none()
+
+
+def previous_closes(session: Session, first_dates: Mapping[str, datetime.date]) -> dict[str, float]:
+    """Return, per symbol, the last stored close strictly before the given date.
+
+    Symbols sharing a first date (normally all of them) are resolved in one statement with a
+    correlated lookup on the ``(ticker_id, date)`` index, so no history is loaded into pandas.
+    """
+    symbols_by_date: dict[datetime.date, list[str]] = {}
+    for symbol, first_date in first_dates.items():
+        symbols_by_date.setdefault(first_date, []).append(symbol)
+
+    result: dict[str, float] = {}
+    for first_date, symbols in symbols_by_date.items():
+        prior_close = (
+            select(PriceDaily.close)
+            .where(PriceDaily.ticker_id == Ticker.id, PriceDaily.date < first_date)
+            .order_by(PriceDaily.date.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        for offset in range(0, len(symbols), _LOOKUP_CHUNK_SIZE):
+            chunk = symbols[offset : offset + _LOOKUP_CHUNK_SIZE]
+            stmt = select(Ticker.symbol, prior_close).where(Ticker.symbol.in_(chunk))
+            for symbol, close in session.execute(stmt).all():
+                if close is not None:
+                    result[symbol] = float(close)
+    return result
+
+
+_BACKFILL_RETURNS_SQL = """
+UPDATE prices_daily
+SET return_ = recomputed.return_
+FROM (
+    SELECT
+        ticker_id,
+        date,
+        COALESCE(close / LAG(close) OVER (PARTITION BY ticker_id ORDER BY date) - 1.0, 0.0) AS return_
+    FROM prices_daily
+    WHERE date <= :end {ticker_filter}
+) AS recomputed
+WHERE prices_daily.ticker_id = recomputed.ticker_id
+  AND prices_daily.date = recomputed.date
+  AND prices_daily.date >= :start
+"""
+
+
+def backfill_returns(
+    session: Session,
+    start: datetime.date,
+    end: datetime.date,
+    symbols: Sequence[str] | None = None,
+) -> int:
+    """Recompute ``return_`` in place for rows dated ``start``..``end`` with a ``LAG`` window.
+
+    Rows before ``start`` take part in the window so the first repaired day uses its true prior close.
+    Returns the number of rows updated.
+    """
+    params: dict = {"start": start, "end": end}
+    ticker_filter = ""
+    if symbols is not None:
+        ticker_ids = list(_ticker_symbol_to_id(session, symbols).values())
+        if not ticker_ids:
+            return 0
+        ticker_filter = "AND ticker_id IN :ticker_ids"
+        params["ticker_ids"] = ticker_ids
+    stmt = text(_BACKFILL_RETURNS_SQL.format(ticker_filter=ticker_filter))
+    if symbols is not None:
+        stmt = stmt.bindparams(bindparam("ticker_ids", expanding=True))
+    result = session.execute(stmt, params)
+    return result.rowcount
+
+
+# Provider values for the same bar jitter in the last digits between downloads.
+ADJUSTMENT_TOLERANCE = 1e-5
+
+# Scaling every price of a ticker by one factor leaves close-to-close returns unchanged, so return_
+# is not rewritten here; only the first incoming row's return depends on the rescaled prior close.
+_READJUST_PRICES_SQL = (
+    "UPDATE prices_daily SET "
+    "open = open * ?, high = high * ?, low = low * ?, close = close * ?, volume = volume / ?, "
+    "adj_close = adj_close * ? "
+    "WHERE ticker_id = ? AND date < ?"
+)
+
+
+def readjust_prices(
+    session: Session, price_df: pd.DataFrame, tolerance: float = ADJUSTMENT_TOLERANCE
+) -> pd.DataFrame:
+    """Rescale stored history of tickers whose provider adjustments changed since it was written.
+
+    Each ticker's earliest incoming row that is already stored is compared with the stored row. When
+    its ``close`` or ``adj_close`` moved by more than ``tolerance`` (a split or dividend re-adjusted
+    the provider's history), every stored row before that date is rescaled by the ratios with one
+    ``UPDATE`` per ticker and the factors are recorded in ``price_adjustments``. The incoming rows
+    themselves are left for ``upsert_prices``. Returns ``symbol, date, close_factor, adj_close_factor``
+    rows for the tickers adjusted.
+    """
+    columns = ["symbol", "date", "close_factor", "adj_close_factor"]
+    if price_df.empty:
+        return pd.DataFrame(columns=columns)
+    symbols = sorted(price_df["symbol"].unique())
+    symbol_to_id: dict[str, int] = {}
+    for offset in range(0, len(symbols), _LOOKUP_CHUNK_SIZE):
+        symbol_to_id.update(_ticker_symbol_to_id(session, symbols[offset : offset + _LOOKUP_CHUNK_SIZE]))
+    if not symbol_to_id:
+        return pd.DataFrame(columns=columns)
+
+    incoming = price_df.loc[price_df["symbol"].isin(symbol_to_id), ["symbol", "date", "close", "adj_close"]]
+    dates = pd.to_datetime(incoming["date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    incoming = incoming.assign(
+        ticker_id=incoming["symbol"].map(symbol_to_id).astype(np.int64), date=dates.dt.strftime("%Y-%m-%d")
+    )
+    ticker_ids = sorted(symbol_to_id.values())
+    first, last = incoming["date"].min(), incoming["date"].max()
+    cursor = session.connection().connection.cursor()
+    stored_rows = []
+    try:
+        for offset in range(0, len(ticker_ids), _LOOKUP_CHUNK_SIZE):
+            chunk = ticker_ids[offset : offset + _LOOKUP_CHUNK_SIZE]
+            cursor.execute(
+                "SELECT ticker_id, date, close, adj_close FROM prices_daily WHERE date BETWEEN ? AND ? "
+                f"AND ticker_id IN ({', '.join('?' for _ in chunk)})",
+                (first, last, *chunk),
+            )
+            stored_rows.extend(cursor.fetchall())
+    finally:
+        cursor.close()
+    if not stored_rows:
+        return pd.DataFrame(columns=columns)
+
+    stored = pd.DataFrame(stored_rows, columns=["ticker_id", "date", "close", "adj_close"])
+    stored["date"] = stored["date"].astype(str)
+    overlap = incoming.merge(stored, on=["ticker_id", "date"], suffixes=("", "_stored"))
+    # Adjustments compound backwards in time, so history before the overlap carries the factor of its
+    # earliest row; later overlap rows may sit past the event and are overwritten by the upsert anyway.
+    overlap = overlap.sort_values("date").drop_duplicates("ticker_id", keep="first")
+    factors = overlap[["close", "adj_close"]].to_numpy(dtype=np.float64) / overlap[
+        ["close_stored", "adj_close_stored"]
+    ].to_numpy(dtype=np.float64)
+    # Rows without a usable stored value give no evidence of an adjustment.
+    factors[~np.isfinite(factors) | (factors <= 0)] = 1.0
+    overlap = overlap.assign(close_factor=factors[:, 0], adj_close_factor=factors[:, 1])
+    changed = overlap[(np.abs(factors - 1.0) > tolerance).any(axis=1)]
+    if changed.empty:
+        return pd.DataFrame(columns=columns)
+
+    connection = session.connection()
+    connection.exec_driver_sql(
+        _READJUST_PRICES_SQL,
+        [
+            (*[float(close)] * 5, float(adj), int(ticker_id), str(date))
+            for ticker_id, date, close, adj in changed[
+                ["ticker_id", "date", "close_factor", "adj_close_factor"]
+            ].itertuples(index=False)
+        ],
+    )
+    now = datetime.datetime.now()
+    table = PriceAdjustment.__table__
+    stmt = sqlite_insert(table)
     stmt = stmt.on_conflict_do_update(
-        index_elements=[PriceDaily.ticker_id, PriceDaily.date],
+        index_elements=[table.c.ticker_id, table.c.date],
         set_={
-            "open": stmt.excluded.open,
-            "high": stmt.excluded.high,
-            "low": stmt.excluded.low,
-            "close": stmt.excluded.close,
-            "adj_close": stmt.excluded.adj_close,
-            "volume": stmt.excluded.volume,
-            "return_": stmt.excluded.return_,
+            "close_factor": table.c.close_factor * stmt.excluded.close_factor,
+            "adj_close_factor": table.c.adj_close_factor * stmt.excluded.adj_close_factor,
+            "detected_at": stmt.excluded.detected_at,
         },
     )
+    session.execute(
+        stmt,
+        [
+            {
+                "ticker_id": int(ticker_id),
+                "date": datetime.date.fromisoformat(date),
+                "close_factor": float(close),
+                "adj_close_factor": float(adj),
+                "detected_at": now,
+            }
+            for ticker_id, date, close, adj in changed[
+                ["ticker_id", "date", "close_factor", "adj_close_factor"]
+            ].itertuples(index=False)
+        ],
+    )
+    adjusted_ids = changed["ticker_id"].astype(int).tolist()
+    refresh_month_end_prices(session, adjusted_ids)
+    # Bump the write time so caches keyed on prices_version() see the rewritten history.
+    session.execute(
+        TickerWatermark.__table__.update()
+        .where(TickerWatermark.ticker_id.in_(adjusted_ids))
+        .values(updated_at=now)
+    )
+    logger.info("Re-adjusted stored history of %d tickers", len(changed))
+    result = changed[columns].reset_index(drop=True)
+    result["date"] = [datetime.date.fromisoformat(date) for date in result["date"]]
+    return result
+
+
+def price_adjustments(session: Session, symbols: Sequence[str] | None = None) -> pd.DataFrame:
+    """Recorded ``symbol, date, close_factor, adj_close_factor, detected_at`` rows, oldest first."""
+    stmt = select(
+        Ticker.symbol,
+        PriceAdjustment.date,
+        PriceAdjustment.close_factor,
+        PriceAdjustment.adj_close_factor,
+        PriceAdjustment.detected_at,
+    ).join(Ticker, Ticker.id == PriceAdjustment.ticker_id)
+    if symbols is not None:
+        stmt = stmt.where(Ticker.symbol.in_(list(symbols)))
+    rows = session.execute(stmt.order_by(Ticker.symbol, PriceAdjustment.date)).all()
+    return pd.DataFrame(rows, columns=["symbol", "date", "close_factor", "adj_close_factor", "detected_at"])
+
+
+def record_price_gaps(session: Session, gaps: Mapping[str, Iterable[datetime.date]]) -> int:
+    """Record sessions the provider returned no bar for, per symbol; returns the rows written."""
+    ticker_ids = _ticker_symbol_to_id(session, list(gaps))
+    rows = [
+        {"ticker_id": ticker_ids[symbol], "date": date}
+        for symbol, dates in gaps.items()
+        if symbol in ticker_ids
+        for date in dates
+    ]
+    if rows:
+        session.execute(sqlite_insert(PriceGap).on_conflict_do_nothing(), rows)
+    return len(rows)
+
+
+def _as_universe(value: Universe | str) -> Universe:
+    return value if isinstance(value, Universe) else Universe[value]
+
+
+def load_universe_membership(session: Session, memberships: pd.DataFrame, replace: bool = False) -> int:
+    """Bulk-load membership intervals from ``symbol, universe, valid_from[, valid_to]`` rows.
+
+    Rows are keyed on ``(ticker, universe, valid_from)``; loading the same interval again updates its
+    ``valid_to``. Symbols without a ``tickers`` row get a minimal equity row, so constituents that have
+    since left or been delisted can be recorded. With ``replace`` the universes present in
+    ``memberships`` are cleared first, making the frame their complete history. Returns rows written.
+    """
+    if memberships.empty:
+        return 0
+    missing_cols = {"symbol", "universe", "valid_from"} - set(memberships.columns)
+    if missing_cols:
+        raise ValueError(f"Missing required membership columns: {missing_cols}")
+    frame = memberships.reindex(columns=["symbol", "universe", "valid_from", "valid_to"]).copy()
+    frame["universe"] = [_as_universe(value) for value in frame["universe"]]
+    frame["valid_from"] = pd.to_datetime(frame["valid_from"]).dt.date
+    frame["valid_to"] = [None if pd.isna(value) else pd.Timestamp(value).date() for value in frame["valid_to"]]
+    invalid = [
+        symbol
+        for symbol, start, to in zip(frame["symbol"], frame["valid_from"], frame["valid_to"])
+        if to is not None and to <= start
+    ]
+    if invalid:
+        raise ValueError(f"valid_to must be after valid_from for {sorted(set(invalid))}")
+
+    symbols = sorted(set(frame["symbol"]))
+    session.execute(
+        sqlite_insert(Ticker).on_conflict_do_nothing(index_elements=[Ticker.symbol]),
+        [{"symbol": symbol, "name": symbol, "asset_type": TickerType.EQUITY} for symbol in symbols],
+    )
+    ticker_ids: dict[str, int] = {}
+    for offset in range(0, len(symbols), _LOOKUP_CHUNK_SIZE):
+        ticker_ids.update(_ticker_symbol_to_id(session, symbols[offset : offset + _LOOKUP_CHUNK_SIZE]))
+
+    if replace:
+        universes = sorted(set(frame["universe"]), key=lambda universe: universe.name)
+        session.execute(delete(UniverseMembership).where(UniverseMembership.universe.in_(universes)))
+    now = datetime.datetime.now()
+    table = UniverseMembership.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.ticker_id, table.c.universe, table.c.valid_from],
+        set_={"valid_to": stmt.excluded.valid_to, "updated_at": stmt.excluded.updated_at},
+    )
+    session.execute(
+        stmt,
+        [
+            {
+                "ticker_id": ticker_ids[symbol],
+                "universe": universe,
+                "valid_from": valid_from,
+                "valid_to": valid_to,
+                "updated_at": now,
+            }
+            for symbol, universe, valid_from, valid_to in frame.itertuples(index=False)
+        ],
+    )
+    return len(frame)
+
+
+def universe_members(session: Session, universe: Universe | str, as_of: datetime.date) -> list[str]:
+    """Symbols in ``universe`` on ``as_of``, from ``universe_membership``, via the (universe, date) index."""
+    stmt = (
+        select(Ticker.symbol)
+        .join(UniverseMembership, UniverseMembership.ticker_id == Ticker.id)
+        .where(
+            UniverseMembership.universe == _as_universe(universe),
+            UniverseMembership.valid_from <= as_of,
+            (UniverseMembership.valid_to.is_(None)) | (UniverseMembership.valid_to > as_of),
+        )
+        .distinct()
+        .order_by(Ticker.symbol)
+    )
+    return list(session.execute(stmt).scalars())
+
+
+def membership_version(session: Session) -> tuple[int, datetime.datetime | None]:
+    """Row count and last load time of ``universe_membership``; changes whenever the loader runs."""
+    count, loaded_at = session.execute(
+        select(func.count(), func.max(UniverseMembership.updated_at)).select_from(UniverseMembership)
+    ).one()
+    return int(count), loaded_at
+
+
+def save_portfolio_snapshot(
+    session: Session,
+    as_of_date: datetime.date,
+    universe_name: str,
+    equity_exposure: float,
+    defensive_exposure: float,
+    positions: Iterable[tuple[str, float, str]],
+) -> int:
+    """Store a snapshot and its ``(symbol, weight, asset_type)`` positions, replacing one on the same date.
+
+    Symbols without a ``tickers`` row get one from the configured universe, or a minimal row. Returns
+    the snapshot id.
+    """
+    # Repeated symbols are added up, as the positions_json migration does.
+    weights: dict[str, list] = {}
+    for symbol, weight, asset_type in positions:
+        weights.setdefault(symbol, [0.0, asset_type])[0] += float(weight)
+    existing = session.execute(
+        select(PortfolioSnapshot.id).where(PortfolioSnapshot.as_of_date == as_of_date)
+    ).scalar_one_or_none()
+    if existing is not None:
+        session.execute(delete(PortfolioPosition).where(PortfolioPosition.snapshot_id == existing))
+        session.execute(delete(PortfolioSnapshot).where(PortfolioSnapshot.id == existing))
+    snapshot_id = session.execute(
+        PortfolioSnapshot.__table__.insert().values(
+            as_of_date=as_of_date,
+            universe_name=universe_name,
+            equity_exposure=equity_exposure,
+            defensive_exposure=defensive_exposure,
+        )
+    ).inserted_primary_key[0]
+    if not weights:
+        return snapshot_id
+
+    known = _ticker_symbol_to_id(session, sorted(weights))
+    missing = {symbol: asset_type for symbol, (_, asset_type) in weights.items() if symbol not in known}
+    if missing:
+        upsert_tickers(session, {s: ALL_TICKERS[s] for s in missing if s in ALL_TICKERS})
+        session.execute(
+            sqlite_insert(Ticker).on_conflict_do_nothing(index_elements=[Ticker.symbol]),
+            [
+                {
+                    "symbol": symbol,
+                    "name": symbol,
+                    "asset_type": TickerType.EQUITY if asset_type == "equity" else TickerType.ETF,
+                }
+                for symbol, asset_type in missing.items()
+            ],
+        )
+        known.update(_ticker_symbol_to_id(session, list(missing)))
+    session.execute(
+        PortfolioPosition.__table__.insert(),
+        [
+            {"snapshot_id": snapshot_id, "ticker_id": known[symbol], "weight": weight, "asset_type": kind}
+            for symbol, (weight, kind) in weights.items()
+        ],
+    )
+    return snapshot_id
+
+
+def portfolio_positions(session: Session, snapshot_ids: Sequence[int] | None = None) -> pd.DataFrame:
+    """Long ``snapshot_id, as_of_date, symbol, weight, asset_type`` rows for every snapshot, in one query."""
+    stmt = (
+        select(
+            PortfolioPosition.snapshot_id,
+            PortfolioSnapshot.as_of_date,
+            Ticker.symbol,
+            PortfolioPosition.weight,
+            PortfolioPosition.asset_type,
+        )
+        .join(PortfolioSnapshot, PortfolioSnapshot.id == PortfolioPosition.snapshot_id)
+        .join(Ticker, Ticker.id == PortfolioPosition.ticker_id)
+    )
+    if snapshot_ids is not None:
+        stmt = stmt.where(PortfolioPosition.snapshot_id.in_(list(snapshot_ids)))
+    rows = session.execute(stmt.order_by(PortfolioSnapshot.as_of_date, Ticker.symbol)).all()
+    return pd.DataFrame(rows, columns=["snapshot_id", "as_of_date", "symbol", "weight", "asset_type"])
+
+
+def portfolio_weights(session: Session) -> pd.DataFrame:
+    """Snapshot dates × symbols matrix of target weights in one query; unheld symbols are 0."""
+    stmt = (
+        select(PortfolioSnapshot.as_of_date, Ticker.symbol, PortfolioPosition.weight)
+        .outerjoin(PortfolioPosition, PortfolioPosition.snapshot_id == PortfolioSnapshot.id)
+        .outerjoin(Ticker, Ticker.id == PortfolioPosition.ticker_id)
+        .order_by(PortfolioSnapshot.as_of_date)
+    )
+    rows = pd.DataFrame(session.execute(stmt).all(), columns=["as_of_date", "symbol", "weight"])
+    if rows.empty:
+        return pd.DataFrame(dtype=float)
+    dates = rows["as_of_date"].drop_duplicates().tolist()
+    held = rows.dropna(subset=["symbol"])
+    if held.empty:
+        return pd.DataFrame(index=dates, dtype=float)
+    weights = held.pivot_table(index="as_of_date", columns="symbol", values="weight", aggfunc="sum")
+    # Snapshots without positions still get a row of zeros.
+    return weights.reindex(dates).fillna(0.0)
+
+
+def ticker_weight_history(session: Session, symbol: str) -> pd.Series:
+    """Weight of ``symbol`` in every snapshot holding it, by date, through the per-ticker index."""
+    stmt = (
+        select(PortfolioSnapshot.as_of_date, PortfolioPosition.weight)
+        .join(PortfolioSnapshot, PortfolioSnapshot.id == PortfolioPosition.snapshot_id)
+        .join(Ticker, Ticker.id == PortfolioPosition.ticker_id)
+        .where(Ticker.symbol == symbol)
+        .order_by(PortfolioSnapshot.as_of_date)
+    )
+    rows = session.execute(stmt).all()
+    dates = [date for date, _ in rows]
+    return pd.Series([weight for _, weight in rows], index=dates, name=symbol, dtype=float)
+
+
+def completed_symbols(session: Session, job: str) -> set[str]:
+    rows = session.execute(select(LoadCheckpoint.symbol).where(LoadCheckpoint.job == job)).scalars()
+    return set(rows)
+
+
+def mark_symbols_completed(session: Session, job: str, row_counts: Mapping[str, int]) -> None:
+    if not row_counts:
+        return
+    now = datetime.datetime.now()
+    stmt = sqlite_insert(LoadCheckpoint).values(
+        [
+            {"job": job, "symbol": symbol, "rows": int(count), "completed_at": now}
+            for symbol, count in row_counts.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LoadCheckpoint.job, LoadCheckpoint.symbol],
+        set_={"rows": stmt.excluded.rows, "completed_at": stmt.excluded.completed_at},
+    )
     session.execute(stmt)
 
 
-def latest_price_date(session: Session, ticker_id: int) -> datetime.date | None:
-    stmt = select(PriceDaily.date).where(PriceDaily.ticker_id == ticker_id).order_by(PriceDaily.date.desc())
-    result = session.execute(stmt).scalars().first()
-    return result
+def clear_checkpoints(session: Session, job: str) -> None:
+    session.execute(delete(LoadCheckpoint).where(LoadCheckpoint.job == job))
 
 
 def get_or_create_tickers(session: Session, tickers: Mapping[str, TickerInfo]) -> None:
@@ -110,6 +949,30 @@ def get_or_create_tickers(session: Session, tickers: Mapping[str, TickerInfo]) -
 __all__ = [
     "upsert_tickers",
     "upsert_prices",
+    "bulk_upsert_prices",
+    "drop_price_indexes",
+    "create_price_indexes",
+    "UpsertStats",
     "latest_price_date",
+    "prices_version",
+    "refresh_watermarks",
+    "refresh_month_end_prices",
+    "month_end_prices",
+    "previous_closes",
+    "backfill_returns",
+    "readjust_prices",
+    "price_adjustments",
+    "record_price_gaps",
+    "ADJUSTMENT_TOLERANCE",
+    "load_universe_membership",
+    "universe_members",
+    "membership_version",
+    "save_portfolio_snapshot",
+    "portfolio_positions",
+    "portfolio_weights",
+    "ticker_weight_history",
+    "completed_symbols",
+    "mark_symbols_completed",
+    "clear_checkpoints",
     "get_or_create_tickers",
 ]
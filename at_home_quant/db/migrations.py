@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+from at_home_quant.db.models import PortfolioPosition, PriceDaily
+
+logger = logging.getLogger(__name__)
+
+# Tracked in SQLite's PRAGMA user_version. Version 1 is the original schema with a surrogate
+# prices_daily.id; databases created before versioning report 0 until init_db stamps them.
+SCHEMA_VERSION = 3
+
+_PRICE_COLUMNS = ["ticker_id", "date", "open", "high", "low", "close", "adj_close", "volume", "return_"]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int  # schema version after the step
+    description: str
+    apply: Callable[[Connection], None]
+    # Cheap steps that init_db applies itself. They must be idempotent and independent of earlier
+    # steps, because init_db also runs them on databases still waiting for a manual step.
+    automatic: bool = False
+
+
+def _cluster_prices(connection: Connection) -> None:
+    legacy = "prices_daily_v1"
+    for index in inspect(connection).get_indexes("prices_daily"):
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{index["name"]}"')
+    connection.exec_driver_sql(f"ALTER TABLE prices_daily RENAME TO {legacy}")
+    PriceDaily.__table__.create(bind=connection)
+    columns = ", ".join(_PRICE_COLUMNS)
+    # Key-ordered copy fills the clustered B-tree sequentially.
+    connection.exec_driver_sql(
+        f"INSERT INTO prices_daily ({columns}) SELECT {columns} FROM {legacy} ORDER BY ticker_id, date"
+    )
+    connection.exec_driver_sql(f"DROP TABLE {legacy}")
+
+
+def _normalize_positions(connection: Connection) -> None:
+    PortfolioPosition.__table__.create(bind=connection, checkfirst=True)
+    inspector = inspect(connection)
+    if not inspector.has_table("portfolio_snapshots"):
+        return
+    if "positions_json" not in {column["name"] for column in inspector.get_columns("portfolio_snapshots")}:
+        return
+    weights: dict[tuple[int, str], list] = {}
+    for snapshot_id, positions_json in connection.exec_driver_sql(
+        "SELECT id, positions_json FROM portfolio_snapshots"
+    ).fetchall():
+        for item in json.loads(positions_json or "[]"):
+            entry = weights.setdefault((snapshot_id, item["ticker"]), [0.0, item["asset_type"]])
+            entry[0] += float(item["weight"])
+    if weights:
+        _copy_positions(connection, weights)
+    # Needs SQLite 3.35; the column is in no index or constraint.
+    connection.exec_driver_sql("ALTER TABLE portfolio_snapshots DROP COLUMN positions_json")
+
+
+def _copy_positions(connection: Connection, weights: dict[tuple[int, str], list]) -> None:
+    symbols = sorted({symbol for _, symbol in weights})
+    # Tickers referenced only by old snapshots get a minimal row, like the membership loader creates.
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO tickers (symbol, name, asset_type) VALUES (?, ?, ?)",
+        [(symbol, symbol, "EQUITY") for symbol in symbols],
+    )
+    ticker_ids = dict(connection.exec_driver_sql("SELECT symbol, id FROM tickers").fetchall())
+    connection.exec_driver_sql(
+        "INSERT OR REPLACE INTO portfolio_positions (snapshot_id, ticker_id, weight, asset_type) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            (snapshot_id, ticker_ids[symbol], weight, asset_type)
+            for (snapshot_id, symbol), (weight, asset_type) in weights.items()
+        ],
+    )
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(2, "Cluster prices_daily on (ticker_id, date) as a WITHOUT ROWID table", _cluster_prices),
+    Migration(
+        3,
+        "Move portfolio_snapshots.positions_json into a portfolio_positions table",
+        _normalize_positions,
+        automatic=True,
+    ),
+]
+
+
+def get_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar_one()
+
+
+def _set_version(connection: Connection, version: int) -> None:
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def detect_version(connection: Connection) -> int:
+    """Schema version implied by the tables themselves, for databases that were never stamped."""
+    inspector = inspect(connection)
+    if not inspector.has_table("prices_daily"):
+        return SCHEMA_VERSION
+    if "id" in {column["name"] for column in inspector.get_columns("prices_daily")}:
+        return 1
+    if inspector.has_table("portfolio_snapshots") and "positions_json" in {
+        column["name"] for column in inspector.get_columns("portfolio_snapshots")
+    }:
+        return 2
+    return SCHEMA_VERSION
+
+
+def stamp(connection: Connection) -> int:
+    """Record the detected version on an unversioned database; returns the current version."""
+    version = get_version(connection)
+    if version == 0:
+        version = detect_version(connection)
+        _set_version(connection, version)
+    return version
+
+
+def pending(connection: Connection) -> list[Migration]:
+    version = stamp(connection)
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def automatic_target(steps: list[Migration]) -> int | None:
+    """Version reached by the leading ``automatic`` steps of ``steps``, or None if the first is manual."""
+    target = None
+    for migration in steps:
+        if not migration.automatic:
+            break
+        target = migration.version
+    return target
+
+
+def apply_automatic(engine: Engine) -> list[Migration]:
+    """Apply every pending ``automatic`` step; returns the steps applied.
+
+    Leading automatic steps are applied and stamped like :func:`migrate`. Those behind a pending
+    manual step run without moving the version, so an old database is still usable before it is
+    migrated; when :func:`migrate` reaches them later they find nothing left to do.
+    """
+    with engine.begin() as connection:
+        steps = pending(connection)
+    target = automatic_target(steps)
+    applied = migrate(engine, target=target, vacuum=False) if target is not None else []
+    for migration in steps:
+        if migration.automatic and migration not in applied:
+            _apply(engine, migration)
+            applied.append(migration)
+    return applied
+
+
+def _apply(engine: Engine, migration: Migration, stamp_version: bool = False) -> None:
+    with engine.begin() as connection:
+        # pysqlite runs DDL outside a transaction unless one is open; BEGIN keeps each step atomic.
+        connection.exec_driver_sql("BEGIN")
+        logger.info("Migrating to schema version %d: %s", migration.version, migration.description)
+        migration.apply(connection)
+        if stamp_version:
+            _set_version(connection, migration.version)
+
+
+def migrate(engine: Engine, target: int = SCHEMA_VERSION, vacuum: bool = True) -> list[Migration]:
+    """Upgrade the database in place, one transaction per step; returns the steps applied.
+
+    ``vacuum`` rewrites the file afterwards so space freed by rebuilt tables is returned to the OS.
+    """
+    with engine.begin() as connection:
+        steps = [migration for migration in pending(connection) if migration.version <= target]
+    for migration in steps:
+        _apply(engine, migration, stamp_version=True)
+    if steps and vacuum:
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    return steps
+
+
+__all__ = [
+    "MIGRATIONS",
+    "apply_automatic",
+    "automatic_target",
+    "Migration",
+    "SCHEMA_VERSION",
+    "detect_version",
+    "get_version",
+    "migrate",
+    "pending",
+    "stamp",
+]
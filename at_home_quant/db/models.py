@@ -1,4 +1,15 @@
-from sqlalchemy import Column, Date, Enum, Float, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 from at_home_quant.data.tickers import TickerType, Universe
@@ -20,12 +31,13 @@ class Ticker(Base):
 
 
 class PriceDaily(Base):
+    # Clustered on (ticker_id, date): a symbol's history is stored contiguously and read without a
+    # rowid lookup. Databases created before schema version 2 keep a surrogate id until migrated.
     __tablename__ = "prices_daily"
-    __table_args__ = (UniqueConstraint("ticker_id", "date", name="uq_prices_ticker_date"),)
+    __table_args__ = {"sqlite_with_rowid": False}
 
-    id = Column(Integer, primary_key=True)
-    ticker_id = Column(Integer, ForeignKey("tickers.id"), nullable=False, index=True)
-    date = Column(Date, nullable=False, index=True)
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    date = Column(Date, primary_key=True, index=True)
     open = Column(Float, nullable=True)
     high = Column(Float, nullable=True)
     low = Column(Float, nullable=True)
@@ -37,6 +49,77 @@ class PriceDaily(Base):
     ticker = relationship("Ticker", back_populates="prices")
 
 
+class TickerWatermark(Base):
+    """Per-ticker summary of stored prices, maintained by the ``crud`` price writers."""
+
+    __tablename__ = "ticker_watermarks"
+
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    min_date = Column(Date, nullable=False)
+    max_date = Column(Date, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class PriceMonthEnd(Base):
+    """Last trading day's ``adj_close`` per ticker and month, maintained by the ``crud`` price writers."""
+
+    __tablename__ = "prices_month_end"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # "YYYY-MM"
+    date = Column(Date, nullable=False)
+    adj_close = Column(Float, nullable=False)
+
+
+class PriceAdjustment(Base):
+    """Factors applied to a ticker's stored history before ``date`` when the provider re-adjusted it.
+
+    Prices are multiplied by ``close_factor`` (volume divided by it) and ``adj_close`` by
+    ``adj_close_factor``; the factors are the provider-to-stored ratios on ``date``.
+    """
+
+    __tablename__ = "price_adjustments"
+
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    close_factor = Column(Float, nullable=False)
+    adj_close_factor = Column(Float, nullable=False)
+    detected_at = Column(DateTime, nullable=False)
+
+
+class PriceGap(Base):
+    """A calendar session inside a ticker's history that the provider confirmed it has no bar for.
+
+    Unscheduled closures and trading halts end up here after one repair fetch, so the planner stops
+    asking for them and can trust ``row_count`` plus these rows against the calendar.
+    """
+
+    __tablename__ = "price_gaps"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+
+
+class UniverseMembership(Base):
+    """Point-in-time index membership: ``ticker_id`` is in ``universe`` from ``valid_from`` until ``valid_to``.
+
+    ``valid_to`` is exclusive and NULL while the ticker is still a member; a ticker can hold intervals in
+    several universes at once.
+    """
+
+    __tablename__ = "universe_membership"
+    __table_args__ = (Index("ix_universe_membership_universe_dates", "universe", "valid_from", "valid_to"),)
+
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    universe = Column(Enum(Universe), primary_key=True)
+    valid_from = Column(Date, primary_key=True)
+    valid_to = Column(Date, nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+
+
 class PortfolioSnapshot(Base):
     __tablename__ = "portfolio_snapshots"
     __table_args__ = (UniqueConstraint("as_of_date", name="uq_portfolio_as_of_date"),)
@@ -46,7 +129,52 @@ class PortfolioSnapshot(Base):
     universe_name = Column(String, nullable=False)
     equity_exposure = Column(Float, nullable=False)
     defensive_exposure = Column(Float, nullable=False)
-    positions_json = Column(Text, nullable=False)
+
+    positions = relationship("PortfolioPosition", back_populates="snapshot", cascade="all, delete-orphan")
+
+
+class PortfolioPosition(Base):
+    """One holding of a portfolio snapshot; replaces the JSON column of schema versions before 3.
+
+    The key serves per-snapshot reads and the ``(ticker_id, snapshot_id)`` index serves a ticker's
+    weight across snapshots.
+    """
+
+    __tablename__ = "portfolio_positions"
+    __table_args__ = (
+        Index("ix_portfolio_positions_ticker_snapshot", "ticker_id", "snapshot_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    snapshot_id = Column(Integer, ForeignKey("portfolio_snapshots.id"), primary_key=True)
+    ticker_id = Column(Integer, ForeignKey("tickers.id"), primary_key=True)
+    weight = Column(Float, nullable=False)
+    asset_type = Column(String, nullable=False)  # "equity", "gold", "cash"
+
+    snapshot = relationship("PortfolioSnapshot", back_populates="positions")
+
+
+class LoadCheckpoint(Base):
+    __tablename__ = "etl_checkpoints"
+    __table_args__ = (UniqueConstraint("job", "symbol", name="uq_checkpoint_job_symbol"),)
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String, nullable=False, index=True)
+    symbol = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False, default=0)
+    completed_at = Column(DateTime, nullable=False)
 
 
-__all__ = ["Base", "Ticker", "PriceDaily", "PortfolioSnapshot"]
+__all__ = [
+    "Base",
+    "Ticker",
+    "PriceDaily",
+    "TickerWatermark",
+    "PriceMonthEnd",
+    "PriceAdjustment",
+    "PriceGap",
+    "UniverseMembership",
+    "PortfolioSnapshot",
+    "PortfolioPosition",
+    "LoadCheckpoint",
+]
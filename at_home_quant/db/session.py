@@ -1,26 +1,175 @@
+import logging
+import threading
 from contextlib import contextmanager
 from typing import Iterator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from at_home_quant.config.settings import ensure_data_dir_exists, get_settings
-from at_home_quant.db.models import Base
+from at_home_quant.config.settings import Settings, ensure_data_dir_exists, get_settings
+from at_home_quant.db import migrations, snapshots
+from at_home_quant.db.models import Base, PriceMonthEnd, TickerWatermark
 
+logger = logging.getLogger(__name__)
 
-settings = get_settings()
-ensure_data_dir_exists(settings.database_url)
-engine = create_engine(settings.database_url, future=True)
-SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, class_=Session)
+
+def _is_memory_url(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _sqlite_pragmas(settings: Settings, read_only: bool) -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_mb) * 1024}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size_mb) * 1024 * 1024}",
+        f"PRAGMA temp_store = {settings.sqlite_temp_store}",
+    ]
+    if read_only:
+        # Enforced per connection; the file is opened normally so WAL readers can share its -shm index.
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        pragmas += [
+            f"PRAGMA journal_mode = {settings.sqlite_journal_mode}",
+            f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        ]
+    return pragmas
+
+
+def _create_engine(settings: Settings, read_only: bool = False, url: str | None = None) -> Engine:
+    url = url or settings.database_url
+    if not url.startswith("sqlite"):
+        return create_engine(url, future=True)
+    options = {}
+    if read_only:
+        # SQLAlchemy 1.4 defaults SQLite files to NullPool, which takes no pool_size; name the pool
+        # (2.0's default) and let pooled connections move between threads as 2.0 does.
+        options = {
+            "poolclass": QueuePool,
+            "pool_size": max(1, settings.read_pool_size),
+            "connect_args": {"check_same_thread": False},
+        }
+    new_engine = create_engine(url, future=True, **options)
+    pragmas = _sqlite_pragmas(settings, read_only)
+
+    @event.listens_for(new_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return new_engine
+
+
+_engine_lock = threading.Lock()
+_engine: Engine | None = None
+_read_engine: Engine | None = None
+_read_dataset: str | None = None
+_session_factory: sessionmaker | None = None
+_read_session_factory: sessionmaker | None = None
+
+
+def get_engine() -> Engine:
+    """The write engine, created on first use so importing this module never touches the database."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                settings = get_settings()
+                ensure_data_dir_exists(settings.database_url)
+                engine = _create_engine(settings)
+                _session_factory = sessionmaker(bind=engine, expire_on_commit=False, class_=Session)
+                _engine = engine
+    return _engine
+
+
+def get_read_engine() -> Engine:
+    """Engine analytics and the dashboard read through, so they never queue behind ETL writers.
+
+    It opens the active dataset (``READ_DATASET`` or ``snapshots.select_dataset``) when one is set,
+    so heavy reads can run against a frozen snapshot instead of the live file, and is rebuilt when
+    the selection changes. An in-memory database exists only inside the write engine's connection,
+    so readers of the live database share it.
+    """
+    global _read_engine, _read_dataset, _read_session_factory
+    settings = get_settings()
+    dataset = snapshots.active_dataset(settings)
+    if _read_engine is None or _read_dataset != dataset:
+        write_engine = get_engine()
+        with _engine_lock:
+            if _read_engine is None or _read_dataset != dataset:
+                if dataset is None and _is_memory_url(settings.database_url):
+                    engine = write_engine
+                else:
+                    engine = _create_engine(settings, read_only=True, url=snapshots.dataset_url(settings))
+                previous = _read_engine
+                _read_session_factory = sessionmaker(bind=engine, expire_on_commit=False, class_=Session)
+                _read_engine, _read_dataset = engine, dataset
+                if previous is not None and previous is not write_engine:
+                    previous.dispose()
+                if dataset is not None:
+                    logger.info("Reads now use snapshot %s", dataset)
+    return _read_engine
+
+
+def get_sessionmaker() -> sessionmaker:
+    get_engine()
+    return _session_factory
+
+
+def get_read_sessionmaker() -> sessionmaker:
+    get_read_engine()
+    return _read_session_factory
+
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "read_engine": get_read_engine,
+    "SessionLocal": get_sessionmaker,
+    "ReadSessionLocal": get_read_sessionmaker,
+    "settings": get_settings,
+}
+
+
+def __getattr__(name: str):
+    # Keeps ``session.engine`` and friends working for callers written before engines were lazy.
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def init_db() -> None:
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    migrations.apply_automatic(engine)
+    with engine.begin() as connection:
+        # Fresh databases are stamped with the latest version; older ones keep working until migrated.
+        if migrations.pending(connection):
+            logger.info(
+                "Database schema is at version %d; run `python -m at_home_quant.scripts.migrate_db` to upgrade",
+                migrations.get_version(connection),
+            )
+        # create_all skips indexes of existing tables; restore any a bulk load dropped and never rebuilt.
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+    with get_session() as session:
+        from at_home_quant.db import crud
+
+        # Databases written before these summary tables existed have prices but no summary rows yet.
+        if session.execute(select(TickerWatermark.ticker_id).limit(1)).first() is None:
+            crud.refresh_watermarks(session)
+        if session.execute(select(PriceMonthEnd.ticker_id).limit(1)).first() is None:
+            crud.refresh_month_end_prices(session)
 
 
 @contextmanager
 def get_session() -> Iterator[Session]:
-    session: Session = SessionLocal()
+    session: Session = get_sessionmaker()()
     try:
         yield session
         session.commit()
@@ -31,4 +180,27 @@ def get_session() -> Iterator[Session]:
         session.close()
 
 
-__all__ = ["engine", "SessionLocal", "init_db", "get_session"]
+@contextmanager
+def get_read_session() -> Iterator[Session]:
+    """Session on the read-only engine; nothing is committed and writes raise."""
+    session: Session = get_read_sessionmaker()()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+__all__ = [
+    "engine",
+    "read_engine",
+    "SessionLocal",
+    "ReadSessionLocal",
+    "get_engine",
+    "get_read_engine",
+    "get_sessionmaker",
+    "get_read_sessionmaker",
+    "init_db",
+    "get_session",
+    "get_read_session",
+]
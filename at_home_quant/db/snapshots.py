@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from at_home_quant.config.settings import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Selecting this name points reads back at DATABASE_URL, even when READ_DATASET names a snapshot.
+LIVE_DATASET = "live"
+SNAPSHOT_METHODS = ("backup", "vacuum")
+
+_INDEX_FILE = "index.json"
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+def database_path(database_url: str) -> Path:
+    """Filesystem path of a SQLite database URL; other URLs cannot be snapshotted."""
+    prefix = "sqlite:///"
+    path = database_url[len(prefix) :].split("?", 1)[0] if database_url.startswith(prefix) else ""
+    if not path or path == ":memory:":
+        raise ValueError(f"Snapshots need a SQLite database file: {database_url!r}")
+    return Path(path)
+
+
+@dataclass
+class Snapshot:
+    name: str
+    path: str
+    method: str
+    created_at: datetime.datetime
+    source: str
+    schema_version: int
+    size_bytes: int
+    seconds: float
+
+    @property
+    def url(self) -> str:
+        return f"sqlite:///{self.path}"
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Snapshot":
+        return cls(
+            name=data["name"],
+            path=data["path"],
+            method=data["method"],
+            created_at=datetime.datetime.fromisoformat(data["created_at"]),
+            source=data["source"],
+            schema_version=int(data["schema_version"]),
+            size_bytes=int(data["size_bytes"]),
+            seconds=float(data["seconds"]),
+        )
+
+
+def _copy(source: Path, target: Path, method: str, busy_timeout_ms: int) -> None:
+    # A read-only connection is enough for both methods. Either copy runs inside one read
+    # transaction, so under WAL it sees a single committed state while the ETL keeps writing.
+    with closing(sqlite3.connect(f"{source.resolve().as_uri()}?mode=ro", uri=True)) as connection:
+        connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        if method == "vacuum":
+            connection.execute("VACUUM INTO ?", (str(target),))
+        else:
+            with closing(sqlite3.connect(target)) as copy:
+                # pages=-1 copies everything in one step; stepping would restart on every ETL commit.
+                connection.backup(copy, pages=-1)
+
+
+class SnapshotRegistry:
+    """Frozen, read-only copies of the database, registered under a dataset name.
+
+    A snapshot is taken with SQLite's online backup API (``method="backup"``, a page-for-page copy)
+    or ``VACUUM INTO`` (``method="vacuum"``, a defragmented copy without free pages), both from a
+    single read transaction on the live file. Copies are switched out of WAL and made read-only on
+    disk, and ``index.json`` records each one's name, file and provenance.
+    """
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self._lock = threading.RLock()
+        self._snapshots: dict[str, Snapshot] = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    # ----- index -----
+
+    def _index_path(self) -> Path:
+        return self.root / _INDEX_FILE
+
+    def _load_index(self) -> None:
+        path = self._index_path()
+        if not path.exists():
+            return
+        try:
+            entries = json.loads(path.read_text())
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable snapshot index %s: %s", path, exc)
+            return
+        for entry in entries:
+            snapshot = Snapshot.from_json(entry)
+            if Path(snapshot.path).exists():
+                self._snapshots[snapshot.name] = snapshot
+
+    def _save_index(self) -> None:
+        path = self._index_path()
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps([s.to_json() for s in self._snapshots.values()], indent=1))
+        tmp_path.replace(path)
+
+    # ----- datasets -----
+
+    def get(self, name: str) -> Snapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            known = ", ".join(sorted(self._snapshots)) or "none"
+            raise ValueError(f"Unknown dataset {name!r}; registered snapshots: {known}")
+        return snapshot
+
+    def snapshots(self) -> list[Snapshot]:
+        with self._lock:
+            return sorted(self._snapshots.values(), key=lambda s: s.created_at)
+
+    def create(
+        self,
+        name: str,
+        database_url: str,
+        method: str = "backup",
+        replace: bool = False,
+        busy_timeout_ms: int = 5000,
+    ) -> Snapshot:
+        if not _NAME_PATTERN.match(name) or name == LIVE_DATASET:
+            raise ValueError(f"Invalid dataset name {name!r}")
+        if method not in SNAPSHOT_METHODS:
+            raise ValueError(f"Unknown snapshot method {method!r}; expected one of {SNAPSHOT_METHODS}")
+        source = database_path(database_url)
+        if not source.exists():
+            raise ValueError(f"Database file {source} does not exist")
+        with self._lock:
+            if name in self._snapshots and not replace:
+                raise ValueError(f"Dataset {name!r} already exists; pass replace=True to overwrite it")
+            target = (self.root / f"{name}.db").resolve()
+            tmp_path = target.with_suffix(".db.tmp")
+            tmp_path.unlink(missing_ok=True)
+            began = time.perf_counter()
+            try:
+                _copy(source, tmp_path, method, busy_timeout_ms)
+                with closing(sqlite3.connect(tmp_path)) as copy:
+                    # Nothing writes the copy again, so it needs no -wal or -shm files next to it.
+                    copy.execute("PRAGMA journal_mode = DELETE")
+                    schema_version = copy.execute("PRAGMA user_version").fetchone()[0]
+                tmp_path.chmod(0o444)
+                if target.exists():
+                    target.chmod(0o644)
+                tmp_path.replace(target)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            snapshot = Snapshot(
+                name=name,
+                path=str(target),
+                method=method,
+                created_at=datetime.datetime.now(datetime.timezone.utc),
+                source=str(source.resolve()),
+                schema_version=schema_version,
+                size_bytes=target.stat().st_size,
+                seconds=time.perf_counter() - began,
+            )
+            self._snapshots[name] = snapshot
+            self._save_index()
+        logger.info(
+            "Snapshot %s: %.1f MB via %s in %.2fs", name, snapshot.size_bytes / 2**20, method, snapshot.seconds
+        )
+        return snapshot
+
+    def drop(self, name: str) -> None:
+        with self._lock:
+            snapshot = self.get(name)
+            path = Path(snapshot.path)
+            if path.exists():
+                path.chmod(0o644)
+                path.unlink()
+            del self._snapshots[name]
+            self._save_index()
+
+
+def get_snapshot_registry(settings: Settings | None = None) -> SnapshotRegistry:
+    settings = settings or get_settings()
+    return SnapshotRegistry(settings.snapshot_dir)
+
+
+def create_snapshot(
+    name: str, method: str = "backup", replace: bool = False, settings: Settings | None = None
+) -> Snapshot:
+    """Copy the live database into the named dataset."""
+    settings = settings or get_settings()
+    return get_snapshot_registry(settings).create(
+        name,
+        settings.database_url,
+        method=method,
+        replace=replace,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+    )
+
+
+_selected_dataset: str | None = None
+
+
+def select_dataset(name: str | None) -> None:
+    """Point read sessions and analytics at a dataset for this process.
+
+    ``None`` falls back to ``READ_DATASET``; :data:`LIVE_DATASET` reads the live database.
+    """
+    global _selected_dataset
+    if name is not None and name != LIVE_DATASET:
+        get_snapshot_registry().get(name)
+    _selected_dataset = name
+
+
+def active_dataset(settings: Settings | None = None) -> str | None:
+    """Name of the snapshot reads should use, or ``None`` for the live database."""
+    name = _selected_dataset
+    if name is None:
+        name = (settings or get_settings()).read_dataset or None
+    return None if name == LIVE_DATASET else name
+
+
+def dataset_url(settings: Settings | None = None) -> str:
+    """Database URL reads should use: the active snapshot, else ``DATABASE_URL``."""
+    settings = settings or get_settings()
+    name = active_dataset(settings)
+    if name is None:
+        return settings.database_url
+    return get_snapshot_registry(settings).get(name).url
+
+
+__all__ = [
+    "LIVE_DATASET",
+    "SNAPSHOT_METHODS",
+    "Snapshot",
+    "SnapshotRegistry",
+    "active_dataset",
+    "create_snapshot",
+    "database_path",
+    "dataset_url",
+    "get_snapshot_registry",
+    "select_dataset",
+]
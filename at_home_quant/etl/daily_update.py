@@ -1,64 +1,161 @@
 import datetime
-from typing import Sequence
+import logging
+from typing import Mapping
 
 import pandas as pd
-from sqlalchemy import select
 
 from at_home_quant.config.settings import get_settings
-from at_home_quant.data.fetcher import compute_returns, fetch_prices_for_universe
-from at_home_quant.data.tickers import ALL_TICKERS, list_all_symbols
+from at_home_quant.data.cache import get_default_cache
+from at_home_quant.data.fetcher import compute_returns, fetch_price_batch
+from at_home_quant.data.providers import PriceProvider, get_provider
+from at_home_quant.data.scheduler import FetchReport
+from at_home_quant.data.store import PRICE_COLUMNS, SqlPriceStore, get_mirror_store
+from at_home_quant.data.tickers import ALL_TICKERS, TickerInfo
 from at_home_quant.db import crud
-from at_home_quant.db.models import PriceDaily, Ticker
 from at_home_quant.db.session import get_session, init_db
+from at_home_quant.etl.pipeline import run_pipeline
+from at_home_quant.etl.planner import FetchBatch, FetchPlan, build_fetch_plan
 
+logger = logging.getLogger(__name__)
 
-def _get_latest_dates(session) -> dict[str, datetime.date | None]:
-    stmt = (
-        select(Ticker.symbol, PriceDaily.date)
-        .join(PriceDaily, PriceDaily.ticker_id == Ticker.id)
-        .order_by(Ticker.symbol, PriceDaily.date.desc())
-    )
-    rows = session.execute(stmt).all()
-    latest: dict[str, datetime.date | None] = {}
-    for symbol, date in rows:
-        if symbol not in latest:
-            latest[symbol] = date
-    return latest
+
+def _confirmed_gaps(
+    plan: FetchPlan, batch: FetchBatch, prices: pd.DataFrame, failed: set[str]
+) -> dict[str, list[datetime.date]]:
+    """Repaired sessions the provider returned no bar for, for symbols whose fetch succeeded."""
+    gaps: dict[str, list[datetime.date]] = {}
+    for symbol in batch.symbols:
+        wanted = plan.missing.get(symbol)
+        if wanted is None or symbol in failed:
+            continue
+        wanted = wanted[(wanted >= pd.Timestamp(batch.start)) & (wanted <= pd.Timestamp(batch.end))]
+        fetched = prices.loc[prices["symbol"] == symbol, "date"] if not prices.empty else []
+        absent = wanted[~wanted.isin(pd.DatetimeIndex(fetched))]
+        if not absent.empty:
+            gaps[symbol] = [day.date() for day in absent]
+    return gaps
 
 
-def run_daily_update() -> None:
+def run_daily_update(
+    provider: PriceProvider | None = None,
+    tickers: Mapping[str, TickerInfo] | None = None,
+    repair_gaps: bool = True,
+) -> None:
     settings = get_settings()
+    provider = provider or get_provider(settings=settings)
+    tickers = ALL_TICKERS if tickers is None else tickers
     init_db()
     with get_session() as session:
-        crud.upsert_tickers(session, ALL_TICKERS)
-
-    with get_session() as session:
-        latest_dates = _get_latest_dates(session)
+        crud.upsert_tickers(session, tickers)
 
     today = datetime.date.today()
-    fetch_start_by_symbol: dict[str, datetime.date] = {}
-    for symbol in list_all_symbols():
-        last_date = latest_dates.get(symbol)
-        if last_date:
-            fetch_start_by_symbol[symbol] = last_date + datetime.timedelta(days=1)
-        else:
-            fetch_start_by_symbol[symbol] = settings.default_start_date
-
-    symbols: Sequence[str] = list_all_symbols()
-    frames = []
-    for symbol in symbols:
-        start_date = fetch_start_by_symbol[symbol]
-        if start_date > today:
-            continue
-        prices = fetch_prices_for_universe([symbol], start=start_date, end=None)
-        frames.append(prices)
+    with get_session() as session:
+        plan = build_fetch_plan(
+            session,
+            list(tickers),
+            settings.default_start_date,
+            as_of=today,
+            repair_gaps=repair_gaps,
+            overlap_days=settings.adjustment_overlap_days,
+        )
 
-    if not frames:
+    # On a normal day every symbol needs the same tail, so this is one range split into download batches.
+    batches = [
+        FetchBatch(batch.start, batch.end, batch.symbols[offset : offset + settings.fetch_batch_size])
+        for batch in plan.batches
+        for offset in range(0, len(batch.symbols), settings.fetch_batch_size)
+    ]
+    if not batches:
         return
-
-    combined = compute_returns((frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)))
+    # Seeds are read up front so the pipeline's transform stage never queries the database mid-write.
+    # Nothing is stored between a range's start and its first fetched bar, so the start is a safe key.
     with get_session() as session:
-        crud.upsert_prices(session, combined)
+        tasks = [
+            (batch, crud.previous_closes(session, {symbol: batch.start for symbol in batch.symbols}))
+            for batch in batches
+        ]
+
+    report = FetchReport()
+    failed: set[str] = set()
+    # The overlap must come from the provider: cached bars predate any re-adjustment.
+    use_cache = settings.adjustment_overlap_days <= 0
+
+    def fetch(task: tuple[FetchBatch, dict[str, float]]) -> pd.DataFrame:
+        batch, _ = task
+        try:
+            return fetch_price_batch(
+                batch.symbols,
+                start=batch.start,
+                end=batch.end_exclusive,
+                provider=provider,
+                report=report,
+                use_cache=use_cache,
+            )
+        except Exception as exc:  # noqa: BLE001 - failures are in the report; later batches still load
+            logger.warning("Fetching %d symbols from %s failed: %s", len(batch.symbols), batch.start, exc)
+            failed.update(batch.symbols)
+            return pd.DataFrame()
+
+    def transform(task: tuple[FetchBatch, dict[str, float]], prices: pd.DataFrame) -> pd.DataFrame:
+        _, seeds = task
+        return compute_returns(prices, previous_close=seeds) if not prices.empty else prices
+
+    written = crud.UpsertStats()
+    mirror = get_mirror_store(settings)
+    adjusted: list[str] = []
+
+    def write(task: tuple[FetchBatch, dict[str, float]], prices: pd.DataFrame) -> None:
+        batch, _ = task
+        with get_session() as session:
+            # Compared before the upsert overwrites the overlapping stored bars.
+            adjustments = crud.readjust_prices(session, prices, tolerance=settings.adjustment_tolerance)
+            stats = crud.upsert_prices(session, prices)
+            # Sessions a successful fetch still lacks (unscheduled closures, halts) are not requested again.
+            gaps = _confirmed_gaps(plan, batch, prices, failed | set(report.failures))
+            crud.record_price_gaps(session, gaps)
+            symbols = sorted(adjustments["symbol"])
+            if symbols:
+                # Only the first fetched day's return was computed against a stale prior close.
+                crud.backfill_returns(session, batch.start, batch.end, symbols=symbols)
+            if mirror is not None:
+                mirror.write(prices)
+                if symbols:
+                    mirror.write(SqlPriceStore(session).load_frame(symbols, columns=PRICE_COLUMNS))
+        adjusted.extend(symbols)
+        written.inserted += stats.inserted
+        written.updated += stats.updated
+        written.skipped += stats.skipped
+
+    stats = run_pipeline(
+        tasks, fetch, transform, write, fetch_workers=settings.etl_fetch_workers, queue_size=settings.etl_queue_size
+    )
+    logger.info(
+        "Daily update: %s; %d rows inserted, %d updated, %d unchanged; fetch report: %s",
+        stats.summary(),
+        written.inserted,
+        written.updated,
+        written.skipped,
+        report.summary(),
+    )
+    if report.failures:
+        logger.warning("Symbols not updated: %s", ", ".join(report.failed_symbols))
+    if adjusted:
+        logger.info("Re-adjusted stored history for %s", ", ".join(adjusted))
+        cache = get_default_cache() if provider.cacheable else None
+        if cache is not None:
+            for symbol in adjusted:
+                cache.invalidate(symbol)
+
+    # Returns on rows after a repaired hole were computed against the wrong prior close.
+    if plan.repairs:
+        start = min(plan.repairs.values())
+        with get_session() as session:
+            crud.backfill_returns(session, start, today, symbols=sorted(plan.repairs))
+            if mirror is not None:
+                repaired = SqlPriceStore(session).load_frame(
+                    sorted(plan.repairs), start=start, columns=PRICE_COLUMNS
+                )
+                mirror.write(repaired)
 
 
 if __name__ == "__main__":
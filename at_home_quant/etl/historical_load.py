@@ -1,91 +1,161 @@
 import datetime
-from typing import Sequence
+import logging
+from typing import Mapping, Sequence
 
 import pandas as pd
-import yfinance as yf
 
 from at_home_quant.config.settings import get_settings
-from at_home_quant.data.fetcher import compute_returns
-from at_home_quant.data.tickers import ALL_TICKERS, list_all_symbols
+from at_home_quant.data.fetcher import compute_returns, download_raw_frame
+from at_home_quant.data.normalize import normalize_yfinance_prices
+from at_home_quant.data.providers import PriceProvider
+from at_home_quant.data.scheduler import FetchReport
+from at_home_quant.data.store import ParquetPriceStore, get_mirror_store
+from at_home_quant.data.tickers import ALL_TICKERS, TickerInfo
 from at_home_quant.db import crud
 from at_home_quant.db.session import get_session, init_db
+from at_home_quant.etl.pipeline import run_pipeline
 
 
-def normalize_yfinance_prices(df: pd.DataFrame, symbol: str | None = None) -> pd.DataFrame:
-    """
-    Normalize yfinance download output to a flat DataFrame with columns:
-    date, open, high, low, close, adj_close, volume, symbol.
+logger = logging.getLogger(__name__)
+
+
+def _job_key(start: datetime.date, end: datetime.date | None) -> str:
+    return f"historical:{start.isoformat()}:{end.isoformat() if end else 'open'}"
+
+
+def _transform_chunk(symbols: Sequence[str], raw_prices: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, int]]:
+    prices = compute_returns(normalize_yfinance_prices(raw_prices)) if not raw_prices.empty else raw_prices
+    row_counts = {symbol: 0 for symbol in symbols}
+    if not prices.empty:
+        row_counts.update(prices["symbol"].value_counts().to_dict())
+    return prices, row_counts
 
-    Handles both single-ticker and multi-ticker MultiIndex formats.
-    """
 
-    if df.empty:
-        return df
-
-    if isinstance(df.columns, pd.MultiIndex):
-        stacked = df.stack(level=-1).rename_axis(["date", "symbol"]).reset_index()
-    else:
-        stacked = df.reset_index().rename(columns={"Date": "date"}).copy()
-        stacked["symbol"] = stacked.get("symbol", symbol or "")
-
-    field_map = {
-        "Open": "open",
-        "High": "high",
-        "Low": "low",
-        "Close": "close",
-        "Adj Close": "adj_close",
-        "Volume": "volume",
-    }
-
-    available = {key: value for key, value in field_map.items() if key in stacked.columns}
-    normalized = stacked.rename(columns=available)
-
-    if "adj_close" in normalized.columns:
-        normalized["close"] = normalized["adj_close"]
-
-    if "date" in normalized.columns:
-        normalized["date"] = pd.to_datetime(normalized["date"])
-
-    desired_order = [
-        "date",
-        "symbol",
-        "open",
-        "high",
-        "low",
-        "close",
-        "adj_close",
-        "volume",
-    ]
-    columns = [col for col in desired_order if col in normalized.columns]
-    normalized = normalized[columns]
-
-    normalized = normalized.sort_values(["symbol", "date"]).reset_index(drop=True)
-    return normalized
-
-
-def run_full_history(start: datetime.date | None = None, end: datetime.date | None = None) -> None:
+def _write_chunk(
+    job: str,
+    prices: pd.DataFrame,
+    row_counts: Mapping[str, int],
+    bulk: bool,
+    mirror: ParquetPriceStore | None = None,
+) -> crud.UpsertStats:
+    # Prices and their checkpoint rows commit together, so a resumed run never skips unwritten data.
+    # The Parquet mirror is written before the commit: if it fails the chunk is retried on resume.
+    with get_session() as session:
+        if bulk:
+            stats = crud.bulk_upsert_prices(session, prices)
+        else:
+            stats = crud.upsert_prices(session, prices)
+        # A symbol the provider returned nothing for (dropped or failed) stays pending for the next run.
+        loaded = {symbol: rows for symbol, rows in row_counts.items() if rows}
+        crud.mark_symbols_completed(session, job, loaded)
+        if mirror is not None:
+            mirror.write(prices)
+    return stats
+
+
+def run_full_history(
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    provider: PriceProvider | None = None,
+    tickers: Mapping[str, TickerInfo] | None = None,
+    chunk_size: int | None = None,
+    resume: bool = True,
+    fetch_workers: int | None = None,
+    bulk: bool | None = None,
+    rebuild_indexes: bool = False,
+) -> None:
+    """Load full price history in symbol chunks, each committed in its own transaction.
+
+    Chunks flow through a fetch -> normalize/returns -> write pipeline, so the next chunk downloads while
+    the previous one is written. Completed symbols are checkpointed per ``(start, end)`` job so an
+    interrupted run picks up where it stopped; pass ``resume=False`` to start over. A failed fetch stops
+    the run with the chunks before it committed. Only symbols that returned prices are checkpointed, so
+    checkpoints are cleared once every symbol is loaded; if the provider returned nothing for some,
+    they are kept and rerunning the job fetches just those.
+
+    With ``PARQUET_DUAL_WRITE`` (or ``PRICE_STORE=parquet``) each chunk is also merged into the Parquet
+    price store. ``bulk`` (default ``HISTORY_BULK_LOAD``) writes each chunk through a staging-table merge;
+    ``rebuild_indexes`` also drops the secondary price indexes for the whole run and rebuilds them at
+    the end, which is worth it for full reloads of large universes.
+    """
     settings = get_settings()
+    tickers = ALL_TICKERS if tickers is None else tickers
+    chunk_size = chunk_size or settings.history_chunk_size
+    fetch_workers = fetch_workers or settings.etl_fetch_workers
+    bulk = settings.history_bulk_load if bulk is None else bulk
+    mirror = get_mirror_store(settings)
     init_db()
     with get_session() as session:
-        crud.upsert_tickers(session, ALL_TICKERS)
+        crud.upsert_tickers(session, tickers)
 
     start_date = start or settings.default_start_date
-    symbols: Sequence[str] = list_all_symbols()
-
-    raw_prices = yf.download(
-        tickers=" ".join(symbols),
-        start=start_date,
-        end=end,
-        group_by="ticker",
-        auto_adjust=False,
-        progress=False,
-    )
-
-    prices = normalize_yfinance_prices(raw_prices)
-    prices = compute_returns(prices)
-
+    job = _job_key(start_date, end)
+    with get_session() as session:
+        if not resume:
+            crud.clear_checkpoints(session, job)
+        done = crud.completed_symbols(session, job)
+
+    symbols: Sequence[str] = [symbol for symbol in tickers if symbol not in done]
+    if done:
+        logger.info("Resuming %s: %d symbols already loaded, %d remaining", job, len(done), len(symbols))
+
+    report = FetchReport()
+    chunks = [list(symbols[offset : offset + chunk_size]) for offset in range(0, len(symbols), chunk_size)]
+    loaded = 0
+    unloaded: list[str] = []
+
+    def fetch(chunk: list[str]) -> pd.DataFrame:
+        return download_raw_frame(chunk, start=start_date, end=end, provider=provider, report=report)
+
+    def write(chunk: list[str], transformed: tuple[pd.DataFrame, dict[str, int]]) -> None:
+        nonlocal loaded
+        prices, row_counts = transformed
+        stats = _write_chunk(job, prices, row_counts, bulk, mirror)
+        loaded += len(chunk)
+        unloaded.extend(symbol for symbol in chunk if not row_counts.get(symbol))
+        logger.info(
+            "Loaded %d rows for %d symbols (%d/%d): %d inserted, %d updated, %d unchanged",
+            len(prices),
+            len(chunk),
+            loaded,
+            len(symbols),
+            stats.inserted,
+            stats.updated,
+            stats.skipped,
+        )
+
+    if rebuild_indexes:
+        with get_session() as session:
+            crud.drop_price_indexes(session)
+    try:
+        stats = run_pipeline(
+            chunks,
+            fetch,
+            _transform_chunk,
+            write,
+            fetch_workers=fetch_workers,
+            queue_size=settings.etl_queue_size,
+        )
+    finally:
+        if rebuild_indexes:
+            with get_session() as session:
+                crud.create_price_indexes(session)
+        # Also logged when a fetch fails: the report names the symbols that failed and why.
+        logger.info("Historical load %s fetch report: %s", job, report.summary())
+    logger.info("Historical load %s: %s", job, stats.summary())
+
+    missing = sorted(unloaded)
+    if missing:
+        # Checkpoints stay, so rerunning the job fetches only these symbols.
+        logger.warning(
+            "Historical load %s: no prices for %d symbols (%s); rerun to retry them",
+            job,
+            len(missing),
+            ", ".join(missing),
+        )
+        return
     with get_session() as session:
-        crud.upsert_prices(session, prices)
+        crud.clear_checkpoints(session, job)
 
 
 if __name__ == "__main__":
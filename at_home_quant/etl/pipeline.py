@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Generic, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+P = TypeVar("P")
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class PipelineStats:
+    tasks: int = 0
+    written: int = 0
+    fetch_seconds: float = 0.0
+    transform_seconds: float = 0.0
+    write_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def _add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            setattr(self, stage, getattr(self, stage) + seconds)
+
+    def summary(self) -> str:
+        return (
+            f"{self.written}/{self.tasks} tasks in {self.wall_seconds:.2f}s "
+            f"(fetch {self.fetch_seconds:.2f}s, transform {self.transform_seconds:.2f}s, "
+            f"write {self.write_seconds:.2f}s)"
+        )
+
+
+@dataclass
+class _Item(Generic[T]):
+    index: int
+    task: T
+    payload: object = None
+    error: BaseException | None = None
+
+
+class _Pipeline(Generic[T, R, P]):
+    def __init__(
+        self,
+        tasks: Sequence[T],
+        fetch: Callable[[T], R],
+        transform: Callable[[T, R], P],
+        write: Callable[[T, P], None],
+        fetch_workers: int,
+        queue_size: int,
+    ) -> None:
+        self.tasks = list(tasks)
+        self.fetch = fetch
+        self.transform = transform
+        self.write = write
+        self.fetch_workers = max(1, fetch_workers)
+        self.fetched: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.transformed: queue.Queue = queue.Queue(maxsize=queue_size)
+        # Caps how far fetching may run ahead of the writer, including results parked for reordering.
+        self.window = threading.Semaphore(self.fetch_workers + 2 * queue_size)
+        self.failed = threading.Event()
+        self.next_task = 0
+        self.task_lock = threading.Lock()
+        self.error: BaseException | None = None
+        self.stats = PipelineStats(tasks=len(self.tasks))
+
+    def _claim(self) -> int | None:
+        while not self.window.acquire(timeout=_POLL_SECONDS):
+            if self.failed.is_set():
+                return None
+        with self.task_lock:
+            if self.failed.is_set() or self.next_task >= len(self.tasks):
+                self.window.release()
+                return None
+            index = self.next_task
+            self.next_task += 1
+            return index
+
+    def _fetch_worker(self) -> None:
+        try:
+            while (index := self._claim()) is not None:
+                item = _Item(index, self.tasks[index])
+                began = time.perf_counter()
+                try:
+                    item.payload = self.fetch(item.task)
+                except Exception as exc:  # noqa: BLE001 - handed to the writer, which stops in order
+                    item.error = exc
+                    self.failed.set()
+                self.stats._add("fetch_seconds", time.perf_counter() - began)
+                self.fetched.put(item)
+        finally:
+            self.fetched.put(_DONE)
+
+    def _transform_worker(self) -> None:
+        remaining = self.fetch_workers
+        while remaining:
+            item = self.fetched.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            if item.error is None:
+                began = time.perf_counter()
+                try:
+                    item.payload = self.transform(item.task, item.payload)
+                except Exception as exc:  # noqa: BLE001
+                    item.error = exc
+                    self.failed.set()
+                self.stats._add("transform_seconds", time.perf_counter() - began)
+            self.transformed.put(item)
+        self.transformed.put(_DONE)
+
+    def _write_worker(self) -> None:
+        # Tasks are written strictly in order, so a failure leaves exactly the tasks before it written,
+        # the same state a sequential run would leave behind.
+        parked: dict[int, _Item] = {}
+        next_index = 0
+        while (item := self.transformed.get()) is not _DONE:
+            parked[item.index] = item
+            while next_index in parked:
+                ready = parked.pop(next_index)
+                next_index += 1
+                self.window.release()
+                if self.error is not None:
+                    continue
+                if ready.error is not None:
+                    self.error = ready.error
+                    continue
+                began = time.perf_counter()
+                try:
+                    self.write(ready.task, ready.payload)
+                    self.stats.written += 1
+                except Exception as exc:  # noqa: BLE001
+                    self.error = exc
+                    self.failed.set()
+                self.stats._add("write_seconds", time.perf_counter() - began)
+        if self.error is None:
+            # Out-of-order results are only left behind when an earlier task failed.
+            errors = [item.error for _, item in sorted(parked.items()) if item.error is not None]
+            self.error = errors[0] if errors else None
+
+    def run(self) -> PipelineStats:
+        began = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._fetch_worker, name=f"etl-fetch-{i}", daemon=True)
+            for i in range(self.fetch_workers)
+        ]
+        threads.append(threading.Thread(target=self._transform_worker, name="etl-transform", daemon=True))
+        threads.append(threading.Thread(target=self._write_worker, name="etl-writer", daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stats.wall_seconds = time.perf_counter() - began
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+
+def run_pipeline(
+    tasks: Sequence[T],
+    fetch: Callable[[T], R],
+    transform: Callable[[T, R], P],
+    write: Callable[[T, P], None],
+    fetch_workers: int = 1,
+    queue_size: int = 4,
+) -> PipelineStats:
+    """Run ``fetch -> transform -> write`` over ``tasks`` with the three stages overlapping.
+
+    ``fetch_workers`` threads fetch, one thread transforms and one thread writes, connected by queues of
+    ``queue_size`` so a slow stage holds the others back instead of buffering without bound. Writes
+    happen in task order. The first failure stops new fetches, lets every earlier task finish writing,
+    and is re-raised here.
+    """
+    return _Pipeline(tasks, fetch, transform, write, fetch_workers, queue_size).run()
+
+
+__all__ = ["PipelineStats", "run_pipeline"]
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, field
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from at_home_quant.data.calendars import calendar_for_symbol, trading_days
+from at_home_quant.db.models import PriceDaily, PriceGap, Ticker, TickerWatermark
+
+# Missing runs separated by at most this many stored sessions are fetched as one range: re-downloading
+# a few days we already have is cheaper than another request.
+DEFAULT_MERGE_WITHIN = 5
+
+_QUERY_CHUNK_SIZE = 500
+
+
+@dataclass(frozen=True)
+class FetchRange:
+    start: datetime.date
+    end: datetime.date  # inclusive
+
+
+@dataclass
+class FetchBatch:
+    start: datetime.date
+    end: datetime.date  # inclusive
+    symbols: list[str]
+
+    @property
+    def end_exclusive(self) -> datetime.date:
+        return self.end + datetime.timedelta(days=1)
+
+
+@dataclass
+class FetchPlan:
+    batches: list[FetchBatch] = field(default_factory=list)
+    # Earliest repaired date per symbol whose plan includes ranges inside its stored history.
+    repairs: dict[str, datetime.date] = field(default_factory=dict)
+    # The interior sessions each repaired symbol lacks; those the fetch does not return are gaps.
+    missing: dict[str, pd.DatetimeIndex] = field(default_factory=dict)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.batches
+
+
+def missing_ranges(
+    stored: pd.DatetimeIndex, expected: pd.DatetimeIndex, merge_within: int = DEFAULT_MERGE_WITHIN
+) -> list[FetchRange]:
+    """Group the ``expected`` sessions absent from ``stored`` into contiguous fetch ranges."""
+    if expected.empty:
+        return []
+    missing = np.flatnonzero(~expected.isin(stored))
+    if missing.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(missing) > merge_within + 1)
+    starts = np.concatenate(([missing[0]], missing[breaks + 1]))
+    ends = np.concatenate((missing[breaks], [missing[-1]]))
+    return [FetchRange(expected[s].date(), expected[e].date()) for s, e in zip(starts, ends)]
+
+
+def _chunks(items: Sequence, size: int = _QUERY_CHUNK_SIZE):
+    for offset in range(0, len(items), size):
+        yield items[offset : offset + size]
+
+
+def _history_bounds(session: Session, symbols: Sequence[str]) -> dict[str, tuple[int, datetime.date, datetime.date, int]]:
+    bounds = {}
+    for chunk in _chunks(list(symbols)):
+        stmt = (
+            select(
+                Ticker.symbol,
+                Ticker.id,
+                TickerWatermark.min_date,
+                TickerWatermark.max_date,
+                TickerWatermark.row_count,
+            )
+            .join(TickerWatermark, TickerWatermark.ticker_id == Ticker.id)
+            .where(Ticker.symbol.in_(chunk))
+        )
+        for symbol, ticker_id, first, last, count in session.execute(stmt).all():
+            bounds[symbol] = (ticker_id, first, last, count)
+    return bounds
+
+
+def _stored_dates(session: Session, ticker_ids: Sequence[int]) -> dict[int, pd.DatetimeIndex]:
+    dates: dict[int, list[datetime.date]] = {}
+    for chunk in _chunks(list(ticker_ids)):
+        stmt = select(PriceDaily.ticker_id, PriceDaily.date).where(PriceDaily.ticker_id.in_(chunk))
+        for ticker_id, date in session.execute(stmt).all():
+            dates.setdefault(ticker_id, []).append(date)
+    return {ticker_id: pd.DatetimeIndex(values) for ticker_id, values in dates.items()}
+
+
+def _gap_counts(session: Session, ticker_ids: Sequence[int]) -> dict[int, int]:
+    counts: dict[int, int] = {}
+    for chunk in _chunks(list(ticker_ids)):
+        stmt = (
+            select(PriceGap.ticker_id, func.count())
+            .join(TickerWatermark, TickerWatermark.ticker_id == PriceGap.ticker_id)
+            .where(
+                PriceGap.ticker_id.in_(chunk),
+                PriceGap.date.between(TickerWatermark.min_date, TickerWatermark.max_date),
+            )
+            .group_by(PriceGap.ticker_id)
+        )
+        counts.update(session.execute(stmt).all())
+    return counts
+
+
+def _gap_dates(session: Session, ticker_ids: Sequence[int]) -> dict[int, pd.DatetimeIndex]:
+    dates: dict[int, list[datetime.date]] = {}
+    for chunk in _chunks(list(ticker_ids)):
+        stmt = select(PriceGap.ticker_id, PriceGap.date).where(PriceGap.ticker_id.in_(chunk))
+        for ticker_id, date in session.execute(stmt).all():
+            dates.setdefault(ticker_id, []).append(date)
+    return {ticker_id: pd.DatetimeIndex(values) for ticker_id, values in dates.items()}
+
+
+def build_fetch_plan(
+    session: Session,
+    symbols: Sequence[str],
+    default_start: datetime.date,
+    as_of: datetime.date | None = None,
+    repair_gaps: bool = True,
+    merge_within: int = DEFAULT_MERGE_WITHIN,
+    overlap_days: int = 0,
+) -> FetchPlan:
+    """Plan the minimal downloads that bring every symbol up to ``as_of`` without holes.
+
+    Expected sessions come from the symbol's exchange calendar, less the sessions recorded in
+    ``price_gaps`` as ones the provider has no bar for. A symbol whose watermark ``row_count`` plus
+    recorded gaps covers every calendar session in its history skips the per-date comparison, so a
+    fully loaded symbol costs one watermark row. Only the others load their stored dates. Symbols
+    needing identical ranges share one batch. With ``overlap_days`` a stored symbol's tail starts
+    that many calendar days before its first missing session, so the refetched bars can be compared
+    with the stored ones.
+    """
+    as_of = as_of or datetime.date.today()
+    bounds = _history_bounds(session, symbols)
+
+    candidate_ids: list[int] = []
+    if repair_gaps:
+        gap_counts = _gap_counts(session, [ticker_id for ticker_id, *_ in bounds.values()])
+        for symbol, (ticker_id, first, last, count) in bounds.items():
+            sessions = len(trading_days(calendar_for_symbol(symbol), first, last))
+            if count + gap_counts.get(ticker_id, 0) < sessions:
+                candidate_ids.append(ticker_id)
+    stored = _stored_dates(session, candidate_ids) if candidate_ids else {}
+    gaps = _gap_dates(session, candidate_ids) if candidate_ids else {}
+
+    plan = FetchPlan()
+    symbols_by_range: dict[FetchRange, list[str]] = {}
+    for symbol in symbols:
+        calendar = calendar_for_symbol(symbol)
+        if symbol not in bounds:
+            if default_start <= as_of:
+                symbols_by_range.setdefault(FetchRange(default_start, as_of), []).append(symbol)
+            continue
+
+        ticker_id, first, last, _ = bounds[symbol]
+        tail = trading_days(calendar, last + datetime.timedelta(days=1), as_of)
+        if ticker_id in stored:
+            interior = trading_days(calendar, first, last)
+            interior = interior[~interior.isin(gaps.get(ticker_id, pd.DatetimeIndex([])))]
+            present = stored[ticker_id]
+            missing = interior[~interior.isin(present)]
+            if not missing.empty:
+                plan.missing[symbol] = missing
+            expected = interior.append(tail)
+        else:
+            expected = tail
+            present = pd.DatetimeIndex([])
+        for fetch_range in missing_ranges(present, expected, merge_within=merge_within):
+            if fetch_range.start <= last:
+                plan.repairs[symbol] = min(plan.repairs.get(symbol, fetch_range.start), fetch_range.start)
+            elif overlap_days:
+                overlap_start = max(first, fetch_range.start - datetime.timedelta(days=overlap_days))
+                fetch_range = FetchRange(overlap_start, fetch_range.end)
+            symbols_by_range.setdefault(fetch_range, []).append(symbol)
+
+    plan.batches = [
+        FetchBatch(start=r.start, end=r.end, symbols=group)
+        for r, group in sorted(symbols_by_range.items(), key=lambda item: (item[0].start, item[0].end))
+    ]
+    return plan
+
+
+__all__ = [
+    "DEFAULT_MERGE_WITHIN",
+    "FetchBatch",
+    "FetchPlan",
+    "FetchRange",
+    "build_fetch_plan",
+    "missing_ranges",
+]
@@ -3,47 +3,34 @@ from __future__ import annotations
 import datetime
 from typing import Iterable, List, Tuple
 
+import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from at_home_quant.data.store import PriceStore, get_price_store
 from at_home_quant.data.tickers import UNIVERSE_BENCHMARK_SYMBOL, Universe
-from at_home_quant.db.models import PortfolioSnapshot, PriceDaily, Ticker
-from at_home_quant.db.session import get_session
+from at_home_quant.db import crud
+from at_home_quant.db.models import PortfolioSnapshot
+from at_home_quant.db.session import get_read_session
 from at_home_quant.performance.models import MonthlyPerformance
 from at_home_quant.portfolio.models import TargetPortfolio, TargetPosition
 from at_home_quant.regime.service import get_current_regime
 
 
-def _deserialize_positions(data: list[dict]) -> list[TargetPosition]:
-    return [TargetPosition(**item) for item in data]
-
-
-def _load_price_on_or_before(session: Session, symbol: str, as_of_date: datetime.date) -> float:
-    row = (
-        session.execute(
-            select(PriceDaily.adj_close)
-            .join(Ticker, Ticker.id == PriceDaily.ticker_id)
-            .where(Ticker.symbol == symbol, PriceDaily.date <= as_of_date)
-            .order_by(PriceDaily.date.desc())
-        )
-        .scalars()
-        .first()
-    )
-    if row is None:
+def _price(prices: pd.DataFrame, symbol: str, as_of_date: datetime.date) -> float:
+    price = prices.at[as_of_date, symbol] if symbol in prices.columns else float("nan")
+    if pd.isna(price):
         raise ValueError(f"No price available for {symbol} on or before {as_of_date}")
-    return float(row)
+    return float(price)
 
 
-def compute_portfolio_return_for_period(
-    start_date: datetime.date,
-    end_date: datetime.date,
-    portfolio_snapshot: TargetPortfolio,
-    session: Session,
+def _portfolio_return(
+    prices: pd.DataFrame, start_date: datetime.date, end_date: datetime.date, portfolio: TargetPortfolio
 ) -> float:
     returns: List[float] = []
-    for position in portfolio_snapshot.positions:
-        start_price = _load_price_on_or_before(session, position.ticker, start_date)
-        end_price = _load_price_on_or_before(session, position.ticker, end_date)
+    for position in portfolio.positions:
+        start_price = _price(prices, position.ticker, start_date)
+        end_price = _price(prices, position.ticker, end_date)
         if start_price == 0:
             raise ValueError(f"Start price for {position.ticker} is zero")
         pct_return = (end_price / start_price) - 1.0
@@ -51,13 +38,7 @@ def compute_portfolio_return_for_period(
     return sum(returns)
 
 
-def compute_benchmark_return_for_period(
-    start_date: datetime.date,
-    end_date: datetime.date,
-    session: Session,
-    regime_getter=get_current_regime,
-) -> Tuple[str, float]:
-    decision = regime_getter(end_date, session=session)
+def _benchmark_symbol(decision) -> str:
     universe_key = decision.best_universe
     universe_enum = None
     if isinstance(universe_key, Universe):
@@ -74,19 +55,49 @@ def compute_benchmark_return_for_period(
     benchmark_symbol = UNIVERSE_BENCHMARK_SYMBOL.get(universe_enum)
     if benchmark_symbol is None:
         raise ValueError(f"No benchmark defined for universe {decision.best_universe}")
-    start_price = _load_price_on_or_before(session, benchmark_symbol, start_date)
-    end_price = _load_price_on_or_before(session, benchmark_symbol, end_date)
-    benchmark_return = (end_price / start_price) - 1.0
-    return benchmark_symbol, benchmark_return
+    return benchmark_symbol
+
+
+def _benchmark_return(
+    prices: pd.DataFrame, start_date: datetime.date, end_date: datetime.date, benchmark_symbol: str
+) -> float:
+    start_price = _price(prices, benchmark_symbol, start_date)
+    end_price = _price(prices, benchmark_symbol, end_date)
+    return (end_price / start_price) - 1.0
+
+
+def compute_portfolio_return_for_period(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    portfolio_snapshot: TargetPortfolio,
+    session: Session,
+    store: PriceStore | None = None,
+) -> float:
+    store = store or get_price_store(session)
+    symbols = [position.ticker for position in portfolio_snapshot.positions]
+    prices = store.prices_as_of(symbols, [start_date, end_date])
+    return _portfolio_return(prices, start_date, end_date, portfolio_snapshot)
 
 
-def _snapshot_to_portfolio(snapshot: PortfolioSnapshot) -> TargetPortfolio:
-    import json
+def compute_benchmark_return_for_period(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    session: Session,
+    regime_getter=get_current_regime,
+    store: PriceStore | None = None,
+) -> Tuple[str, float]:
+    store = store or get_price_store(session)
+    benchmark_symbol = _benchmark_symbol(regime_getter(end_date, session=session))
+    prices = store.prices_as_of([benchmark_symbol], [start_date, end_date])
+    return benchmark_symbol, _benchmark_return(prices, start_date, end_date, benchmark_symbol)
+
 
-    positions = _deserialize_positions(json.loads(snapshot.positions_json))
+def _snapshot_to_portfolio(snapshot: PortfolioSnapshot, positions: pd.DataFrame) -> TargetPortfolio:
+    """``positions`` holds the snapshot's ``symbol, weight, asset_type`` rows."""
+    rows = positions[["symbol", "weight", "asset_type"]].itertuples(index=False)
     return TargetPortfolio(
         as_of_date=snapshot.as_of_date,
-        positions=positions,
+        positions=[TargetPosition(*row) for row in rows],
         universe_name=snapshot.universe_name,
         equity_exposure=snapshot.equity_exposure,
         defensive_exposure=snapshot.defensive_exposure,
@@ -96,25 +107,42 @@ def _snapshot_to_portfolio(snapshot: PortfolioSnapshot) -> TargetPortfolio:
 def compute_monthly_performance_series(
     session: Session | None = None,
     regime_getter=get_current_regime,
+    store: PriceStore | None = None,
 ) -> List[MonthlyPerformance]:
     def _compute(session_obj: Session) -> List[MonthlyPerformance]:
+        prices = store or get_price_store(session_obj)
         snapshots: Iterable[PortfolioSnapshot] = session_obj.execute(
             select(PortfolioSnapshot).order_by(PortfolioSnapshot.as_of_date)
         ).scalars()
         snapshots_list = list(snapshots)
-        performances: List[MonthlyPerformance] = []
-        for prev, curr in zip(snapshots_list, snapshots_list[1:]):
-            start_portfolio = _snapshot_to_portfolio(prev)
-            portfolio_return = compute_portfolio_return_for_period(
-                prev.as_of_date, curr.as_of_date, start_portfolio, session_obj
-            )
-            benchmark_name, benchmark_return = compute_benchmark_return_for_period(
-                prev.as_of_date, curr.as_of_date, session_obj, regime_getter=regime_getter
+        # Every snapshot's holdings in one query, split per snapshot in memory.
+        positions = crud.portfolio_positions(session_obj)
+        by_snapshot = dict(iter(positions.groupby("snapshot_id")))
+        no_positions = positions.iloc[0:0]
+        periods = [
+            (
+                prev.as_of_date,
+                curr.as_of_date,
+                _snapshot_to_portfolio(prev, by_snapshot.get(prev.id, no_positions)),
             )
+            for prev, curr in zip(snapshots_list, snapshots_list[1:])
+        ]
+        benchmarks = [
+            _benchmark_symbol(regime_getter(end_date, session=session_obj)) for _, end_date, _ in periods
+        ]
+        symbols = [position.ticker for _, _, portfolio in periods for position in portfolio.positions]
+        # Every price the series needs, resolved in one pass instead of two lookups per position per month.
+        price_matrix = prices.prices_as_of(
+            list(dict.fromkeys(symbols + benchmarks)), [snapshot.as_of_date for snapshot in snapshots_list]
+        )
+        performances: List[MonthlyPerformance] = []
+        for (start_date, end_date, portfolio), benchmark_name in zip(periods, benchmarks):
+            portfolio_return = _portfolio_return(price_matrix, start_date, end_date, portfolio)
+            benchmark_return = _benchmark_return(price_matrix, start_date, end_date, benchmark_name)
             performances.append(
                 MonthlyPerformance(
-                    period_start=prev.as_of_date,
-                    period_end=curr.as_of_date,
+                    period_start=start_date,
+                    period_end=end_date,
                     portfolio_return=portfolio_return,
                     benchmark_name=benchmark_name,
                     benchmark_return=benchmark_return,
@@ -126,11 +154,33 @@ def compute_monthly_performance_series(
     if session is not None:
         return _compute(session)
 
-    with get_session() as session_obj:
+    with get_read_session() as session_obj:
+        return _compute(session_obj)
+
+
+def compute_turnover_series(session: Session | None = None) -> pd.Series:
+    """One-way turnover into each snapshot: half the summed absolute weight changes from the previous one.
+
+    The first snapshot is measured against an empty portfolio, so its turnover is half its gross weight.
+    """
+
+    def _compute(session_obj: Session) -> pd.Series:
+        weights = crud.portfolio_weights(session_obj)
+        if weights.empty:
+            return pd.Series(dtype=float, name="turnover")
+        changes = weights.diff()
+        changes.iloc[0] = weights.iloc[0]
+        return (changes.abs().sum(axis=1) / 2.0).rename("turnover")
+
+    if session is not None:
+        return _compute(session)
+
+    with get_read_session() as session_obj:
         return _compute(session_obj)
 
 
 __all__ = [
+    "compute_turnover_series",
     "compute_portfolio_return_for_period",
     "compute_benchmark_return_for_period",
     "compute_monthly_performance_series",
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from sqlalchemy.orm import Session
 
-from at_home_quant.db.session import get_session
+from at_home_quant.db.session import get_read_session
 from at_home_quant.performance.calc import compute_monthly_performance_series
 from at_home_quant.performance.models import MonthlyPerformance, PerformanceSummary
 from at_home_quant.performance.stats import compute_performance_summary
@@ -17,7 +17,7 @@ def get_monthly_performance(
         regime_getter = regime_getter_default
     if session is not None:
         return compute_monthly_performance_series(session=session, regime_getter=regime_getter)
-    with get_session() as session_obj:
+    with get_read_session() as session_obj:
         return compute_monthly_performance_series(session=session_obj, regime_getter=regime_getter)
 
 
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 import datetime
-import json
 from typing import List
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from at_home_quant.db import crud
 from at_home_quant.db.models import Base, PortfolioSnapshot
 from at_home_quant.db.session import get_session
 from at_home_quant.portfolio.models import RebalanceInstruction, TargetPortfolio, TargetPosition
@@ -21,46 +21,29 @@ from at_home_quant.regime.service import get_current_regime
 from at_home_quant.selection.service import rank_universe
 
 
-def _serialize_positions(positions: List[TargetPosition]) -> list[dict]:
-    return [
-        {"ticker": p.ticker, "weight": p.weight, "asset_type": p.asset_type}
-        for p in positions
-    ]
-
-
-def _deserialize_positions(data: list[dict]) -> list[TargetPosition]:
-    return [TargetPosition(**item) for item in data]
-
-
 def _save_snapshot(session: Session, portfolio: TargetPortfolio) -> None:
     Base.metadata.create_all(bind=session.bind)
-    existing = session.execute(
-        select(PortfolioSnapshot).where(PortfolioSnapshot.as_of_date == portfolio.as_of_date)
-    ).scalar_one_or_none()
-    if existing:
-        session.delete(existing)
-        session.flush()
-    snapshot = PortfolioSnapshot(
+    crud.save_portfolio_snapshot(
+        session,
         as_of_date=portfolio.as_of_date,
         universe_name=portfolio.universe_name,
         equity_exposure=portfolio.equity_exposure,
         defensive_exposure=portfolio.defensive_exposure,
-        positions_json=json.dumps(_serialize_positions(portfolio.positions)),
+        positions=[(p.ticker, p.weight, p.asset_type) for p in portfolio.positions],
     )
-    session.add(snapshot)
     session.commit()
 
 
 def _load_last_snapshot(session: Session) -> TargetPortfolio | None:
     row = session.execute(
-        select(PortfolioSnapshot).order_by(PortfolioSnapshot.as_of_date.desc())
+        select(PortfolioSnapshot).order_by(PortfolioSnapshot.as_of_date.desc()).limit(1)
     ).scalar_one_or_none()
     if row is None:
         return None
-    positions = _deserialize_positions(json.loads(row.positions_json))
+    positions = crud.portfolio_positions(session, [row.id])[["symbol", "weight", "asset_type"]]
     portfolio = TargetPortfolio(
         as_of_date=row.as_of_date,
-        positions=positions,
+        positions=[TargetPosition(*position) for position in positions.itertuples(index=False)],
         universe_name=row.universe_name,
         equity_exposure=row.equity_exposure,
         defensive_exposure=row.defensive_exposure,
@@ -3,13 +3,11 @@ from __future__ import annotations
 import datetime
 from typing import List
 
-import pandas as pd
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from at_home_quant.data.store import PriceStore, get_price_store
 from at_home_quant.data.tickers import UNIVERSE_BENCHMARK_SYMBOL, Universe
-from at_home_quant.db.models import PriceDaily, Ticker
-from at_home_quant.db.session import get_session
+from at_home_quant.db.session import get_read_session
 from at_home_quant.regime.models import RegimeDecision, UniverseScore
 from at_home_quant.regime.scoring import compute_composite_score, equity_exposure_from_score
 from at_home_quant.regime.signals import (
@@ -21,28 +19,14 @@ from at_home_quant.regime.signals import (
 )
 
 
-def _load_price_series(session: Session, symbol: str, as_of_date: datetime.date) -> pd.Series:
-    stmt = (
-        select(PriceDaily.date, PriceDaily.adj_close)
-        .join(Ticker, Ticker.id == PriceDaily.ticker_id)
-        .where(Ticker.symbol == symbol, PriceDaily.date <= as_of_date)
-        .order_by(PriceDaily.date)
-    )
-    rows = session.execute(stmt).all()
-    if not rows:
-        return pd.Series(dtype=float)
-    df = pd.DataFrame(rows, columns=["date", "adj_close"]).set_index("date")
-    return df["adj_close"]
-
-
-def _compute_scores(session: Session, as_of_date: datetime.date) -> list[UniverseScore]:
+def _compute_scores(store: PriceStore, as_of_date: datetime.date) -> list[UniverseScore]:
     trend_data: dict[Universe, tuple] = {}
     momentum_dict: dict[str, tuple[float, float]] = {}
     volatility: dict[Universe, float] = {}
     drawdowns: dict[Universe, float] = {}
 
     for universe, symbol in UNIVERSE_BENCHMARK_SYMBOL.items():
-        series = _load_price_series(session, symbol, as_of_date)
+        series = store.load_series(symbol, end=as_of_date)
         if series.empty:
             raise ValueError(f"No price history for {symbol} up to {as_of_date}")
         trend_signal = compute_trend(series)
@@ -87,16 +71,22 @@ def _compute_scores(session: Session, as_of_date: datetime.date) -> list[Univers
     return scores
 
 
-def get_universe_scores(as_of_date: datetime.date, session: Session | None = None) -> list[UniverseScore]:
+def get_universe_scores(
+    as_of_date: datetime.date, session: Session | None = None, store: PriceStore | None = None
+) -> list[UniverseScore]:
+    if store is not None:
+        return _compute_scores(store, as_of_date)
     if session is not None:
-        return _compute_scores(session, as_of_date)
+        return _compute_scores(get_price_store(session), as_of_date)
 
-    with get_session() as session_obj:
-        return _compute_scores(session_obj, as_of_date)
+    with get_read_session() as session_obj:
+        return _compute_scores(get_price_store(session_obj), as_of_date)
 
 
-def get_current_regime(as_of_date: datetime.date, session: Session | None = None) -> RegimeDecision:
-    scores = get_universe_scores(as_of_date, session=session)
+def get_current_regime(
+    as_of_date: datetime.date, session: Session | None = None, store: PriceStore | None = None
+) -> RegimeDecision:
+    scores = get_universe_scores(as_of_date, session=session, store=store)
     if not scores:
         raise ValueError("No universe scores available")
     best = max(scores, key=lambda s: s.composite_score)
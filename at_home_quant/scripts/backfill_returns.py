@@ -0,0 +1,24 @@
+import argparse
+import datetime
+
+from at_home_quant.db import crud
+from at_home_quant.db.session import get_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute stored daily returns in place for a date range")
+    parser.add_argument("--start", required=True, help="First date to repair YYYY-MM-DD")
+    parser.add_argument("--end", required=False, help="Last date to repair YYYY-MM-DD (defaults to today)")
+    parser.add_argument("--symbols", nargs="*", help="Restrict the repair to these symbols")
+    args = parser.parse_args()
+
+    start = datetime.date.fromisoformat(args.start)
+    end = datetime.date.fromisoformat(args.end) if args.end else datetime.date.today()
+
+    with get_session() as session:
+        updated = crud.backfill_returns(session, start, end, symbols=args.symbols or None)
+    print(f"Recomputed return_ for {updated} rows between {start} and {end}")
+
+
+if __name__ == "__main__":
+    main()
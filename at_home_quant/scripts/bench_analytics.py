@@ -0,0 +1,95 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from at_home_quant.scripts.bench_upsert import price_frame
+
+
+def _timed(label: str, func) -> object:
+    began = time.perf_counter()
+    result = func()
+    print(f"{label}: {time.perf_counter() - began:.3f}s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare ORM, PriceStore and DuckDB ranking and as-of reads")
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--month-ends", dest="month_ends", type=int, default=60, help="As-of grid dates")
+    parser.add_argument("--db", dest="db_path", help="SQLite file to load into (defaults to a temp file)")
+    args = parser.parse_args()
+
+    db_path = Path(args.db_path) if args.db_path else Path(tempfile.mkdtemp(prefix="aq-bench-")) / "bench.db"
+    # The engine is configured from the environment at import time, so point it at the bench DB first.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from sqlalchemy import select
+
+    from at_home_quant.data.analytics import AnalyticsEngine
+    from at_home_quant.data.store import PRICE_COLUMNS, ParquetPriceStore, SqlPriceStore
+    from at_home_quant.data.tickers import TickerInfo, TickerType, Universe
+    from at_home_quant.db import crud
+    from at_home_quant.db.models import PriceDaily, Ticker
+    from at_home_quant.db.session import get_read_session, get_session, init_db
+    from at_home_quant.selection.service import _compute_factors_for_ticker
+
+    df = price_frame(args.symbols, args.days)
+    symbols = list(df["symbol"].unique())
+    init_db()
+    with get_session() as session:
+        tickers = {s: TickerInfo(s, s, TickerType.EQUITY, Universe.SP500, "USD") for s in symbols}
+        crud.upsert_tickers(session, tickers)
+        crud.bulk_upsert_prices(session, df)
+    parquet_root = db_path.parent / "parquet"
+    with get_read_session() as session:
+        ParquetPriceStore(parquet_root).write(SqlPriceStore(session).load_frame(symbols, columns=PRICE_COLUMNS))
+
+    as_of = df["date"].max().date()
+    grid = [d.date() for d in pd.date_range(end=as_of, periods=args.month_ends, freq="BME")]
+    print(f"{len(df):,} rows, {len(symbols)} symbols; as-of grid {len(grid)} dates x {len(symbols)} symbols")
+
+    with get_read_session() as session:
+
+        def orm_factors() -> None:
+            # The original ranking path: one ORM query per symbol, factors in pandas.
+            for symbol in symbols:
+                rows = session.execute(
+                    select(PriceDaily.date, PriceDaily.adj_close)
+                    .join(Ticker, Ticker.id == PriceDaily.ticker_id)
+                    .where(Ticker.symbol == symbol, PriceDaily.date <= as_of)
+                    .order_by(PriceDaily.date)
+                ).all()
+                series = pd.DataFrame(rows, columns=["date", "adj_close"]).set_index("date")["adj_close"]
+                _compute_factors_for_ticker(symbol, series)
+
+        def store_factors() -> None:
+            prices = SqlPriceStore(session).load_frame(symbols, end=as_of)
+            for symbol, rows in prices.groupby("symbol"):
+                _compute_factors_for_ticker(symbol, rows.set_index("date")["adj_close"])
+
+        def orm_as_of() -> None:
+            store = SqlPriceStore(session)
+            for date in grid:
+                for symbol in symbols:
+                    store.price_on_or_before(symbol, date)
+
+        _timed("factors, ORM query per symbol", orm_factors)
+        _timed("factors, one SqlPriceStore frame", store_factors)
+        _timed("as-of grid, ORM query per cell", orm_as_of)
+
+    for label, engine in (
+        ("duckdb/sqlite", AnalyticsEngine(sqlite_path=db_path)),
+        ("duckdb/parquet", AnalyticsEngine(parquet_root=parquet_root)),
+    ):
+        _timed(f"factors, {label}", lambda: engine.momentum_factors(symbols, as_of))
+        _timed(f"as-of grid, {label}", lambda: engine.prices_as_of(symbols, grid))
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from at_home_quant.data.normalize import OUTPUT_COLUMNS, normalize_yfinance_prices
+from at_home_quant.data.providers import RAW_FIELDS
+
+
+def legacy_normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """The previous stack-based implementation, kept for comparison."""
+    ticker_level = 0 if set(df.columns.get_level_values(0)).isdisjoint(RAW_FIELDS) else -1
+    stacked = df.stack(level=ticker_level).dropna(how="all").rename_axis(["date", "symbol"]).reset_index()
+    field_map = {
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Close": "close",
+        "Adj Close": "adj_close",
+        "Volume": "volume",
+    }
+    normalized = stacked.rename(columns={k: v for k, v in field_map.items() if k in stacked.columns})
+    if "adj_close" in normalized.columns:
+        normalized["close"] = normalized["adj_close"]
+    normalized["date"] = pd.to_datetime(normalized["date"])
+    normalized = normalized[[col for col in OUTPUT_COLUMNS if col in normalized.columns]]
+    return normalized.sort_values(["symbol", "date"]).reset_index(drop=True)
+
+
+def wide_frame(n_symbols: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_days, name="Date")
+    columns = pd.MultiIndex.from_product([[f"SYN{i:04d}" for i in range(n_symbols)], RAW_FIELDS])
+    values = 100.0 + rng.standard_normal((n_days, len(columns))).cumsum(axis=0)
+    # Mimic listings that start part-way through the window.
+    for i in range(0, n_symbols, 7):
+        values[: rng.integers(n_days), i * len(RAW_FIELDS) : (i + 1) * len(RAW_FIELDS)] = np.nan
+    return pd.DataFrame(values, index=dates, columns=columns)
+
+
+def measure(fn, df: pd.DataFrame) -> tuple[pd.DataFrame, float, float]:
+    tracemalloc.start()
+    began = time.perf_counter()
+    result = fn(df)
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare wide-frame price normalization implementations")
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=6000)
+    args = parser.parse_args()
+
+    df = wide_frame(args.symbols, args.days)
+    print(f"Input: {args.symbols} symbols x {args.days} days, {df.memory_usage(deep=True).sum() / 2**20:,.0f} MiB")
+
+    legacy, legacy_time, legacy_peak = measure(legacy_normalize, df)
+    del legacy
+    current, current_time, current_peak = measure(normalize_yfinance_prices, df)
+    print(f"legacy:     {legacy_time:7.2f}s  peak {legacy_peak:9,.0f} MiB")
+    print(f"vectorized: {current_time:7.2f}s  peak {current_peak:9,.0f} MiB  ({len(current):,} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import pkgutil
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules that should only load when an entry point actually needs them.
+HEAVY_MODULES = (
+    "yfinance",
+    "streamlit",
+    "pyarrow",
+    "duckdb",
+    "at_home_quant.etl.daily_update",
+    "at_home_quant.etl.historical_load",
+    "at_home_quant.data.fetcher",
+)
+
+EXTRA_ENTRY_POINTS = (
+    "at_home_quant.app",
+    "at_home_quant.etl.daily_update",
+    "at_home_quant.etl.historical_load",
+)
+
+# Runs in a fresh interpreter so nothing is already in sys.modules.
+_PROBE = """
+import importlib, json, sys, time
+began = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - began
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def entry_points() -> list[str]:
+    scripts_dir = Path(__file__).resolve().parent
+    scripts = sorted(
+        f"at_home_quant.scripts.{info.name}"
+        for info in pkgutil.iter_modules([str(scripts_dir)])
+        if info.name != "__init__"
+    )
+    return scripts + list(EXTRA_ENTRY_POINTS)
+
+
+def probe(module: str) -> tuple[float, list[str]]:
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        raise RuntimeError(error[-1] if error else f"import of {module} failed")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return result["seconds"], result["loaded"]
+
+
+def import_profile(module: str, top: int) -> list[tuple[int, str]]:
+    """Largest cumulative entries from ``python -X importtime`` for one module."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=False
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold import time of each entry point")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--module", action="append", help="Only measure these modules")
+    parser.add_argument("--profile", type=int, default=0, help="Show the N slowest imports per entry point")
+    args = parser.parse_args()
+
+    modules = args.module or entry_points()
+    width = max(len(module) for module in modules)
+    print(f"{'entry point':<{width}}  {'median s':>9}  {'min s':>7}  heavy modules loaded")
+    for module in modules:
+        try:
+            runs = [probe(module) for _ in range(args.repeat)]
+        except RuntimeError as exc:
+            print(f"{module:<{width}}  {'failed':>9}  {'':>7}  {exc}")
+            continue
+        seconds = [elapsed for elapsed, _ in runs]
+        loaded = ", ".join(runs[-1][1]) or "-"
+        print(f"{module:<{width}}  {statistics.median(seconds):>9.3f}  {min(seconds):>7.3f}  {loaded}")
+        for cumulative, name in import_profile(module, args.profile) if args.profile else ():
+            print(f"{'':<{width}}    {cumulative / 1e6:>7.3f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def price_frame(n_symbols: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_days)
+    close = 100.0 * np.exp(rng.normal(0.0003, 0.015, size=(n_symbols, n_days)).cumsum(axis=1)).ravel()
+    return pd.DataFrame(
+        {
+            "symbol": np.repeat([f"SYN{i:04d}" for i in range(n_symbols)], n_days),
+            "date": np.tile(dates, n_symbols),
+            "open": close,
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "adj_close": close,
+            "volume": rng.integers(1_000, 10_000, size=n_symbols * n_days).astype(float),
+            "return_": 0.0,
+        }
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure price write throughput in rows per second")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--chunk-rows", dest="chunk_rows", type=int, default=None)
+    parser.add_argument(
+        "--mode",
+        choices=["upsert", "bulk", "bulk-rebuild"],
+        default="upsert",
+        help="Per-row upsert, staging-table merge, or merge with secondary indexes rebuilt",
+    )
+    parser.add_argument("--db", dest="db_path", help="SQLite file to load into (defaults to a temp file)")
+    args = parser.parse_args()
+
+    db_path = Path(args.db_path) if args.db_path else Path(tempfile.mkdtemp(prefix="aq-bench-")) / "bench.db"
+    # The engine is configured from the environment at import time, so point it at the bench DB first.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from at_home_quant.data.tickers import TickerInfo, TickerType, Universe
+    from at_home_quant.db import crud
+    from at_home_quant.db.session import get_session, init_db
+
+    df = price_frame(args.symbols, args.days)
+    tickers = {s: TickerInfo(s, s, TickerType.EQUITY, Universe.SP500, "USD") for s in df["symbol"].unique()}
+    init_db()
+    with get_session() as session:
+        crud.upsert_tickers(session, tickers)
+
+    chunk_rows = args.chunk_rows or crud.UPSERT_CHUNK_ROWS
+    changed = df.assign(adj_close=df["adj_close"].where(df.index % 10 != 0, df["adj_close"] * 1.01))
+    for label, frame in (("insert", df), ("resync", df), ("10% changed", changed)):
+        with get_session() as session:
+            if args.mode == "upsert":
+                stats = crud.upsert_prices(session, frame, chunk_rows=chunk_rows)
+            else:
+                stats = crud.bulk_upsert_prices(
+                    session, frame, chunk_rows=chunk_rows, rebuild_indexes=args.mode == "bulk-rebuild"
+                )
+        slowest = max(stats.chunk_seconds) if stats.chunk_seconds else 0.0
+        print(
+            f"{label}: {stats.rows:,} rows in {stats.seconds:.2f}s ({stats.rows_per_second:,.0f} rows/s), "
+            f"{stats.chunks} chunks, slowest chunk {slowest:.2f}s; "
+            f"{stats.inserted:,} inserted, {stats.updated:,} updated, {stats.skipped:,} skipped"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+
+from sqlalchemy import select
+
+from at_home_quant.data.store import (
+    PRICE_COLUMNS,
+    ParquetPriceStore,
+    SqlPriceStore,
+    parquet_store_from_settings,
+)
+from at_home_quant.db.models import Ticker
+from at_home_quant.db.session import get_read_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Copy prices_daily into the Parquet price store")
+    parser.add_argument("--dir", dest="root", help="Store root (defaults to PARQUET_STORE_DIR)")
+    parser.add_argument("--partition-by", dest="partition_by", choices=["symbol", "year"])
+    parser.add_argument("--batch", type=int, default=100, help="Symbols read from SQLite per batch")
+    args = parser.parse_args()
+
+    store = parquet_store_from_settings()
+    if args.root or args.partition_by:
+        partition_by = args.partition_by or store.partition_by
+        store = ParquetPriceStore(args.root or store.root, partition_by=partition_by)
+
+    with get_read_session() as session:
+        symbols = session.execute(select(Ticker.symbol).order_by(Ticker.symbol)).scalars().all()
+        source = SqlPriceStore(session)
+        rows = 0
+        for offset in range(0, len(symbols), args.batch):
+            batch = symbols[offset : offset + args.batch]
+            rows += store.write(source.load_frame(batch, columns=PRICE_COLUMNS))
+    print(f"Exported {rows} rows for {len(symbols)} symbols to {store.root} ({store.partition_by} partitions)")
+
+
+if __name__ == "__main__":
+    main()
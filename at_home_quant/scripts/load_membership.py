@@ -0,0 +1,26 @@
+import argparse
+
+import pandas as pd
+
+from at_home_quant.db import crud
+from at_home_quant.db.session import get_session, init_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load point-in-time universe membership intervals from a CSV")
+    parser.add_argument("path", help="CSV with symbol, universe, valid_from and optional valid_to columns")
+    parser.add_argument(
+        "--replace", action="store_true", help="Replace the stored history of every universe in the file"
+    )
+    args = parser.parse_args()
+
+    memberships = pd.read_csv(args.path)
+    init_db()
+    with get_session() as session:
+        loaded = crud.load_universe_membership(session, memberships, replace=args.replace)
+    universes = ", ".join(sorted(set(memberships["universe"].astype(str))))
+    print(f"Loaded {loaded} membership intervals for {universes}")
+
+
+if __name__ == "__main__":
+    main()
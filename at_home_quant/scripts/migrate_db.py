@@ -0,0 +1,30 @@
+import argparse
+
+from at_home_quant.db import migrations
+from at_home_quant.db.session import get_engine, init_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Upgrade the database schema in place")
+    parser.add_argument("--target", type=int, default=migrations.SCHEMA_VERSION, help="Schema version to stop at")
+    parser.add_argument("--status", action="store_true", help="Only report the current version and pending steps")
+    parser.add_argument("--no-vacuum", dest="vacuum", action="store_false", help="Skip compacting the file afterwards")
+    args = parser.parse_args()
+
+    init_db()
+    engine = get_engine()
+    with engine.begin() as connection:
+        steps = migrations.pending(connection)
+        version = migrations.get_version(connection)
+    print(f"Schema version {version} (latest {migrations.SCHEMA_VERSION})")
+    if args.status:
+        for step in steps:
+            print(f"  pending {step.version}: {step.description}")
+        return
+
+    for step in migrations.migrate(engine, target=args.target, vacuum=args.vacuum):
+        print(f"Applied {step.version}: {step.description}")
+
+
+if __name__ == "__main__":
+    main()
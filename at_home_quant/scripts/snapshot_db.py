@@ -0,0 +1,42 @@
+import argparse
+
+from at_home_quant.db import snapshots
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create, list and drop read-only database snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Copy the live database into a named dataset")
+    create.add_argument("name", help="Dataset name; point reads at it with READ_DATASET=<name>")
+    create.add_argument(
+        "--method",
+        choices=snapshots.SNAPSHOT_METHODS,
+        default="backup",
+        help="'backup' uses the online backup API; 'vacuum' uses VACUUM INTO for a compacted copy",
+    )
+    create.add_argument("--replace", action="store_true", help="Overwrite an existing dataset of that name")
+    commands.add_parser("list", help="Show registered snapshots")
+    drop = commands.add_parser("drop", help="Delete a snapshot and unregister it")
+    drop.add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        snapshot = snapshots.create_snapshot(args.name, method=args.method, replace=args.replace)
+        print(
+            f"Created {snapshot.name} ({snapshot.size_bytes / 2**20:,.1f} MiB, schema {snapshot.schema_version}) "
+            f"via {snapshot.method} in {snapshot.seconds:.2f}s: {snapshot.path}"
+        )
+    elif args.command == "list":
+        registry = snapshots.get_snapshot_registry()
+        for snapshot in registry.snapshots():
+            print(
+                f"{snapshot.name:<20} {snapshot.created_at:%Y-%m-%d %H:%M} UTC  "
+                f"{snapshot.size_bytes / 2**20:>10,.1f} MiB  {snapshot.method:<6}  {snapshot.path}"
+            )
+    else:
+        snapshots.get_snapshot_registry().drop(args.name)
+        print(f"Dropped {args.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -46,11 +46,18 @@ def realized_vol(series: pd.Series, window_months: int = 12) -> float:
     return float(returns.std(ddof=0) * np.sqrt(ANNUALIZATION_DAYS))
 
 
-def stability_proxy(series: pd.Series, mode: Literal["synthetic", "fundamental"] = "synthetic") -> float:
+def stability_proxy(
+    series: pd.Series | None = None,
+    mode: Literal["synthetic", "fundamental"] = "synthetic",
+    *,
+    vol: float | None = None,
+) -> float:
+    """1 / (1 + 12m realized vol); pass ``vol`` when it is already known instead of the series."""
     if mode == "fundamental":
         return float("nan")
-    vol = realized_vol(series, window_months=12)
-    if np.isnan(vol):
+    if vol is None:
+        vol = realized_vol(series, window_months=12)
+    if pd.isna(vol):
         return float("nan")
     return 1.0 / (1.0 + vol)
 
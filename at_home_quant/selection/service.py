@@ -7,9 +7,13 @@ import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from at_home_quant.config.settings import get_settings
+from at_home_quant.data.analytics import AnalyticsEngine, get_analytics_engine
+from at_home_quant.data.membership import get_universe_index
+from at_home_quant.data.store import PriceStore, get_price_store
 from at_home_quant.data.tickers import Universe
-from at_home_quant.db.models import PriceDaily, Ticker
-from at_home_quant.db.session import get_session
+from at_home_quant.db.models import Ticker
+from at_home_quant.db.session import get_read_session
 from at_home_quant.selection.factors import (
     momentum_12m,
     momentum_6m,
@@ -25,56 +29,59 @@ from at_home_quant.selection.ranking import DEFAULT_WEIGHTS, rank_stocks
 FACTOR_COLUMNS = ["momentum", "stability", "low_volatility", "value", "shareholder_yield"]
 
 
-def _load_price_series(session: Session, symbol: str, as_of_date: datetime.date) -> pd.Series:
-    stmt = (
-        select(PriceDaily.date, PriceDaily.adj_close)
-        .join(Ticker, Ticker.id == PriceDaily.ticker_id)
-        .where(Ticker.symbol == symbol, PriceDaily.date <= as_of_date)
-        .order_by(PriceDaily.date)
-    )
-    rows = session.execute(stmt).all()
-    if not rows:
-        return pd.Series(dtype=float)
-    df = pd.DataFrame(rows, columns=["date", "adj_close"]).set_index("date")
-    return df["adj_close"]
-
-
-def _compute_factors_for_ticker(symbol: str, series: pd.Series) -> dict:
-    mom6 = momentum_6m(series)
-    mom12 = momentum_12m(series)
+def _factor_row(symbol: str, mom6: float, mom12: float, vol: float) -> dict:
     momentum = float(pd.Series([mom6, mom12]).mean())
-    vol = realized_vol(series)
-    stability = stability_proxy(series)
-    value = value_proxy(symbol)
-    shareholder = shareholder_yield_proxy(symbol)
     return {
         "ticker": symbol,
         "momentum_6m": mom6,
         "momentum_12m": mom12,
         "momentum": momentum,
-        "stability": stability,
+        "stability": stability_proxy(vol=vol),
         "volatility": vol,
         "low_volatility": -vol if pd.notna(vol) else float("nan"),
-        "value": value,
-        "shareholder_yield": shareholder,
+        "value": value_proxy(symbol),
+        "shareholder_yield": shareholder_yield_proxy(symbol),
     }
 
 
-def _compute_universe_factors(session: Session, universe: Universe, as_of_date: datetime.date) -> pd.DataFrame:
-    tickers = session.execute(
-        select(Ticker.symbol).where(Ticker.universe == universe).order_by(Ticker.symbol)
-    ).scalars()
+def _compute_factors_for_ticker(symbol: str, series: pd.Series) -> dict:
+    return _factor_row(symbol, momentum_6m(series), momentum_12m(series), realized_vol(series))
+
+
+def _universe_symbols(session: Session, universe: Universe, as_of_date: datetime.date) -> list[str]:
+    # Point-in-time members when a history is loaded, so past rankings only see that day's constituents.
+    index = get_universe_index(session)
+    if index.covers(universe):
+        return list(index.members(universe, as_of_date))
+    stmt = select(Ticker.symbol).where(Ticker.universe == universe).order_by(Ticker.symbol)
+    return list(session.execute(stmt).scalars())
+
+
+def _compute_universe_factors(
+    session: Session, store: PriceStore, universe: Universe, as_of_date: datetime.date
+) -> pd.DataFrame:
+    prices = store.load_frame(_universe_symbols(session, universe, as_of_date), end=as_of_date)
     factors: list[dict] = []
-    for symbol in tickers:
-        series = _load_price_series(session, symbol, as_of_date)
-        if series.empty:
-            continue
-        factors.append(_compute_factors_for_ticker(symbol, series))
+    for symbol, rows in prices.groupby("symbol", sort=True):
+        factors.append(_compute_factors_for_ticker(symbol, rows.set_index("date")["adj_close"]))
     return pd.DataFrame(factors)
 
 
-def _rank(session: Session, universe: Universe, as_of_date: datetime.date, top_n: int) -> list[StockFactorScores]:
-    factor_df = _compute_universe_factors(session, universe, as_of_date)
+def _compute_universe_factors_duckdb(
+    session: Session, engine: AnalyticsEngine, universe: Universe, as_of_date: datetime.date
+) -> pd.DataFrame:
+    table = engine.momentum_factors(_universe_symbols(session, universe, as_of_date), as_of_date)
+    columns = ["symbol", "momentum_6m", "momentum_12m", "volatility"]
+    return pd.DataFrame([_factor_row(*row) for row in table[columns].itertuples(index=False)])
+
+
+def _rank(
+    session: Session, store: PriceStore | None, universe: Universe, as_of_date: datetime.date, top_n: int
+) -> list[StockFactorScores]:
+    if store is None and get_settings().analytics_engine == "duckdb":
+        factor_df = _compute_universe_factors_duckdb(session, get_analytics_engine(), universe, as_of_date)
+    else:
+        factor_df = _compute_universe_factors(session, store or get_price_store(session), universe, as_of_date)
     if factor_df.empty:
         return []
     ranked = rank_stocks(factor_df[FACTOR_COLUMNS + ["ticker", "momentum_6m", "momentum_12m", "volatility"]], weights=DEFAULT_WEIGHTS)
@@ -97,14 +104,18 @@ def _rank(session: Session, universe: Universe, as_of_date: datetime.date, top_n
 
 
 def rank_universe(
-    universe_name: str, as_of_date: datetime.date, top_n: int = 15, session: Session | None = None
+    universe_name: str,
+    as_of_date: datetime.date,
+    top_n: int = 15,
+    session: Session | None = None,
+    store: PriceStore | None = None,
 ) -> list[StockFactorScores]:
     universe = Universe[universe_name]
     if session is not None:
-        return _rank(session, universe, as_of_date, top_n)
+        return _rank(session, store, universe, as_of_date, top_n)
 
-    with get_session() as session_obj:
-        return _rank(session_obj, universe, as_of_date, top_n)
+    with get_read_session() as session_obj:
+        return _rank(session_obj, store, universe, as_of_date, top_n)
 
 
 __all__ = ["rank_universe"]
@@ -0,0 +1,114 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from at_home_quant.data.analytics import DUCKDB_AVAILABLE, AnalyticsEngine
+from at_home_quant.data.store import PRICE_COLUMNS, ParquetPriceStore, SqlPriceStore
+from at_home_quant.data.tickers import TickerType
+from at_home_quant.db.models import Base, Ticker
+from at_home_quant.selection.factors import momentum_6m, momentum_12m, realized_vol
+
+pytestmark = pytest.mark.skipif(not DUCKDB_AVAILABLE, reason="duckdb not installed")
+
+SYMBOLS = ["AAA", "BBB", "^CCC"]
+
+
+@pytest.fixture(params=["sqlite", "parquet"])
+def engine_and_store(request, tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'prices.db'}")
+    Base.metadata.create_all(bind=db_engine)
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2020-01-01", periods=300)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(SYMBOLS), len(dates))), axis=1))
+    df = pd.DataFrame(
+        {
+            "symbol": np.repeat(SYMBOLS, len(dates)),
+            "date": np.tile(dates, len(SYMBOLS)),
+            "close": closes.ravel(),
+            "adj_close": closes.ravel(),
+        }
+    )
+    df = df[~((df["symbol"] == "BBB") & (df["date"] > dates[200]))]  # BBB stops trading early
+    with Session(db_engine) as session:
+        session.add_all(Ticker(symbol=s, name=s, asset_type=TickerType.EQUITY) for s in SYMBOLS)
+        session.flush()
+        SqlPriceStore(session).write(df)
+        session.commit()
+        if request.param == "sqlite":
+            engine = AnalyticsEngine(sqlite_path=tmp_path / "prices.db")
+        else:
+            frame = SqlPriceStore(session).load_frame(SYMBOLS, columns=PRICE_COLUMNS)
+            ParquetPriceStore(tmp_path / "parquet").write(frame)
+            engine = AnalyticsEngine(parquet_root=tmp_path / "parquet")
+        yield engine, SqlPriceStore(session)
+    engine.close()
+
+
+def test_momentum_factors_match_pandas_factors(engine_and_store):
+    engine, store = engine_and_store
+    as_of = datetime.date(2021, 1, 15)
+    factors = engine.momentum_factors(SYMBOLS + ["MISSING"], as_of).set_index("symbol")
+    assert list(factors.index) == SYMBOLS
+    for symbol in SYMBOLS:
+        series = store.load_series(symbol, end=as_of)
+        expected = [momentum_6m(series), momentum_12m(series), realized_vol(series)]
+        actual = factors.loc[symbol, ["momentum_6m", "momentum_12m", "volatility"]].tolist()
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+    assert np.isnan(factors.loc["BBB", "momentum_12m"])
+
+
+def test_prices_as_of_and_wide_prices(engine_and_store):
+    engine, store = engine_and_store
+    dates = [datetime.date(2019, 12, 31), datetime.date(2020, 2, 1), datetime.date(2021, 3, 1)]
+    matrix = engine.prices_as_of(["^CCC", "BBB", "MISSING"], dates)
+    assert list(matrix.index) == dates
+    assert list(matrix.columns) == ["^CCC", "BBB", "MISSING"]
+    assert matrix.iloc[0].isna().all()
+    assert matrix.loc[dates[1], "BBB"] == store.price_on_or_before("BBB", dates[1])
+    assert matrix.loc[dates[2], "BBB"] == store.price_on_or_before("BBB", dates[2])
+    assert matrix["MISSING"].isna().all()
+
+    wide = engine.wide_prices(SYMBOLS, start=datetime.date(2020, 1, 1), end=datetime.date(2020, 1, 10))
+    assert wide.shape == (8, 3)
+    day = datetime.date(2020, 1, 2)
+    assert wide.loc[day, "AAA"] == store.price_on_or_before("AAA", day)
+
+
+def test_rank_universe_with_duckdb_factors_matches_pandas(monkeypatch, tmp_path):
+    from at_home_quant.data.tickers import Universe
+    from at_home_quant.selection.service import rank_universe
+
+    db_path = tmp_path / "rank.db"
+    db_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=db_engine)
+    rng = np.random.default_rng(2)
+    dates = pd.bdate_range(end="2024-06-28", periods=300)
+    symbols = [f"S{i}" for i in range(6)]
+    closes = 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, (len(symbols), len(dates))), axis=1))
+    df = pd.DataFrame(
+        {
+            "symbol": np.repeat(symbols, len(dates)),
+            "date": np.tile(dates, len(symbols)),
+            "close": closes.ravel(),
+            "adj_close": closes.ravel(),
+        }
+    )
+    as_of = datetime.date(2024, 6, 28)
+    with Session(db_engine) as session:
+        session.add_all(
+            Ticker(symbol=s, name=s, asset_type=TickerType.EQUITY, universe=Universe.SP500) for s in symbols
+        )
+        session.flush()
+        SqlPriceStore(session).write(df)
+        session.commit()
+
+        expected = rank_universe("SP500", as_of, top_n=4, session=session)
+        monkeypatch.setenv("ANALYTICS_ENGINE", "duckdb")
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+        actual = rank_universe("SP500", as_of, top_n=4, session=session)
+    assert [s.ticker for s in actual] == [s.ticker for s in expected]
+    assert [s.composite_score for s in actual] == pytest.approx([s.composite_score for s in expected])
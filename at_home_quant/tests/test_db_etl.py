@@ -1,11 +1,17 @@
 import datetime
 import importlib
+import logging
 
+import numpy as np
 import pandas as pd
 import pytest
+from sqlalchemy import text
 
 from at_home_quant.data import fetcher
-from at_home_quant.data.tickers import ALL_TICKERS, TickerInfo
+from at_home_quant.data.calendars import trading_days
+from at_home_quant.data.providers import GeneratedProvider
+from at_home_quant.data.store import SqlPriceStore
+from at_home_quant.data.tickers import ALL_TICKERS, TickerInfo, TickerType, Universe
 
 
 @pytest.fixture()
@@ -42,3 +48,613 @@ def test_roundtrip_prices(temp_db):
         )
         assert latest is not None
         assert latest.adj_close is not None
+
+
+class _CountingProvider:
+    name = "counting"
+    cacheable = False
+    rate_limited = False
+
+    def __init__(self):
+        self.inner = GeneratedProvider(seed=1)
+        self.calls = []
+
+    def download(self, symbols, start, end):
+        self.calls.append((tuple(symbols), start))
+        return self.inner.download(symbols, start, end)
+
+
+def _equity(symbol: str) -> TickerInfo:
+    return TickerInfo(symbol, symbol, TickerType.EQUITY, Universe.SP500, "USD")
+
+
+def test_daily_update_batches_symbols_by_start_date(temp_db, monkeypatch):
+    session_module, crud, models = temp_db
+    monkeypatch.setenv("DEFAULT_START_DATE", str(datetime.date.today() - datetime.timedelta(days=30)))
+    daily_update = importlib.reload(importlib.import_module("at_home_quant.etl.daily_update"))
+    provider = _CountingProvider()
+    tickers = {s: _equity(s) for s in ["AAA", "BBB", "CCC"]}
+
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+    assert provider.calls == [(("AAA", "BBB", "CCC"), datetime.date.today() - datetime.timedelta(days=30))]
+
+    provider.calls.clear()
+    tickers["DDD"] = _equity("DDD")
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+    assert [symbols for symbols, _ in provider.calls] == [("DDD",)]
+
+    with session_module.get_session() as session:
+        symbols = {row[0] for row in session.query(models.Ticker.symbol).join(models.PriceDaily).distinct()}
+        assert symbols == {"AAA", "BBB", "CCC", "DDD"}
+
+
+def test_previous_closes_and_sql_return_backfill(temp_db):
+    session_module, crud, models = temp_db
+    closes = [100.0, 110.0, 121.0, 133.1]
+    df = pd.DataFrame(
+        {
+            "symbol": "SPY",
+            "date": pd.bdate_range("2024-01-01", periods=len(closes)),
+            "close": closes,
+            "adj_close": closes,
+            "return_": 0.0,
+        }
+    )
+
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df)
+
+    with session_module.get_session() as session:
+        seeds = crud.previous_closes(session, {"SPY": datetime.date(2024, 1, 3), "QQQ": datetime.date(2024, 1, 3)})
+        assert seeds == {"SPY": 110.0}
+
+        updated = crud.backfill_returns(session, datetime.date(2024, 1, 2), datetime.date(2024, 1, 3), ["SPY"])
+        assert updated == 2
+
+    with session_module.get_session() as session:
+        returns = [
+            row.return_
+            for row in session.query(models.PriceDaily).order_by(models.PriceDaily.date)
+        ]
+    assert returns[0] == 0.0
+    assert returns[1] == pytest.approx(0.10)
+    assert returns[2] == pytest.approx(0.10)
+    assert returns[3] == 0.0
+
+
+class _FlakyProvider(_CountingProvider):
+    def __init__(self, fail_on: str):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def download(self, symbols, start, end):
+        if self.fail_on in symbols:
+            self.fail_on = None
+            raise RuntimeError("connection reset")
+        return super().download(symbols, start, end)
+
+
+def test_full_history_resumes_from_checkpoint(temp_db, caplog):
+    session_module, crud, models = temp_db
+    historical_load = importlib.reload(importlib.import_module("at_home_quant.etl.historical_load"))
+    tickers = {s: _equity(s) for s in ["AAA", "BBB", "CCC", "DDD", "EEE"]}
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 3, 1)
+    provider = _FlakyProvider(fail_on="CCC")
+
+    with caplog.at_level(logging.INFO, logger="at_home_quant.etl.historical_load"):
+        with pytest.raises(RuntimeError):
+            historical_load.run_full_history(start, end, provider=provider, tickers=tickers, chunk_size=2)
+    assert "fetch report" in caplog.text
+
+    with session_module.get_session() as session:
+        assert crud.completed_symbols(session, historical_load._job_key(start, end)) == {"AAA", "BBB"}
+
+    provider.calls.clear()
+    historical_load.run_full_history(start, end, provider=provider, tickers=tickers, chunk_size=2)
+    assert [symbols for symbols, _ in provider.calls] == [("CCC", "DDD"), ("EEE",)]
+
+    with session_module.get_session() as session:
+        assert crud.completed_symbols(session, historical_load._job_key(start, end)) == set()
+        loaded = {row[0] for row in session.query(models.Ticker.symbol).join(models.PriceDaily).distinct()}
+        assert loaded == set(tickers)
+
+
+class _DroppingProvider(_CountingProvider):
+    """Returns no bars for ``drop`` on its first request, like a feed that fails one ticker of a batch."""
+
+    def __init__(self, drop: str):
+        super().__init__()
+        self.drop = drop
+
+    def download(self, symbols, start, end):
+        frames = super().download(symbols, start, end)
+        if self.drop in frames:
+            frames.pop(self.drop)
+            self.drop = None
+        return frames
+
+
+def test_full_history_keeps_checkpoints_for_dropped_symbols(temp_db):
+    session_module, crud, models = temp_db
+    historical_load = importlib.reload(importlib.import_module("at_home_quant.etl.historical_load"))
+    tickers = {s: _equity(s) for s in ["AAA", "BBB", "CCC", "DDD"]}
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 3, 1)
+    job = historical_load._job_key(start, end)
+    provider = _DroppingProvider(drop="BBB")
+
+    historical_load.run_full_history(start, end, provider=provider, tickers=tickers, chunk_size=3)
+
+    with session_module.get_session() as session:
+        assert crud.completed_symbols(session, job) == {"AAA", "CCC", "DDD"}
+
+    provider.calls.clear()
+    historical_load.run_full_history(start, end, provider=provider, tickers=tickers, chunk_size=3)
+    assert [symbols for symbols, _ in provider.calls] == [("BBB",)]
+
+    with session_module.get_session() as session:
+        assert crud.completed_symbols(session, job) == set()
+        loaded = {row[0] for row in session.query(models.Ticker.symbol).join(models.PriceDaily).distinct()}
+        assert loaded == set(tickers)
+
+
+class _SessionProvider(_CountingProvider):
+    """Generated bars restricted to NYSE sessions, like a real feed."""
+
+    def download(self, symbols, start, end):
+        frames = super().download(symbols, start, end)
+        sessions = trading_days("NYSE", start, end)
+        return {s: f[f.index.isin(sessions)] for s, f in frames.items()}
+
+
+def test_daily_update_repairs_interior_gaps(temp_db, monkeypatch):
+    session_module, crud, models = temp_db
+    monkeypatch.setenv("DEFAULT_START_DATE", str(datetime.date.today() - datetime.timedelta(days=60)))
+    daily_update = importlib.reload(importlib.import_module("at_home_quant.etl.daily_update"))
+    provider = _SessionProvider()
+    tickers = {s: _equity(s) for s in ["AAA", "BBB"]}
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+
+    with session_module.get_session() as session:
+        rows = (
+            session.query(models.PriceDaily)
+            .join(models.Ticker)
+            .filter(models.Ticker.symbol == "AAA")
+            .order_by(models.PriceDaily.date)
+            .all()
+        )
+        hole = rows[10].date
+        session.delete(rows[10])
+        session.flush()
+        # Deletes outside crud bypass watermark maintenance.
+        crud.refresh_watermarks(session, [rows[10].ticker_id])
+
+    provider.calls.clear()
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+    assert provider.calls == [(("AAA",), hole)]
+
+    with session_module.get_session() as session:
+        repaired = (
+            session.query(models.PriceDaily)
+            .join(models.Ticker)
+            .filter(models.Ticker.symbol == "AAA")
+            .order_by(models.PriceDaily.date)
+            .all()
+        )
+    assert repaired[10].date == hole
+    # Generated bars restart their walk per request, so the refetched close differs; returns must follow it.
+    assert repaired[10].return_ == pytest.approx(repaired[10].close / repaired[9].close - 1)
+    assert repaired[11].return_ == pytest.approx(repaired[11].close / repaired[10].close - 1)
+
+
+class _ClosedProvider(_SessionProvider):
+    """A feed with no bar on one calendar session, like an unscheduled market closure."""
+
+    def __init__(self, closed: datetime.date):
+        super().__init__()
+        self.closed = pd.Timestamp(closed)
+
+    def download(self, symbols, start, end):
+        return {s: f[f.index != self.closed] for s, f in super().download(symbols, start, end).items()}
+
+
+def test_daily_update_skips_per_date_history_once_closures_are_confirmed(temp_db, monkeypatch):
+    session_module, crud, models = temp_db
+    start = datetime.date.today() - datetime.timedelta(days=60)
+    monkeypatch.setenv("DEFAULT_START_DATE", str(start))
+    daily_update = importlib.reload(importlib.import_module("at_home_quant.etl.daily_update"))
+    planner = importlib.import_module("at_home_quant.etl.planner")
+    closed = trading_days("NYSE", start, datetime.date.today())[10].date()
+    provider = _ClosedProvider(closed)
+    tickers = {s: _equity(s) for s in ["AAA", "BBB"]}
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+
+    # The calendar expects a bar on the closure, so the next run asks for it once.
+    provider.calls.clear()
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+    assert provider.calls == [(("AAA", "BBB"), closed)]
+    with session_module.get_session() as session:
+        gaps = session.query(models.PriceGap.date).distinct().all()
+    assert gaps == [(closed,)]
+
+    def no_per_date_reads(*_args, **_kwargs):
+        raise AssertionError("fully loaded symbols must be planned from their watermarks")
+
+    monkeypatch.setattr(planner, "_stored_dates", no_per_date_reads)
+    provider.calls.clear()
+    daily_update.run_daily_update(provider=provider, tickers=tickers)
+    assert all(call_start > closed for _, call_start in provider.calls)
+
+
+def test_upsert_prices_chunks_large_frames(temp_db):
+    session_module, crud, models = temp_db
+    symbols = [f"S{i:02d}" for i in range(20)]
+    dates = pd.bdate_range("2020-01-01", periods=300)
+    df = pd.DataFrame(
+        {
+            "symbol": np.repeat(symbols, len(dates)),
+            "date": np.tile(dates, len(symbols)),
+            "close": 1.0,
+            "adj_close": 1.0,
+            "volume": np.nan,
+        }
+    )
+
+    with session_module.get_session() as session:
+        crud.upsert_tickers(session, {s: _equity(s) for s in symbols})
+        stats = crud.upsert_prices(session, df, chunk_rows=2_500)
+    assert stats.rows == len(df) == 6_000
+    assert stats.chunks == 3
+
+    df.loc[df["symbol"] == "S00", "adj_close"] = 2.0
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df[df["symbol"] == "S00"])
+
+    with session_module.get_session() as session:
+        assert session.query(models.PriceDaily).count() == 6_000
+        first = session.query(models.PriceDaily).join(models.Ticker).filter(models.Ticker.symbol == "S00").first()
+        assert first.adj_close == 2.0
+        assert first.volume is None
+        assert first.return_ is None
+
+
+def test_bulk_upsert_merges_through_staging_and_restores_indexes(temp_db):
+    session_module, crud, models = temp_db
+    dates = pd.bdate_range("2024-01-01", periods=5)
+    df = pd.DataFrame({"symbol": "SPY", "date": dates, "close": 1.0, "adj_close": 1.0, "return_": 0.0})
+
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df.iloc[:3])
+    df["adj_close"] = 2.0
+    with session_module.get_session() as session:
+        stats = crud.bulk_upsert_prices(session, df, rebuild_indexes=True)
+    assert stats.rows == 5
+
+    with session_module.get_session() as session:
+        stored = [row.adj_close for row in session.query(models.PriceDaily).order_by(models.PriceDaily.date)]
+        indexes = {
+            row[0]
+            for row in session.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'prices_daily'")
+            )
+        }
+    assert stored == [2.0] * 5
+    assert "ix_prices_daily_date" in indexes
+
+
+def test_upserts_skip_unchanged_rows_and_report_counts(temp_db):
+    session_module, crud, models = temp_db
+    dates = pd.bdate_range("2024-01-01", periods=4)
+    df = pd.DataFrame({"symbol": "SPY", "date": dates, "close": 1.0, "adj_close": 1.0, "return_": np.nan})
+
+    with session_module.get_session() as session:
+        first = crud.upsert_prices(session, df.iloc[:3])
+    assert (first.inserted, first.updated, first.skipped) == (3, 0, 0)
+
+    df.loc[1, "adj_close"] = 1.5
+    with session_module.get_session() as session:
+        second = crud.upsert_prices(session, df)
+    assert (second.inserted, second.updated, second.skipped) == (1, 1, 2)
+    assert second.rows == 2
+
+    df.loc[2, "adj_close"] = 3.0
+    with session_module.get_session() as session:
+        bulk = crud.bulk_upsert_prices(session, df)
+    assert (bulk.inserted, bulk.updated, bulk.skipped) == (0, 1, 3)
+
+    with session_module.get_session() as session:
+        stored = [row.adj_close for row in session.query(models.PriceDaily).order_by(models.PriceDaily.date)]
+    assert stored == [1.0, 1.5, 3.0, 1.0]
+
+
+def test_price_writes_maintain_ticker_watermarks(temp_db):
+    session_module, crud, models = temp_db
+    dates = pd.bdate_range("2024-01-01", periods=6)
+    df = pd.DataFrame({"symbol": "SPY", "date": dates, "close": 1.0, "adj_close": 1.0, "return_": np.nan})
+
+    def watermark():
+        with session_module.get_session() as session:
+            row = session.query(models.TickerWatermark).one()
+            return row.min_date, row.max_date, row.row_count
+
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df.iloc[2:4])
+    assert watermark() == (dates[2].date(), dates[3].date(), 2)
+
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df.iloc[:3])
+        crud.bulk_upsert_prices(session, df.iloc[3:])
+    assert watermark() == (dates[0].date(), dates[-1].date(), 6)
+
+    with session_module.get_session() as session:
+        assert crud.latest_price_date(session) == dates[-1].date()
+        assert crud.prices_version(session) is not None
+        session.query(models.PriceDaily).filter(models.PriceDaily.date == dates[-1].date()).delete()
+        crud.refresh_watermarks(session)
+    assert watermark() == (dates[0].date(), dates[-2].date(), 5)
+
+
+def test_price_writes_maintain_month_end_prices(temp_db):
+    session_module, crud, models = temp_db
+    dates = pd.bdate_range("2024-01-29", periods=8)  # Jan 29 .. Feb 7
+    df = pd.DataFrame(
+        {"symbol": "SPY", "date": dates, "close": 1.0, "adj_close": np.arange(8.0), "return_": np.nan}
+    )
+
+    def month_ends():
+        with session_module.get_session() as session:
+            return crud.month_end_prices(session, ["SPY"])[["month", "date", "adj_close"]].values.tolist()
+
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df.iloc[:5])
+    assert month_ends() == [["2024-01", dates[2].date(), 2.0], ["2024-02", dates[4].date(), 4.0]]
+
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df.iloc[5:6])
+        crud.bulk_upsert_prices(session, df.iloc[6:].assign(adj_close=[16.0, 17.0]))
+    assert month_ends() == [["2024-01", dates[2].date(), 2.0], ["2024-02", dates[7].date(), 17.0]]
+
+    with session_module.get_session() as session:
+        session.query(models.PriceMonthEnd).delete()
+        crud.refresh_month_end_prices(session)
+        # A date before its month's last trading day falls back to the daily rows.
+        matrix = SqlPriceStore(session).prices_as_of(["SPY"], [dates[2].date(), dates[5].date()])
+    assert month_ends()[-1] == ["2024-02", dates[7].date(), 17.0]
+    assert matrix["SPY"].tolist() == [2.0, 5.0]
+
+
+def test_readjust_prices_rescales_history_before_changed_overlap(temp_db):
+    session_module, crud, models = temp_db
+    from at_home_quant.etl.planner import build_fetch_plan
+
+    dates = pd.bdate_range("2024-01-29", periods=8)  # Jan 29 .. Feb 7
+    stored = pd.DataFrame(
+        {"symbol": "SPY", "date": dates[:6], "close": 10.0, "adj_close": 9.0, "volume": 100.0, "return_": 0.0}
+    )
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, stored)
+        plan = build_fetch_plan(session, ["SPY"], dates[0].date(), as_of=dates[7].date(), overlap_days=7)
+    assert [(b.start, b.end, b.symbols) for b in plan.batches] == [
+        (datetime.date(2024, 1, 30), dates[7].date(), ["SPY"])
+    ]
+    assert plan.repairs == {}
+
+    # A 2:1 split plus a dividend: the provider's whole history moved.
+    refetched = pd.DataFrame(
+        {"symbol": "SPY", "date": dates[4:], "close": 5.0, "adj_close": 4.41, "volume": 200.0, "return_": 0.0}
+    )
+    with session_module.get_session() as session:
+        adjustments = crud.readjust_prices(session, refetched)
+        crud.upsert_prices(session, refetched)
+    assert adjustments["symbol"].tolist() == ["SPY"]
+    assert adjustments["date"].tolist() == [dates[4].date()]
+    assert adjustments["close_factor"].tolist() == [0.5]
+    assert adjustments["adj_close_factor"].tolist() == pytest.approx([0.49])
+
+    with session_module.get_session() as session:
+        rows = session.query(models.PriceDaily).order_by(models.PriceDaily.date).all()
+        assert [row.close for row in rows] == [5.0] * 8
+        assert [row.volume for row in rows] == [200.0] * 8
+        assert [row.adj_close for row in rows] == pytest.approx([4.41] * 8)
+        assert crud.month_end_prices(session, ["SPY"])["adj_close"].tolist() == pytest.approx([4.41, 4.41])
+        recorded = crud.price_adjustments(session, ["SPY"])
+        assert recorded["date"].tolist() == [dates[4].date()]
+        assert crud.readjust_prices(session, refetched).empty
+
+
+def test_migration_clusters_legacy_prices_table(monkeypatch, tmp_path):
+    db_path = tmp_path / "legacy.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    session_module = importlib.reload(importlib.import_module("at_home_quant.db.session"))
+    crud = importlib.reload(importlib.import_module("at_home_quant.db.crud"))
+    migrations = importlib.import_module("at_home_quant.db.migrations")
+    with session_module.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE prices_daily (id INTEGER PRIMARY KEY, ticker_id INTEGER NOT NULL, date DATE NOT NULL, "
+            "open FLOAT, high FLOAT, low FLOAT, close FLOAT, adj_close FLOAT NOT NULL, volume FLOAT, "
+            "return_ FLOAT, CONSTRAINT uq_prices_ticker_date UNIQUE (ticker_id, date))"
+        )
+        connection.exec_driver_sql("CREATE INDEX ix_prices_daily_ticker_id ON prices_daily (ticker_id)")
+    session_module.init_db()
+    df = pd.DataFrame(
+        {"symbol": "SPY", "date": pd.bdate_range("2024-01-01", periods=3), "close": 1.0, "adj_close": 1.0}
+    )
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df)
+
+    with session_module.engine.begin() as connection:
+        assert migrations.get_version(connection) == 1
+    assert [m.version for m in migrations.migrate(session_module.engine)] == [2, 3]
+
+    with session_module.engine.begin() as connection:
+        assert migrations.get_version(connection) == migrations.SCHEMA_VERSION
+        assert migrations.pending(connection) == []
+        ddl = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'prices_daily'").scalar_one()
+        indexes = connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'prices_daily'"
+        ).scalars().all()
+    assert "WITHOUT ROWID" in ddl
+    assert indexes == ["ix_prices_daily_date"]
+
+    df["adj_close"] = 2.0
+    with session_module.get_session() as session:
+        stats = crud.upsert_prices(session, df)
+        assert crud.latest_price_date(session) == datetime.date(2024, 1, 3)
+    assert (stats.inserted, stats.updated) == (0, 3)
+
+
+def test_init_db_moves_json_positions_into_positions_table(monkeypatch, tmp_path):
+    db_path = tmp_path / "legacy.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    session_module = importlib.reload(importlib.import_module("at_home_quant.db.session"))
+    crud = importlib.reload(importlib.import_module("at_home_quant.db.crud"))
+    migrations = importlib.import_module("at_home_quant.db.migrations")
+    session_module.init_db()
+    with session_module.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE portfolio_positions")
+        connection.exec_driver_sql("ALTER TABLE portfolio_snapshots ADD COLUMN positions_json TEXT")
+        connection.exec_driver_sql(
+            "INSERT INTO portfolio_snapshots (as_of_date, universe_name, equity_exposure, defensive_exposure, "
+            "positions_json) VALUES ('2025-01-31', 'NASDAQ100', 0.6, 0.4, ?)",
+            (
+                '[{"ticker": "AAPL", "weight": 0.6, "asset_type": "equity"}, '
+                '{"ticker": "GLD", "weight": 0.4, "asset_type": "gold"}]',
+            ),
+        )
+        connection.exec_driver_sql("PRAGMA user_version = 2")
+
+    session_module.init_db()
+    with session_module.engine.begin() as connection:
+        assert migrations.get_version(connection) == migrations.SCHEMA_VERSION
+        columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(portfolio_snapshots)")]
+    assert "positions_json" not in columns
+    with session_module.get_session() as session:
+        positions = crud.portfolio_positions(session)
+    assert positions[["symbol", "weight", "asset_type"]].values.tolist() == [
+        ["AAPL", 0.6, "equity"],
+        ["GLD", 0.4, "gold"],
+    ]
+
+
+def test_init_db_moves_json_positions_on_unmigrated_v1_database(monkeypatch, tmp_path):
+    db_path = tmp_path / "baseline.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    session_module = importlib.reload(importlib.import_module("at_home_quant.db.session"))
+    crud = importlib.reload(importlib.import_module("at_home_quant.db.crud"))
+    migrations = importlib.import_module("at_home_quant.db.migrations")
+    with session_module.engine.begin() as connection:
+        # The baseline schema: surrogate prices_daily ids and JSON positions, never version-stamped.
+        connection.exec_driver_sql(
+            "CREATE TABLE prices_daily (id INTEGER PRIMARY KEY, ticker_id INTEGER NOT NULL, date DATE NOT NULL, "
+            "open FLOAT, high FLOAT, low FLOAT, close FLOAT, adj_close FLOAT NOT NULL, volume FLOAT, "
+            "return_ FLOAT, CONSTRAINT uq_prices_ticker_date UNIQUE (ticker_id, date))"
+        )
+        connection.exec_driver_sql(
+            "CREATE TABLE portfolio_snapshots (id INTEGER PRIMARY KEY, as_of_date DATE NOT NULL, "
+            "universe_name VARCHAR NOT NULL, equity_exposure FLOAT NOT NULL, defensive_exposure FLOAT NOT NULL, "
+            "positions_json TEXT NOT NULL, CONSTRAINT uq_portfolio_as_of_date UNIQUE (as_of_date))"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO portfolio_snapshots (as_of_date, universe_name, equity_exposure, defensive_exposure, "
+            "positions_json) VALUES ('2025-01-31', 'NASDAQ100', 1.0, 0.0, ?)",
+            ('[{"ticker": "AAPL", "weight": 1.0, "asset_type": "equity"}]',),
+        )
+
+    session_module.init_db()
+    with session_module.engine.begin() as connection:
+        # Clustering prices is still left to migrate_db; only the positions moved.
+        assert migrations.get_version(connection) == 1
+        columns = [row[1] for row in connection.exec_driver_sql("PRAGMA table_info(portfolio_snapshots)")]
+    assert "positions_json" not in columns
+    with session_module.get_session() as session:
+        crud.save_portfolio_snapshot(
+            session,
+            as_of_date=datetime.date(2025, 2, 28),
+            universe_name="NASDAQ100",
+            equity_exposure=1.0,
+            defensive_exposure=0.0,
+            positions=[("AAPL", 0.5, "equity"), ("AAPL", 0.25, "equity"), ("GLD", 0.25, "gold")],
+        )
+    with session_module.get_session() as session:
+        positions = crud.portfolio_positions(session)
+    assert positions[["symbol", "weight"]].values.tolist() == [["AAPL", 1.0], ["AAPL", 0.75], ["GLD", 0.25]]
+    assert [m.version for m in migrations.migrate(session_module.engine)] == [2, 3]
+
+
+def test_read_engine_is_read_only_and_not_blocked_by_writers(temp_db):
+    session_module, crud, models = temp_db
+    df = pd.DataFrame(
+        {"symbol": "SPY", "date": pd.bdate_range("2024-01-01", periods=3), "close": 1.0, "adj_close": 1.0}
+    )
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df)
+
+    with session_module.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar_one() == "wal"
+
+    with session_module.get_session() as writer:
+        writer.query(models.PriceDaily).update({"adj_close": 2.0})
+        writer.flush()
+        # The uncommitted write holds the lock; WAL readers still see the last committed state.
+        with session_module.get_read_session() as reader:
+            assert {row.adj_close for row in reader.query(models.PriceDaily)} == {1.0}
+
+    with session_module.get_read_session() as reader:
+        assert crud.latest_price_date(reader) == datetime.date(2024, 1, 3)
+        with pytest.raises(Exception, match="readonly"):
+            reader.execute(text("DELETE FROM prices_daily"))
+
+
+def test_daily_update_dual_writes_parquet_store(temp_db, monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    session_module, crud, models = temp_db
+    monkeypatch.setenv("DEFAULT_START_DATE", str(datetime.date.today() - datetime.timedelta(days=30)))
+    monkeypatch.setenv("PARQUET_DUAL_WRITE", "true")
+    monkeypatch.setenv("PARQUET_STORE_DIR", str(tmp_path / "parquet"))
+    store_module = importlib.import_module("at_home_quant.data.store")
+    daily_update = importlib.reload(importlib.import_module("at_home_quant.etl.daily_update"))
+    daily_update.run_daily_update(provider=_SessionProvider(), tickers={s: _equity(s) for s in ["AAA", "BBB"]})
+
+    columns = ["close", "adj_close", "return_"]
+    with session_module.get_session() as session:
+        from_sql = store_module.SqlPriceStore(session).load_frame(["AAA", "BBB"], columns=columns)
+    from_parquet = store_module.parquet_store_from_settings().load_frame(["AAA", "BBB"], columns=columns)
+    assert len(from_sql) > 0
+    pd.testing.assert_frame_equal(from_parquet, from_sql, check_dtype=False)
+
+
+@pytest.mark.parametrize("method", ["backup", "vacuum"])
+def test_snapshot_is_frozen_read_only_dataset(temp_db, monkeypatch, tmp_path, method):
+    session_module, crud, models = temp_db
+    snapshots = importlib.import_module("at_home_quant.db.snapshots")
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(snapshots, "_selected_dataset", None)
+    df = pd.DataFrame(
+        {"symbol": "SPY", "date": pd.bdate_range("2024-01-01", periods=3), "close": 1.0, "adj_close": 1.0}
+    )
+    with session_module.get_session() as session:
+        crud.upsert_prices(session, df)
+
+    snapshot = snapshots.create_snapshot("frozen", method=method)
+    assert snapshot.schema_version > 0
+    with pytest.raises(ValueError, match="already exists"):
+        snapshots.create_snapshot("frozen", method=method)
+    with session_module.get_session() as writer:
+        writer.query(models.PriceDaily).update({"adj_close": 2.0})
+
+    monkeypatch.setenv("READ_DATASET", "frozen")
+    with session_module.get_read_session() as reader:
+        assert {row.adj_close for row in reader.query(models.PriceDaily)} == {1.0}
+        with pytest.raises(Exception, match="readonly"):
+            reader.query(models.PriceDaily).update({"adj_close": 3.0})
+    snapshots.select_dataset(snapshots.LIVE_DATASET)
+    with session_module.get_read_session() as reader:
+        assert {row.adj_close for row in reader.query(models.PriceDaily)} == {2.0}
+
+    registry = snapshots.get_snapshot_registry()
+    assert [s.name for s in registry.snapshots()] == ["frozen"]
+    registry.drop("frozen")
+    assert snapshots.get_snapshot_registry().snapshots() == []
+    with pytest.raises(ValueError, match="Unknown dataset"):
+        snapshots.select_dataset("frozen")
@@ -1,11 +1,30 @@
 import datetime
+import importlib
+import subprocess
+import sys
+import time
 
 import pandas as pd
+import pytest
 
 from at_home_quant.data import fetcher
 from at_home_quant.data.tickers import BENCHMARKS
 
 
+def test_data_package_loads_fetcher_on_first_access():
+    # A fresh interpreter, since this test module has already imported the fetcher.
+    code = (
+        "import sys, at_home_quant.data as data; "
+        "assert 'at_home_quant.data.fetcher' not in sys.modules; "
+        "assert 'yfinance' not in sys.modules; "
+        "assert data.fetcher is sys.modules['at_home_quant.data.fetcher']"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+    data = importlib.import_module("at_home_quant.data")
+    assert data.fetcher is fetcher
+    assert "fetcher" in vars(data)
+
+
 def test_fetch_price_history_has_required_columns():
     start = datetime.date.today() - datetime.timedelta(days=90)
     df = fetcher.fetch_price_history(BENCHMARKS["GLD"], start=start)
@@ -42,3 +61,58 @@ def test_compute_returns_monotonic_sorting():
         assert group["date"].is_monotonic_increasing
         assert group.iloc[0]["return_"] == 0.0
         assert group.iloc[1]["return_"] > 0.0
+
+
+def _stand_in_fetch(symbol, start=None, end=None):
+    if symbol == "BAD":
+        raise RuntimeError("provider error")
+    if symbol == "SLOW":
+        time.sleep(1.0)
+    dates = pd.bdate_range("2024-01-01", periods=3)
+    return pd.DataFrame(
+        {
+            "symbol": symbol,
+            "date": dates,
+            "open": 1.0,
+            "high": 1.0,
+            "low": 1.0,
+            "close": [1.0, 2.0, 3.0],
+            "adj_close": [1.0, 2.0, 3.0],
+            "volume": 100.0,
+        }
+    )
+
+
+def test_fetch_prices_for_universe_concurrent_matches_serial():
+    symbols = ["CCC", "AAA", "BBB"]
+    serial = fetcher.fetch_prices_for_universe(symbols, max_workers=1, fetch_fn=_stand_in_fetch)
+    concurrent = fetcher.fetch_prices_for_universe(symbols, max_workers=3, fetch_fn=_stand_in_fetch)
+
+    pd.testing.assert_frame_equal(serial, concurrent)
+    assert list(concurrent["symbol"].unique()) == ["AAA", "BBB", "CCC"]
+
+
+def test_fetch_prices_for_universe_isolates_failures_and_timeouts():
+    df = fetcher.fetch_prices_for_universe(
+        ["AAA", "BAD", "SLOW"], max_workers=3, timeout=0.2, fetch_fn=_stand_in_fetch
+    )
+
+    assert set(df["symbol"]) == {"AAA"}
+    assert len(df) == 3
+
+
+def test_compute_returns_seeds_first_row_from_previous_close():
+    df = pd.DataFrame(
+        {
+            "date": [datetime.date(2024, 1, 2), datetime.date(2024, 1, 3), datetime.date(2024, 1, 2)],
+            "symbol": ["AAA", "AAA", "BBB"],
+            "close": [110.0, 121.0, 50.0],
+        }
+    )
+
+    df_returns = fetcher.compute_returns(df, previous_close={"AAA": 100.0})
+
+    by_symbol = df_returns.set_index(["symbol", "date"])["return_"]
+    assert by_symbol[("AAA", pd.Timestamp("2024-01-02"))] == pytest.approx(0.10)
+    assert by_symbol[("AAA", pd.Timestamp("2024-01-03"))] == pytest.approx(0.10)
+    assert by_symbol[("BBB", pd.Timestamp("2024-01-02"))] == 0.0
@@ -0,0 +1,73 @@
+import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from at_home_quant.data.membership import UniverseIndex, get_universe_index
+from at_home_quant.data.tickers import TickerType, Universe
+from at_home_quant.db import crud
+from at_home_quant.db.models import Base, PriceDaily, Ticker
+from at_home_quant.selection.service import rank_universe
+
+D = datetime.date
+
+MEMBERSHIPS = pd.DataFrame(
+    [
+        ("AAA", "NASDAQ100", D(2020, 1, 1), None),
+        ("AAA", "SP500", D(2021, 6, 1), None),
+        ("BBB", "NASDAQ100", D(2020, 1, 1), D(2022, 1, 1)),
+        ("CCC", "NASDAQ100", D(2022, 1, 1), None),
+        ("DEAD", "SP500", D(2019, 1, 1), D(2021, 6, 1)),
+    ],
+    columns=["symbol", "universe", "valid_from", "valid_to"],
+)
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return Session(engine)
+
+
+def test_membership_lookups_agree_with_the_interval_index():
+    with _session() as session:
+        assert crud.load_universe_membership(session, MEMBERSHIPS) == 5
+        assert session.query(Ticker).filter(Ticker.symbol == "DEAD").one().asset_type == TickerType.EQUITY
+        index = get_universe_index(session)
+        dates = [D(2018, 12, 31), D(2019, 1, 1), D(2020, 6, 30), D(2021, 6, 1), D(2022, 1, 1), D(2030, 1, 1)]
+        for as_of in dates:
+            for universe in (Universe.NASDAQ100, Universe.SP500):
+                assert list(index.members(universe, as_of)) == crud.universe_members(session, universe, as_of)
+        assert index.members(Universe.NASDAQ100, D(2021, 12, 31)) == ("AAA", "BBB")
+        assert index.members(Universe.NASDAQ100, D(2022, 1, 1)) == ("AAA", "CCC")
+        assert index.members(Universe.SP500, D(2021, 6, 1)) == ("AAA",)
+        assert not index.covers(Universe.FTSE250)
+
+        # Reloading replaces the universe's history and invalidates the cached index.
+        crud.load_universe_membership(session, MEMBERSHIPS[MEMBERSHIPS["symbol"] == "AAA"], replace=True)
+        assert get_universe_index(session).members(Universe.NASDAQ100, D(2021, 1, 1)) == ("AAA",)
+
+
+def test_overlapping_intervals_keep_a_symbol_until_the_last_one_ends():
+    intervals = pd.DataFrame(
+        [("AAA", Universe.SP500, D(2020, 1, 1), D(2021, 1, 1)), ("AAA", Universe.SP500, D(2020, 6, 1), None)],
+        columns=["symbol", "universe", "valid_from", "valid_to"],
+    )
+    assert UniverseIndex(intervals).members(Universe.SP500, D(2022, 1, 1)) == ("AAA",)
+
+
+def test_rank_universe_uses_point_in_time_members():
+    as_of = D(2021, 12, 31)
+    with _session() as session:
+        crud.load_universe_membership(session, MEMBERSHIPS)
+        # CCC carries the universe tag but only joins after as_of; the tag is ignored once history exists.
+        session.query(Ticker).filter(Ticker.symbol == "CCC").update({"universe": Universe.NASDAQ100})
+        ids = dict(session.query(Ticker.symbol, Ticker.id))
+        for position, dt in enumerate(pd.bdate_range(end=as_of, periods=300)):
+            for slope, symbol in enumerate(["AAA", "BBB", "CCC"], start=1):
+                session.add(PriceDaily(ticker_id=ids[symbol], date=dt.date(), adj_close=50 + position * slope))
+        session.commit()
+
+        scores = rank_universe("NASDAQ100", as_of, top_n=5, session=session)
+    assert sorted(score.ticker for score in scores) == ["AAA", "BBB"]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from at_home_quant.data.normalize import OUTPUT_COLUMNS, normalize_yfinance_prices
+from at_home_quant.data.providers import RAW_FIELDS
+
+
+def _wide_frame(ticker_first: bool) -> pd.DataFrame:
+    dates = pd.DatetimeIndex(["2024-01-03", "2024-01-02", "2024-01-04"], name="Date")
+    frames = {}
+    for offset, symbol in enumerate(["BBB", "AAA"]):
+        values = np.arange(len(dates), dtype=float) + 10 * (offset + 1)
+        frames[symbol] = pd.DataFrame({field: values + i for i, field in enumerate(RAW_FIELDS)}, index=dates)
+    frames["BBB"].loc["2024-01-04"] = np.nan
+    wide = pd.concat(frames, axis=1)
+    return wide if ticker_first else wide.swaplevel(axis=1)
+
+
+def test_wide_frames_normalize_to_sorted_long_rows():
+    for ticker_first in (True, False):
+        result = normalize_yfinance_prices(_wide_frame(ticker_first))
+
+        assert list(result.columns) == OUTPUT_COLUMNS
+        assert list(result["symbol"]) == ["AAA", "AAA", "AAA", "BBB", "BBB"]
+        assert list(result["date"].dt.strftime("%Y-%m-%d")) == [
+            "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-02", "2024-01-03"
+        ]
+        aaa_jan_2 = result.iloc[0]
+        assert aaa_jan_2["open"] == 21.0
+        assert aaa_jan_2["close"] == aaa_jan_2["adj_close"] == 25.0
+        assert aaa_jan_2["volume"] == 26.0
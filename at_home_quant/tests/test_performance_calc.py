@@ -5,11 +5,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
 from at_home_quant.data.tickers import TickerInfo, TickerType, Universe
-from at_home_quant.db.models import Base, PortfolioSnapshot, PriceDaily, Ticker
+from at_home_quant.db import crud
+from at_home_quant.db.models import Base, PriceDaily, Ticker
 from at_home_quant.performance.calc import (
     compute_benchmark_return_for_period,
     compute_monthly_performance_series,
     compute_portfolio_return_for_period,
+    compute_turnover_series,
 )
 from at_home_quant.portfolio.models import TargetPortfolio, TargetPosition
 from at_home_quant.regime.models import RegimeDecision, UniverseScore
@@ -40,6 +42,17 @@ def _add_price(session: Session, ticker_id: int, dt: datetime.date, price: float
     session.add(PriceDaily(ticker_id=ticker_id, date=dt, adj_close=price))
 
 
+def _add_snapshot(session: Session, as_of: datetime.date, positions: list[tuple[str, float, str]]) -> None:
+    crud.save_portfolio_snapshot(
+        session,
+        as_of_date=as_of,
+        universe_name="NASDAQ100",
+        equity_exposure=1.0,
+        defensive_exposure=0.0,
+        positions=positions,
+    )
+
+
 def test_compute_portfolio_return_simple(session: Session):
     symbol = "AAA"
     info = TickerInfo(symbol, "Test", TickerType.EQUITY, Universe.NASDAQ100)
@@ -114,28 +127,8 @@ def test_compute_monthly_performance_series(session: Session):
 
     session.commit()
 
-    snapshot1 = PortfolioSnapshot(
-        as_of_date=start,
-        universe_name="NASDAQ100",
-        equity_exposure=1.0,
-        defensive_exposure=0.0,
-        positions_json='[{"ticker": "AAA", "weight": 1.0, "asset_type": "equity"}]',
-    )
-    snapshot2 = PortfolioSnapshot(
-        as_of_date=end,
-        universe_name="NASDAQ100",
-        equity_exposure=1.0,
-        defensive_exposure=0.0,
-        positions_json='[{"ticker": "AAA", "weight": 1.0, "asset_type": "equity"}]',
-    )
-    snapshot3 = PortfolioSnapshot(
-        as_of_date=later,
-        universe_name="NASDAQ100",
-        equity_exposure=1.0,
-        defensive_exposure=0.0,
-        positions_json='[{"ticker": "AAA", "weight": 1.0, "asset_type": "equity"}]',
-    )
-    session.add_all([snapshot1, snapshot2, snapshot3])
+    for as_of in (start, end, later):
+        _add_snapshot(session, as_of, [("AAA", 1.0, "equity")])
     session.commit()
 
     score = UniverseScore(
@@ -179,3 +172,35 @@ def test_compute_monthly_performance_series(session: Session):
     assert pytest.approx(performances[0].alpha) == 0.0
     assert performances[0].benchmark_name == "QQQ"
     assert pytest.approx(performances[1].portfolio_return) == 0.0196078431372549
+
+
+def test_monthly_series_reports_missing_price(session: Session):
+    benchmark_id = _add_ticker(session, TickerInfo("QQQ", "QQQ", TickerType.ETF, Universe.NASDAQ100))
+    _add_ticker(session, TickerInfo("AAA", "AAA", TickerType.EQUITY, Universe.NASDAQ100))
+    start = datetime.date(2025, 1, 31)
+    end = datetime.date(2025, 2, 28)
+    _add_price(session, benchmark_id, start, 100)
+    _add_price(session, benchmark_id, end, 102)
+    for as_of in (start, end):
+        _add_snapshot(session, as_of, [("AAA", 1.0, "equity")])
+    session.commit()
+
+    regime = RegimeDecision(as_of_date=end, best_universe="NASDAQ100", best_universe_score=1.0, all_universe_scores=[])
+    with pytest.raises(ValueError, match="No price available for AAA on or before 2025-01-31"):
+        compute_monthly_performance_series(session=session, regime_getter=lambda *_args, **_kwargs: regime)
+
+
+def test_positions_load_as_weight_matrix_and_turnover(session: Session):
+    first, second = datetime.date(2025, 1, 31), datetime.date(2025, 2, 28)
+    _add_snapshot(session, first, [("AAA", 0.6, "equity"), ("GLD", 0.4, "gold")])
+    _add_snapshot(session, second, [("AAA", 0.3, "equity"), ("BBB", 0.3, "equity"), ("GLD", 0.4, "gold")])
+    # Rebuilding a date replaces its positions.
+    _add_snapshot(session, second, [("AAA", 0.5, "equity"), ("BBB", 0.1, "equity"), ("GLD", 0.4, "gold")])
+    session.commit()
+
+    weights = crud.portfolio_weights(session)
+    assert weights.index.tolist() == [first, second]
+    assert weights.loc[second].to_dict() == pytest.approx({"AAA": 0.5, "BBB": 0.1, "GLD": 0.4})
+    assert weights.at[first, "BBB"] == 0.0
+    assert crud.ticker_weight_history(session, "AAA").tolist() == pytest.approx([0.6, 0.5])
+    assert compute_turnover_series(session=session).tolist() == pytest.approx([0.5, 0.1])
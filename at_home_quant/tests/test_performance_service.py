@@ -5,7 +5,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
 from at_home_quant.data.tickers import TickerInfo, TickerType, Universe
-from at_home_quant.db.models import Base, PortfolioSnapshot, PriceDaily, Ticker
+from at_home_quant.db import crud
+from at_home_quant.db.models import Base, PriceDaily, Ticker
 from at_home_quant.performance.service import get_monthly_performance, get_performance_summary
 from at_home_quant.regime.models import RegimeDecision, UniverseScore
 
@@ -41,18 +42,14 @@ def _seed_prices(session: Session, symbol: str, prices: list[tuple[datetime.date
 
 
 def _seed_snapshot(session: Session, as_of: datetime.date, ticker: str, weight: float = 1.0) -> None:
-    import json
-
-    snapshot = PortfolioSnapshot(
+    crud.save_portfolio_snapshot(
+        session,
         as_of_date=as_of,
         universe_name="NASDAQ100",
         equity_exposure=1.0,
         defensive_exposure=0.0,
-        positions_json=json.dumps(
-            [{"ticker": ticker, "weight": weight, "asset_type": "equity"}]
-        ),
+        positions=[(ticker, weight, "equity")],
     )
-    session.add(snapshot)
     session.commit()
 
 
@@ -0,0 +1,30 @@
+import datetime
+
+import pandas as pd
+
+from at_home_quant.data.calendars import calendar_for_symbol, trading_days
+from at_home_quant.etl.planner import FetchRange, missing_ranges
+
+
+def test_trading_days_skip_exchange_holidays():
+    assert len(trading_days("NYSE", datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))) == 252
+    assert pd.Timestamp("2024-07-04") not in trading_days("NYSE", datetime.date(2024, 7, 1), datetime.date(2024, 7, 5))
+    assert pd.Timestamp("2024-08-26") not in trading_days("LSE", datetime.date(2024, 8, 19), datetime.date(2024, 8, 30))
+    assert calendar_for_symbol("VOD.L") == "LSE"
+    assert calendar_for_symbol("SPY") == "NYSE"
+
+
+def test_missing_ranges_merge_nearby_holes():
+    expected = trading_days("NYSE", datetime.date(2024, 3, 1), datetime.date(2024, 3, 29))
+    stored = expected.delete([2, 4, 15])
+
+    assert missing_ranges(stored, expected, merge_within=0) == [
+        FetchRange(datetime.date(2024, 3, 5), datetime.date(2024, 3, 5)),
+        FetchRange(datetime.date(2024, 3, 7), datetime.date(2024, 3, 7)),
+        FetchRange(datetime.date(2024, 3, 22), datetime.date(2024, 3, 22)),
+    ]
+    assert missing_ranges(stored, expected, merge_within=2) == [
+        FetchRange(datetime.date(2024, 3, 5), datetime.date(2024, 3, 7)),
+        FetchRange(datetime.date(2024, 3, 22), datetime.date(2024, 3, 22)),
+    ]
+    assert missing_ranges(expected, expected) == []
@@ -0,0 +1,167 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from at_home_quant.data import fetcher
+from at_home_quant.data.cache import PriceCache
+from at_home_quant.data.providers import RAW_FIELDS
+
+
+def _raw_frame(start: datetime.date, end: datetime.date, base: float = 100.0) -> pd.DataFrame:
+    dates = pd.bdate_range(start, end, name="Date")
+    values = base + np.arange(len(dates), dtype=float)
+    return pd.DataFrame(
+        {
+            "Open": values,
+            "High": values,
+            "Low": values,
+            "Close": values,
+            "Adj Close": values,
+            "Volume": 1_000.0,
+        },
+        index=dates,
+    )
+
+
+def test_missing_ranges_and_roundtrip(tmp_path):
+    cache = PriceCache(tmp_path)
+    jan = (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    cache.write("AAA", *jan, _raw_frame(*jan))
+
+    assert cache.missing_ranges("AAA", datetime.date(2024, 1, 10), datetime.date(2024, 1, 20)) == []
+    assert cache.missing_ranges("AAA", datetime.date(2023, 12, 20), datetime.date(2024, 2, 10)) == [
+        (datetime.date(2023, 12, 20), datetime.date(2023, 12, 31)),
+        (datetime.date(2024, 2, 1), datetime.date(2024, 2, 10)),
+    ]
+
+    cache.flush()
+    reopened = PriceCache(tmp_path)
+    frame = reopened.read("AAA", datetime.date(2024, 1, 8), datetime.date(2024, 1, 12))
+    assert list(frame.index.date) == list(pd.bdate_range("2024-01-08", "2024-01-12").date)
+    assert list(frame.columns) == RAW_FIELDS
+
+
+def test_lru_eviction_respects_budget(tmp_path):
+    cache = PriceCache(tmp_path)
+    jan = (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    cache.write("AAA", *jan, _raw_frame(*jan))
+    cache.flush()
+    segment_size = cache.total_bytes()
+
+    budgeted = PriceCache(tmp_path, max_bytes=int(segment_size * 2.5))
+    budgeted.write("BBB", *jan, _raw_frame(*jan))
+    budgeted.read("AAA", *jan)  # AAA becomes most recently used
+    budgeted.write("CCC", *jan, _raw_frame(*jan))
+
+    assert budgeted.total_bytes() <= budgeted.max_bytes
+    assert budgeted.coverage("AAA") == [jan]
+    assert budgeted.coverage("BBB") == []
+    assert budgeted.coverage("CCC") == [jan]
+
+
+class _RecordingProvider:
+    name = "stand-in"
+    cacheable = True
+
+    def __init__(self):
+        self.calls = []
+
+    def download(self, symbols, start, end):
+        self.calls.append((tuple(symbols), start, end))
+        return {s: _raw_frame(start, end - datetime.timedelta(days=1)) for s in symbols}
+
+
+def test_download_raw_history_only_fetches_uncovered_ranges(tmp_path):
+    provider = _RecordingProvider()
+    cache = PriceCache(tmp_path)
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 3, 1)
+
+    first = fetcher.download_raw_history(["AAA", "BBB"], start=start, end=end, provider=provider, cache=cache)
+    assert provider.calls == [(("AAA", "BBB"), start, end)]
+
+    provider.calls.clear()
+    second = fetcher.download_raw_history(["AAA", "BBB"], start=start, end=end, provider=provider, cache=cache)
+    assert provider.calls == []
+    pd.testing.assert_frame_equal(first["AAA"], second["AAA"], check_freq=False)
+
+    extended = fetcher.download_raw_history(
+        ["AAA"], start=start, end=datetime.date(2024, 4, 1), provider=provider, cache=cache
+    )
+    assert provider.calls == [(("AAA",), end, datetime.date(2024, 4, 1))]
+    assert extended["AAA"].index.max() == pd.Timestamp("2024-03-29")
+
+
+class _ListingProvider(_RecordingProvider):
+    """Has no bars before ``listed``, as for a symbol that had not started trading."""
+
+    def __init__(self, listed: datetime.date):
+        super().__init__()
+        self.listed = listed
+
+    def download(self, symbols, start, end):
+        self.calls.append((tuple(symbols), start, end))
+        first = max(start, self.listed)
+        if first >= end:
+            return {s: _raw_frame(start, start).iloc[:0] for s in symbols}
+        return {s: _raw_frame(first, end - datetime.timedelta(days=1)) for s in symbols}
+
+
+def test_empty_ranges_are_cached_and_reads_defer_index_writes(tmp_path, monkeypatch):
+    provider = _ListingProvider(listed=datetime.date(2024, 6, 3))
+    cache = PriceCache(tmp_path)
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 3, 1)
+
+    assert fetcher.download_raw_history(["NEW"], start=start, end=end, provider=provider, cache=cache) == {}
+    assert cache.coverage("NEW") == [(start, end - datetime.timedelta(days=1))]
+    provider.calls.clear()
+    fetcher.download_raw_history(["NEW"], start=start, end=end, provider=provider, cache=cache)
+    assert provider.calls == []
+    assert PriceCache(tmp_path).coverage("NEW") == cache.coverage("NEW")
+
+    saves = []
+    monkeypatch.setattr(cache, "_save_index", lambda: saves.append(1))
+    jan = (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    for symbol in ("AAA", "BBB", "CCC"):
+        cache.write(symbol, *jan, _raw_frame(*jan))
+        cache.read(symbol, *jan)
+    assert saves == []
+    cache.flush()
+    assert saves == [1]
+
+
+class _DroppingProvider(_RecordingProvider):
+    """Leaves ``drop`` out of its first response, as yfinance does when one ticker times out."""
+
+    def __init__(self, drop: str):
+        super().__init__()
+        self.drop = drop
+
+    def download(self, symbols, start, end):
+        frames = super().download(symbols, start, end)
+        if self.drop in frames:
+            frames.pop(self.drop)
+            self.drop = None
+        return frames
+
+
+def test_dropped_symbols_are_not_cached_as_empty(tmp_path):
+    provider = _DroppingProvider(drop="BBB")
+    cache = PriceCache(tmp_path)
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 3, 1)
+
+    first = fetcher.download_raw_history(
+        ["AAA", "BBB"], start=start, end=end, provider=provider, cache=cache
+    )
+    assert sorted(first) == ["AAA"]
+    assert cache.coverage("BBB") == []
+
+    provider.calls.clear()
+    second = fetcher.download_raw_history(
+        ["AAA", "BBB"], start=start, end=end, provider=provider, cache=cache
+    )
+    assert provider.calls == [(("BBB",), start, end)]
+    assert sorted(second) == ["AAA", "BBB"]
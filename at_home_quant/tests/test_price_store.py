@@ -0,0 +1,93 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from at_home_quant.data.store import PRICE_COLUMNS, ParquetPriceStore, SqlPriceStore
+from at_home_quant.data.tickers import UNIVERSE_BENCHMARK_SYMBOL, TickerType
+from at_home_quant.db.models import Base, Ticker
+from at_home_quant.regime.service import get_universe_scores
+
+pytest.importorskip("pyarrow")
+
+
+def _prices(symbols: list[str], dates: pd.DatetimeIndex) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(symbols), len(dates))), axis=1))
+    return pd.DataFrame(
+        {
+            "symbol": np.repeat(symbols, len(dates)),
+            "date": np.tile(dates, len(symbols)),
+            "close": closes.ravel(),
+            "adj_close": closes.ravel(),
+        }
+    )
+
+
+@pytest.mark.parametrize("partition_by", ["symbol", "year"])
+def test_parquet_store_merges_writes_and_prunes_reads(tmp_path, partition_by):
+    store = ParquetPriceStore(tmp_path, partition_by=partition_by)
+    dates = pd.bdate_range("2023-12-20", periods=10)
+    df = _prices(["AAA", "^BBB"], dates)
+    assert store.write(df) == 20
+    store.write(df.iloc[[9]].assign(adj_close=-1.0))
+
+    window = store.load_frame(["^BBB", "AAA"], start=dates[7].date(), end=dates[9].date())
+    assert list(window.columns) == ["symbol", "date", "adj_close"]
+    assert window["symbol"].tolist() == ["AAA"] * 3 + ["^BBB"] * 3
+    assert window["date"].iloc[0] == dates[7].date()
+    assert window["adj_close"].iloc[2] == -1.0
+    assert store.load_frame(["ZZZ"]).empty
+    assert store.price_on_or_before("^BBB", datetime.date(2023, 12, 24)) == df["adj_close"].iloc[12]
+    assert store.price_on_or_before("AAA", datetime.date(2020, 1, 1)) is None
+
+
+def test_sql_and_parquet_stores_give_the_same_regime_scores(tmp_path):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    as_of = datetime.date(2024, 6, 28)
+    symbols = list(UNIVERSE_BENCHMARK_SYMBOL.values())
+    df = _prices(symbols, pd.bdate_range(end=as_of, periods=400))
+    with Session(engine) as session:
+        session.add_all(Ticker(symbol=s, name=s, asset_type=TickerType.ETF) for s in symbols)
+        session.flush()
+        sql_store = SqlPriceStore(session)
+        sql_store.write(df)
+        parquet_store = ParquetPriceStore(tmp_path)
+        parquet_store.write(sql_store.load_frame(symbols, columns=PRICE_COLUMNS))
+
+        from_sql = get_universe_scores(as_of, session=session)
+        from_parquet = get_universe_scores(as_of, store=parquet_store)
+    assert from_sql == from_parquet
+
+
+def test_prices_as_of_matches_per_symbol_lookups(tmp_path):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    df = _prices(["AAA", "BBB"], pd.bdate_range("2024-01-02", periods=30))
+    df = df[(df["symbol"] == "AAA") | (df["date"] >= "2024-01-20")]  # BBB starts later
+    dates = [datetime.date(2024, 1, 1), datetime.date(2024, 1, 13), datetime.date(2024, 1, 31)]
+    with Session(engine) as session:
+        session.add_all(Ticker(symbol=s, name=s, asset_type=TickerType.ETF) for s in ["AAA", "BBB"])
+        session.flush()
+        sql_store = SqlPriceStore(session)
+        sql_store.write(df)
+        parquet_store = ParquetPriceStore(tmp_path)
+        parquet_store.write(df)
+
+        for store in (sql_store, parquet_store):
+            matrix = store.prices_as_of(["BBB", "AAA", "ZZZ"], dates)
+            assert list(matrix.index) == dates
+            assert list(matrix.columns) == ["BBB", "AAA", "ZZZ"]
+            for as_of in dates:
+                for symbol in ["AAA", "BBB"]:
+                    expected = store.price_on_or_before(symbol, as_of)
+                    if expected is None:
+                        assert np.isnan(matrix.at[as_of, symbol])
+                    else:
+                        assert matrix.at[as_of, symbol] == pytest.approx(expected)
+            assert matrix["ZZZ"].isna().all()
+            assert np.isnan(matrix.at[dates[1], "BBB"]) and not np.isnan(matrix.at[dates[1], "AAA"])
@@ -0,0 +1,78 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from at_home_quant.data import fetcher
+from at_home_quant.data.providers import (
+    GeneratedProvider,
+    PriceProvider,
+    RAW_FIELDS,
+    ReplayProvider,
+    YFinanceProvider,
+)
+
+
+def test_generated_provider_is_deterministic():
+    provider = GeneratedProvider(seed=7)
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 2, 1)
+
+    first = provider.download(["AAA", "BBB"], start, end)
+    second = GeneratedProvider(seed=7).download(["AAA", "BBB"], start, end)
+
+    assert isinstance(provider, PriceProvider)
+    assert list(first["AAA"].columns) == RAW_FIELDS
+    assert first["AAA"].index.max() < pd.Timestamp(end)
+    pd.testing.assert_frame_equal(first["AAA"], second["AAA"])
+    assert not first["AAA"]["Close"].equals(first["BBB"]["Close"])
+
+
+def test_replay_provider_serves_recorded_frames(tmp_path):
+    replay = ReplayProvider(tmp_path)
+    recorded = replay.record_from(
+        GeneratedProvider(), ["AAA", "BBB"], datetime.date(2024, 1, 1), datetime.date(2024, 6, 1)
+    )
+    assert recorded == ["AAA", "BBB"]
+    assert replay.symbols() == ["AAA", "BBB"]
+
+    frames = replay.download(["AAA", "ZZZ"], datetime.date(2024, 3, 1), datetime.date(2024, 4, 1))
+    assert set(frames) == {"AAA"}
+    assert frames["AAA"].index.min() >= pd.Timestamp("2024-03-01")
+    assert frames["AAA"].index.max() < pd.Timestamp("2024-04-01")
+
+
+def test_universe_fetch_through_replay_provider(tmp_path):
+    replay = ReplayProvider(tmp_path)
+    replay.record_from(GeneratedProvider(), ["AAA", "BBB"], datetime.date(2024, 1, 1), datetime.date(2024, 2, 1))
+
+    df = fetcher.fetch_prices_for_universe(
+        ["AAA", "BBB", "MISSING"], start=datetime.date(2024, 1, 1), provider=replay, max_workers=2
+    )
+
+    assert set(df["symbol"]) == {"AAA", "BBB"}
+    assert set(fetcher.REQUIRED_COLUMNS).issubset(df.columns)
+
+
+def test_yfinance_provider_only_confirms_reported_empty_ranges(monkeypatch):
+    yf = pytest.importorskip("yfinance")
+    from yfinance.exceptions import YFPricesMissingError
+
+    class _Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, **kwargs):
+            if self.symbol == "NEW":
+                raise YFPricesMissingError(self.symbol, "(1d 2024-01-01 -> 2024-02-01)")
+            return pd.DataFrame()  # a logged timeout looks the same as no data
+
+    monkeypatch.setattr(yf, "Ticker", _Ticker)
+    provider = YFinanceProvider()
+    start = datetime.date(2024, 1, 1)
+    end = datetime.date(2024, 2, 1)
+
+    confirmed = provider.download(["NEW"], start, end)
+    assert list(confirmed) == ["NEW"]
+    assert confirmed["NEW"].empty
+    assert provider.download(["SLOW"], start, end) == {}
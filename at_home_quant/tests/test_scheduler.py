@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+from at_home_quant.data import fetcher
+from at_home_quant.data.providers import GeneratedProvider, RateLimitError
+from at_home_quant.data.scheduler import FetchReport, FetchScheduler, RetryPolicy, TokenBucket
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _ThrottlingProvider:
+    """Local stand-in that rejects requests arriving faster than ``min_interval`` on ``clock``."""
+
+    name = "throttling"
+    cacheable = False
+    rate_limited = True
+
+    def __init__(self, clock, min_interval, retry_after=None):
+        self.clock = clock
+        self.min_interval = min_interval
+        self.retry_after = retry_after
+        self.inner = GeneratedProvider(seed=3)
+        self.last_served = None
+        self.rejected = 0
+
+    def download(self, symbols, start, end):
+        now = self.clock()
+        if self.last_served is not None and now - self.last_served < self.min_interval:
+            self.rejected += 1
+            raise RateLimitError("Too Many Requests", retry_after=self.retry_after)
+        self.last_served = now
+        return self.inner.download(symbols, start, end)
+
+
+def _scheduler(clock, rate, capacity, max_attempts=4):
+    bucket = TokenBucket(rate, capacity, clock=clock, sleep=clock.sleep)
+    policy = RetryPolicy(max_attempts=max_attempts, base_delay=0.5, max_delay=8.0)
+    return FetchScheduler(bucket, policy, sleep=clock.sleep, seed=7)
+
+
+def test_token_bucket_allows_burst_then_paces():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    bucket.pause(3.0)
+    assert bucket.acquire() == pytest.approx(3.5)
+
+
+def test_bucket_matching_provider_limit_never_trips_it():
+    clock = _FakeClock()
+    provider = _ThrottlingProvider(clock, min_interval=1.0)
+    scheduler = _scheduler(clock, rate=1.0, capacity=1)
+    report = FetchReport()
+
+    for symbol in ["AAA", "BBB", "CCC"]:
+        fetcher.download_raw_history(
+            [symbol], datetime.date(2024, 1, 1), datetime.date(2024, 2, 1), provider, scheduler=scheduler, report=report
+        )
+
+    assert provider.rejected == 0
+    assert report.requests == 3
+    assert report.wait_seconds == pytest.approx(2.0)
+
+
+def test_throttled_requests_back_off_and_retry():
+    clock = _FakeClock()
+    provider = _ThrottlingProvider(clock, min_interval=5.0, retry_after=2.0)
+    scheduler = _scheduler(clock, rate=100.0, capacity=10)
+    report = FetchReport()
+    start, end = datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)
+
+    fetcher.download_raw_history(["AAA"], start, end, provider, scheduler=scheduler, report=report)
+    frames = fetcher.download_raw_history(["BBB"], start, end, provider, scheduler=scheduler, report=report)
+
+    assert "BBB" in frames
+    assert report.throttled == report.retries == provider.rejected > 0
+    assert report.failures == {}
+    assert all(delay >= 2.0 for delay in clock.sleeps if delay > 0.1)
+
+
+def test_exhausted_budget_is_reported_not_replaced_with_synthetic_prices():
+    clock = _FakeClock()
+    provider = _ThrottlingProvider(clock, min_interval=1_000.0)
+    provider.last_served = 0.0
+    scheduler = _scheduler(clock, rate=100.0, capacity=10, max_attempts=3)
+    report = FetchReport()
+
+    with pytest.raises(RateLimitError):
+        fetcher.fetch_price_history(
+            "AAA",
+            start=datetime.date(2024, 1, 1),
+            provider=provider,
+            synthetic_fallback=True,
+            scheduler=scheduler,
+            report=report,
+        )
+
+    assert report.failed_symbols == ["AAA"]
+    assert report.failures["AAA"].attempts == 3
+    assert report.failures["AAA"].throttled